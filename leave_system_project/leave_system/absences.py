@@ -0,0 +1,151 @@
+import calendar as _calendar
+import uuid
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .holidays import holiday_calendar
+from .models import LeaveInterval, LeaveRequest
+
+ABSENCE_STATUSES = ('PENDING', 'APPROVED', 'GENERATING', 'ISSUED')
+ABSENCE_CACHE_TTL = 3600
+GLOBAL_VERSION_KEY = 'leave_system:absences:all'
+
+
+def _department_version_key(department_id):
+    return f'leave_system:absences:department:{department_id}'
+
+
+def _versions(keys):
+    versions = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        for key, version in missing.items():
+            cache.add(key, version, None)
+        versions.update(cache.get_many(list(missing)))
+    return versions
+
+
+def invalidate_absences(department_ids=None):
+    # Νέα σφραγίδα έκδοσης: τα μηνιαία πλέγματα των τμημάτων που επηρεάζονται ξαναϋπολογίζονται
+    if department_ids is None:
+        cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
+        return
+    cache.set_many({_department_version_key(pk): uuid.uuid4().hex for pk in department_ids if pk}, None)
+
+
+def invalidate_request_absences(leave_request_ids):
+    # Για αλλαγές κατάστασης με update()/bulk_update, που δεν στέλνουν signals: ακύρωση μετά το commit
+    department_ids = set(LeaveRequest.objects.filter(pk__in=list(leave_request_ids)).values_list(
+        'employee__department_id', flat=True,
+    ))
+    transaction.on_commit(lambda: invalidate_absences(department_ids))
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, _calendar.monthrange(year, month)[1])
+
+
+def merge_spans(spans):
+    merged = []
+    for start_date, end_date in sorted(spans):
+        if merged and start_date <= merged[-1][1] + timedelta(days=1):
+            if end_date > merged[-1][1]:
+                merged[-1][1] = end_date
+        else:
+            merged.append([start_date, end_date])
+    return merged
+
+
+def daily_headcounts(first_day, last_day, spans_by_employee):
+    # Sweep line: +1 στην αρχή και -1 μετά το τέλος κάθε (ενοποιημένου) διαστήματος ανά υπάλληλο
+    delta = [0] * ((last_day - first_day).days + 2)
+    for spans in spans_by_employee.values():
+        for start_date, end_date in merge_spans(spans):
+            delta[(max(start_date, first_day) - first_day).days] += 1
+            delta[(min(end_date, last_day) - first_day).days + 1] -= 1
+    counts, running = [], 0
+    for change in delta[:-1]:
+        running += change
+        counts.append(running)
+    return counts
+
+
+def _query_absences(department_ids, first_day, last_day):
+    # Ένα range-overlap query: start <= τέλος μήνα και end >= αρχή μήνα
+    return LeaveInterval.objects.filter(
+        leave_request__employee__department_id__in=department_ids,
+        leave_request__status__in=ABSENCE_STATUSES,
+        start_date__lte=last_day,
+        end_date__gte=first_day,
+    ).values_list(
+        'leave_request__employee__department_id', 'leave_request__employee_id',
+        'leave_request__employee__surname_in_accusative', 'leave_request__employee__name_in_accusative',
+        'leave_request__leave_type__short_name', 'leave_request__status', 'start_date', 'end_date',
+    ).order_by('start_date', 'leave_request_id')
+
+
+def _build_grid(department_id, rows, first_day, last_day):
+    employees = {}
+    spans = defaultdict(list)
+    for _, employee_id, surname, name, leave_type, status, start_date, end_date in rows:
+        entry = employees.setdefault(employee_id, {
+            'id': employee_id, 'name': f"{surname} {name}", 'absences': [],
+        })
+        entry['absences'].append({
+            'start': max(start_date, first_day).isoformat(),
+            'end': min(end_date, last_day).isoformat(),
+            'leave_type': leave_type,
+            'status': status,
+        })
+        spans[employee_id].append((start_date, end_date))
+    return {
+        'department': department_id,
+        'absent': daily_headcounts(first_day, last_day, spans),
+        'employees': sorted(employees.values(), key=lambda entry: (entry['name'], entry['id'])),
+    }
+
+
+def department_grids(department_ids, year, month):
+    """Μηνιαία πλέγματα απουσιών ανά τμήμα, από την cache ή με ένα query για όσα λείπουν."""
+    department_ids = sorted(set(department_ids))
+    version_keys = [GLOBAL_VERSION_KEY] + [_department_version_key(pk) for pk in department_ids]
+    versions = _versions(version_keys)
+    keys = {
+        pk: f"leave_system:absences:{pk}:{year}-{month:02d}:"
+            f"{versions[GLOBAL_VERSION_KEY]}:{versions[_department_version_key(pk)]}"
+        for pk in department_ids
+    }
+    cached = cache.get_many(list(keys.values()))
+    grids = {pk: cached[key] for pk, key in keys.items() if key in cached}
+    missing = [pk for pk in department_ids if pk not in grids]
+    if missing:
+        first_day, last_day = month_bounds(year, month)
+        rows = defaultdict(list)
+        for row in _query_absences(missing, first_day, last_day):
+            rows[row[0]].append(row)
+        computed = {pk: _build_grid(pk, rows[pk], first_day, last_day) for pk in missing}
+        cache.set_many({keys[pk]: grid for pk, grid in computed.items()}, ABSENCE_CACHE_TTL)
+        grids.update(computed)
+    return [grids[pk] for pk in department_ids]
+
+
+def absence_calendar(department_ids, year, month):
+    first_day, last_day = month_bounds(year, month)
+    grids = department_grids(department_ids, year, month)
+    days = []
+    for offset in range((last_day - first_day).days + 1):
+        day = first_day + timedelta(days=offset)
+        days.append({
+            'date': day.isoformat(),
+            'working_day': holiday_calendar.is_working_day(day),
+            'absent': sum(grid['absent'][offset] for grid in grids),
+        })
+    return {
+        'year': year,
+        'month': month,
+        'days': days,
+        'departments': grids,
+    }
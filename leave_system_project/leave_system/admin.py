@@ -3,7 +3,8 @@
 # Register your models here.
 
 from django.contrib import admin
-from .models import Specialty, Service, Department, EmployeeType, EmployeePosition, Employee, LeaveType, PublicHoliday, LeaveRequest, LeaveInterval, HeaderText
+from .jobs import enqueue_decision_pdf
+from .models import Specialty, Service, Department, EmployeeType, EmployeePosition, Employee, LeaveType, PublicHoliday, LeaveRequest, LeaveInterval, HeaderText, DecisionJob, LeaveBalance, NotificationDelivery
 
 class SpecialtyAdmin(admin.ModelAdmin):
     list_display = ('name', 'short_name')
@@ -14,7 +15,7 @@ class ServiceAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 class DepartmentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'service', 'head')
+    list_display = ('name', 'service', 'parent', 'head')
     list_filter = ('service',)
     search_fields = ('name',)
 
@@ -26,10 +27,17 @@ class EmployeePositionAdmin(admin.ModelAdmin):
     list_display = ('name',)
     search_fields = ('name',)
 
+class LeaveBalanceInline(admin.TabularInline):
+    model = LeaveBalance
+    extra = 0
+    readonly_fields = ('year', 'leave_type', 'used_days', 'pending_days', 'updated_at')
+    can_delete = False
+
 class EmployeeAdmin(admin.ModelAdmin):
     list_display = ('name_in_accusative', 'surname_in_accusative', 'sch_email', 'is_active')
     list_filter = ('is_active', 'department', 'current_service')
     search_fields = ('name_in_accusative', 'surname_in_accusative', 'sch_email')
+    inlines = [LeaveBalanceInline]
 
 class LeaveTypeAdmin(admin.ModelAdmin):
     list_display = ('name', 'short_name', 'subject_text', 'decision_text')
@@ -63,12 +71,40 @@ class LeaveRequestAdmin(admin.ModelAdmin):
     list_filter = ('status', 'leave_type')
     search_fields = ('employee__name_in_accusative', 'employee__surname_in_accusative')
     inlines = [LeaveIntervalInline]
+    actions = ['issue_decisions']
+
+    @admin.action(description="Έκδοση αποφάσεων για τις εγκεκριμένες αιτήσεις")
+    def issue_decisions(self, request, queryset):
+        # Η παραγωγή γίνεται από το pool του run_decision_workers, όχι μέσα στο HTTP request
+        approved = queryset.filter(status='APPROVED')
+        count = 0
+        for leave_request in approved:
+            enqueue_decision_pdf(leave_request)
+            count += 1
+        self.message_user(request, f"Προγραμματίστηκε η έκδοση {count} αποφάσεων.")
 
 class HeaderTextAdmin(admin.ModelAdmin):
     list_display = ('text', 'created_at', 'is_active')
     list_filter = ('is_active',)
     search_fields = ('text',)
 
+class DecisionJobAdmin(admin.ModelAdmin):
+    list_display = ('leave_request', 'status', 'attempts', 'max_attempts', 'available_at', 'updated_at')
+    list_filter = ('status',)
+    readonly_fields = ('last_error',)
+
+class NotificationDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('recipient', 'notification', 'status', 'attempts', 'max_attempts', 'available_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('recipient',)
+    readonly_fields = ('last_error',)
+
+class LeaveBalanceAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'year', 'leave_type', 'used_days', 'pending_days', 'updated_at')
+    list_filter = ('year', 'leave_type')
+    search_fields = ('employee__name_in_accusative', 'employee__surname_in_accusative')
+    readonly_fields = ('used_days', 'pending_days', 'updated_at')
+
 admin.site.register(Specialty, SpecialtyAdmin)
 admin.site.register(Service, ServiceAdmin)
 admin.site.register(Department, DepartmentAdmin)
@@ -78,4 +114,7 @@ admin.site.register(Employee, EmployeeAdmin)
 admin.site.register(LeaveType, LeaveTypeAdmin)
 admin.site.register(PublicHoliday, PublicHolidayAdmin)
 admin.site.register(LeaveRequest, LeaveRequestAdmin)
-admin.site.register(HeaderText, HeaderTextAdmin)
\ No newline at end of file
+admin.site.register(HeaderText, HeaderTextAdmin)
+admin.site.register(DecisionJob, DecisionJobAdmin)
+admin.site.register(LeaveBalance, LeaveBalanceAdmin)
+admin.site.register(NotificationDelivery, NotificationDeliveryAdmin)
\ No newline at end of file
@@ -0,0 +1,289 @@
+import base64
+import binascii
+import hashlib
+import hmac
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core.cache import cache
+from django.db.models import Count, Max, Prefetch
+from django.http import HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_datetime
+from django.utils.http import parse_etags, quote_etag
+
+from .models import Employee, LeaveInterval, LeaveRequest
+from .pagination import keyset_page
+from .roles import get_roles
+
+API_VERSION = 'v1'
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+BASIC_AUTH_CACHE_TTL = 300
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _basic_auth_cache_key(header):
+    # HMAC με το SECRET_KEY: ούτε το header ούτε ένα απλό hash του κωδικού μπαίνει στην cache
+    digest = hmac.new(settings.SECRET_KEY.encode('utf-8'), header.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f'leave_system:api_auth:{digest}'
+
+
+def _cached_basic_auth_user(key):
+    entry = cache.get(key)
+    if entry is None:
+        return None
+    user_id, auth_hash = entry
+    user = get_user_model()._default_manager.filter(pk=user_id, is_active=True).first()
+    # Αλλαγή κωδικού αλλάζει το session auth hash, οπότε η εγγραφή παύει να ισχύει
+    if user is None or not hmac.compare_digest(user.get_session_auth_hash(), auth_hash):
+        cache.delete(key)
+        return None
+    return user
+
+
+def _basic_auth_user(request):
+    # Για σενάρια συγχρονισμού χωρίς session (π.χ. νυχτερινό job μισθοδοσίας)
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Basic '):
+        return None
+    # Το authenticate() τρέχει PBKDF2 σε κάθε κλήση· ένα job με πολλές σελίδες το πληρώνει μία φορά
+    key = _basic_auth_cache_key(header)
+    user = _cached_basic_auth_user(key)
+    if user is not None:
+        return user
+    try:
+        username, password = base64.b64decode(header[6:]).decode('utf-8').split(':', 1)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    user = authenticate(request, username=username, password=password)
+    if user is not None:
+        cache.set(key, (user.pk, user.get_session_auth_hash()), BASIC_AUTH_CACHE_TTL)
+    return user
+
+
+def api_view(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'error': 'Επιτρέπεται μόνο GET.'}, status=405, headers={'Allow': 'GET, HEAD'})
+        if not request.user.is_authenticated:
+            user = _basic_auth_user(request)
+            if user is None:
+                return JsonResponse({'error': 'Απαιτείται σύνδεση.'}, status=401,
+                                    headers={'WWW-Authenticate': 'Basic realm="leave_system"'})
+            request.user = user
+        if not get_roles(request.user, getattr(request, 'session', None)).is_leave_officer_or_admin:
+            return JsonResponse({'error': 'Δεν επιτρέπεται η πρόσβαση.'}, status=403)
+        try:
+            response = view(request, *args, **kwargs)
+        except ApiError as e:
+            return JsonResponse({'error': str(e)}, status=e.status)
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+    return wrapper
+
+
+def _etag(*parts):
+    digest = hashlib.sha256(json.dumps([API_VERSION, *parts], default=str).encode('utf-8')).hexdigest()
+    return quote_etag(digest)
+
+
+def _not_modified(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match and (etag in parse_etags(if_none_match) or '*' in parse_etags(if_none_match)):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    return None
+
+
+def _selected_fields(request, resource):
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(resource['fields'])
+    fields = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in resource['fields']]
+    if unknown:
+        raise ApiError(f"Άγνωστα πεδία: {', '.join(unknown)}.")
+    return fields
+
+
+def _page_size(request):
+    try:
+        page_size = int(request.GET.get('page_size', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ApiError("Μη έγκυρο page_size.")
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def _updated_since(request, queryset):
+    value = request.GET.get('updated_since')
+    if not value:
+        return queryset
+    updated_since = parse_datetime(value)
+    if updated_since is None:
+        raise ApiError("Μη έγκυρο updated_since (αναμένεται ISO 8601).")
+    return queryset.filter(updated_at__gte=updated_since)
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def _decision(leave_request):
+    if not leave_request.decision_pdf:
+        return None
+    return {
+        'url': reverse('download_decision_pdf', args=[leave_request.pk]),
+        'fingerprint': leave_request.decision_fingerprint,
+        'protocol_number': leave_request.protocol_number,
+        'processed_by_name': leave_request.processed_by_name,
+    }
+
+
+# Για κάθε πεδίο: (στήλες που χρειάζονται από τη βάση, συνάρτηση τιμής)
+EMPLOYEE_RESOURCE = {
+    'model': Employee,
+    'fields': {
+        'id': (['id'], lambda e: e.id),
+        'sch_email': (['sch_email'], lambda e: e.sch_email),
+        'name': (['name_in_accusative'], lambda e: e.name_in_accusative),
+        'surname': (['surname_in_accusative'], lambda e: e.surname_in_accusative),
+        'father_name': (['father_name_in_genitive'], lambda e: e.father_name_in_genitive),
+        'gender': (['gender'], lambda e: e.gender),
+        'specialty': (['specialty'], lambda e: e.specialty_id),
+        'service': (['current_service'], lambda e: e.current_service_id),
+        'department': (['department'], lambda e: e.department_id),
+        'employee_type': (['employee_type'], lambda e: e.employee_type_id),
+        'position': (['position'], lambda e: e.position_id),
+        'regular_leave_days': (['regular_leave_days'], lambda e: e.regular_leave_days),
+        'carryover_leave_days': (['carryover_leave_days'], lambda e: e.carryover_leave_days),
+        'is_active': (['is_active'], lambda e: e.is_active),
+        'updated_at': (['updated_at'], lambda e: _iso(e.updated_at)),
+    },
+}
+
+LEAVE_REQUEST_RESOURCE = {
+    'model': LeaveRequest,
+    'fields': {
+        'id': (['id'], lambda r: r.id),
+        'employee': (['employee'], lambda r: r.employee_id),
+        'leave_type': (['leave_type'], lambda r: r.leave_type_id),
+        'status': (['status'], lambda r: r.status),
+        'rejection_reason': (['rejection_reason'], lambda r: r.rejection_reason),
+        'protocol_number': (['protocol_number'], lambda r: r.protocol_number),
+        'kedasy_protocol_number': (['kedasy_protocol_number'], lambda r: r.kedasy_protocol_number),
+        'final_signatory': (['final_signatory'], lambda r: r.final_signatory),
+        'intervals': ([], lambda r: [
+            {'start_date': _iso(interval.start_date), 'end_date': _iso(interval.end_date)}
+            for interval in r.intervals.all()
+        ]),
+        'decision': (
+            ['decision_pdf', 'decision_fingerprint', 'protocol_number', 'processed_by_name'], _decision,
+        ),
+        'created_at': (['created_at'], lambda r: _iso(r.created_at)),
+        'updated_at': (['updated_at'], lambda r: _iso(r.updated_at)),
+    },
+}
+
+
+def _queryset(resource, fields, queryset=None):
+    columns = {'id', 'updated_at'}
+    for name in fields:
+        columns.update(resource['fields'][name][0])
+    queryset = (queryset if queryset is not None else resource['model'].objects.all()).only(*columns)
+    if 'intervals' in fields:
+        queryset = queryset.prefetch_related(
+            Prefetch('intervals', queryset=LeaveInterval.objects.order_by('start_date', 'id'))
+        )
+    return queryset
+
+
+def _serialize(resource, fields, obj):
+    return {name: resource['fields'][name][1](obj) for name in fields}
+
+
+def _list(request, resource, queryset):
+    fields = _selected_fields(request, resource)
+    page_size = _page_size(request)
+    queryset = _updated_since(request, queryset)
+
+    # Το ETag προκύπτει από ένα aggregate query· αν ο client έχει ήδη τη σελίδα δεν φορτώνεται καμία γραμμή
+    state = queryset.aggregate(count=Count('id'), last_updated=Max('updated_at'))
+    etag = _etag(request.path, sorted(request.GET.lists()), state['count'], state['last_updated'])
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+
+    page = keyset_page(
+        _queryset(resource, fields, queryset), request.GET.get('cursor'), page_size,
+        field='updated_at', descending=False,
+    )
+    next_url = None
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_url = f"{request.path}?{query.urlencode()}"
+    response = JsonResponse({
+        'version': API_VERSION,
+        'results': [_serialize(resource, fields, obj) for obj in page],
+        'next': next_url,
+    })
+    response['ETag'] = etag
+    return response
+
+
+def _detail(request, resource, pk):
+    fields = _selected_fields(request, resource)
+    updated_at = get_object_or_404(resource['model'].objects.values_list('updated_at', flat=True), pk=pk)
+    etag = _etag(request.path, fields, pk, updated_at)
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    obj = get_object_or_404(_queryset(resource, fields), pk=pk)
+    response = JsonResponse({'version': API_VERSION, **_serialize(resource, fields, obj)})
+    response['ETag'] = etag
+    return response
+
+
+@api_view
+def employee_list(request):
+    queryset = Employee.objects.all()
+    if request.GET.get('is_active') in ('true', 'false'):
+        queryset = queryset.filter(is_active=request.GET['is_active'] == 'true')
+    return _list(request, EMPLOYEE_RESOURCE, queryset)
+
+
+@api_view
+def employee_detail(request, employee_id):
+    return _detail(request, EMPLOYEE_RESOURCE, employee_id)
+
+
+@api_view
+def leave_request_list(request):
+    queryset = LeaveRequest.objects.all()
+    if request.GET.get('status'):
+        queryset = queryset.filter(status=request.GET['status'])
+    if request.GET.get('employee'):
+        try:
+            queryset = queryset.filter(employee_id=int(request.GET['employee']))
+        except ValueError:
+            raise ApiError("Μη έγκυρο employee.")
+    if request.GET.get('has_decision') == 'true':
+        queryset = queryset.exclude(decision_pdf='').exclude(decision_pdf__isnull=True)
+    return _list(request, LEAVE_REQUEST_RESOURCE, queryset)
+
+
+@api_view
+def leave_request_detail(request, leave_request_id):
+    return _detail(request, LEAVE_REQUEST_RESOURCE, leave_request_id)
@@ -0,0 +1,323 @@
+import contextlib
+import io
+import math
+import os
+import platform
+import random
+import statistics
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+import django
+import pandas as pd
+from django.conf import settings
+from django.contrib.auth.models import Group
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .import_data import import_all_data
+from .models import (
+    Department, Employee, EmployeePosition, EmployeeType, HeaderText, LeaveInterval, LeaveRequest, LeaveType,
+    PublicHoliday, Service, Specialty,
+)
+from .reports import working_days_by_interval
+from .roles import invalidate_roles
+
+RESULTS_FORMAT = 1
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+@dataclass
+class BenchmarkContext:
+    repeat: int = 5
+    sample_size: int = 1000
+    import_rows: int = 2000
+    seed: int = 42
+    rng: random.Random = field(init=False)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+
+def summarize(timings, items=1):
+    # Χρόνοι σε ms ανά μονάδα (έγγραφο, διάστημα, αίτημα)
+    per_item = sorted(seconds * 1000 / items for seconds in timings)
+    return {
+        'runs': len(per_item),
+        'items': items,
+        'min_ms': per_item[0],
+        'median_ms': statistics.median(per_item),
+        'mean_ms': statistics.fmean(per_item),
+        'p95_ms': per_item[max(0, math.ceil(0.95 * len(per_item)) - 1)],
+    }
+
+
+class QueryCounter:
+    # execute_wrapper αντί για CaptureQueriesContext, που μηδενίζεται σε κάθε request_started του test Client
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(function, repeat, items=1):
+    """Μία εκτέλεση προθέρμανσης (μετράει και τα queries), μετά `repeat` χρονομετρημένες."""
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return {**summarize(timings, items), 'queries': queries.count / items}
+
+
+@contextlib.contextmanager
+def rolled_back():
+    # Ό,τι γράφει το benchmark δεν μένει στη βάση
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@benchmark('working_days')
+def bench_working_days(context):
+    ids = list(LeaveInterval.objects.values_list('id', flat=True))
+    sample = context.rng.sample(ids, min(context.sample_size, len(ids)))
+    if not sample:
+        return {}
+    intervals = list(LeaveInterval.objects.filter(id__in=sample))
+    queryset = LeaveInterval.objects.filter(id__in=sample)
+
+    def per_interval():
+        for interval in intervals:
+            interval.calculate_working_days()
+
+    return {
+        'calculate_working_days': measure(per_interval, context.repeat, len(intervals)),
+        'working_days_by_interval': measure(lambda: working_days_by_interval(queryset), context.repeat, len(intervals)),
+    }
+
+
+def _client(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+def _get(client, url):
+    response = client.get(url)
+    if response.status_code != 200:
+        raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return response
+
+
+@benchmark('list_views')
+def bench_list_views(context):
+    busiest = (
+        Employee.objects.filter(user__isnull=False).annotate(requests=Count('leave_requests'))
+        .order_by('-requests').first()
+    )
+    if busiest is None:
+        return {}
+    head = Employee.objects.filter(headed_departments__parent__isnull=True, user__isnull=False).first() or busiest
+    department = head.headed_departments.first() or busiest.department
+    month = f'{LeaveInterval.objects.order_by("-start_date").values_list("start_date", flat=True).first():%Y-%m}'
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']), rolled_back():
+        officer_group, _ = Group.objects.get_or_create(name='LeaveOfficer')
+        head.user.groups.add(officer_group)
+        try:
+            cases = [
+                ('view_leave_requests', busiest.user, reverse('view_leave_requests')),
+                ('view_subordinate_leaves', head.user, reverse('view_subordinate_leaves')),
+                ('department_calendar', head.user,
+                 f"{reverse('department_calendar')}?service={department.service_id}&month={month}"),
+                ('api_leave_request_list', head.user, f"{reverse('api_leave_request_list')}?page_size=100"),
+                ('api_employee_list', head.user, f"{reverse('api_employee_list')}?page_size=100"),
+            ]
+            for name, user, url in cases:
+                client = _client(user)
+                results[name] = measure(lambda: _get(client, url), context.repeat)
+        finally:
+            invalidate_roles([head.user_id])
+    return results
+
+
+@benchmark('decision_pdf')
+def bench_decision_pdf(context):
+    # Κάθε επανάληψη αποδίδει διαφορετική αίτηση, ώστε να μη σερβίρεται το PDF από το αρχείο
+    leave_requests = list(
+        LeaveRequest.objects.filter(status='APPROVED', intervals__isnull=False).distinct()
+        .select_related('employee', 'employee__current_service', 'leave_type', 'processed_by')[:context.repeat + 1]
+    )
+    if len(leave_requests) < 2:
+        return {}
+    pending = iter(leave_requests)
+    with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root), rolled_back():
+        result = measure(lambda: next(pending).generate_decision_pdf(), len(leave_requests) - 1)
+    return {'generate_decision_pdf': result}
+
+
+def _export_workbooks(directory, employee_rows):
+    employees = Employee.objects.select_related(
+        'specialty', 'current_service', 'department', 'employee_type', 'position',
+    ).filter(sch_email__isnull=False).order_by('id')[:employee_rows]
+    tables = {
+        'specialties': pd.DataFrame(list(Specialty.objects.values('name', 'short_name'))),
+        'services': pd.DataFrame(list(Service.objects.values('name'))),
+        'departments': pd.DataFrame([
+            {'name': department.name, 'service_name': department.service.name,
+             'head_email': department.head.sch_email if department.head else None}
+            for department in Department.objects.select_related('service', 'head')
+        ]),
+        'employee_types': pd.DataFrame(list(EmployeeType.objects.values('name'))),
+        'employee_positions': pd.DataFrame(list(EmployeePosition.objects.values('name'))),
+        'employees': pd.DataFrame([{
+            'sch_email': employee.sch_email,
+            'name_in_accusative': employee.name_in_accusative,
+            'surname_in_accusative': employee.surname_in_accusative,
+            'father_name_in_genitive': employee.father_name_in_genitive,
+            'specialty_name': employee.specialty.name if employee.specialty else None,
+            'current_service_name': employee.current_service.name if employee.current_service else None,
+            'department_name': employee.department.name if employee.department else None,
+            'employee_type_name': employee.employee_type.name if employee.employee_type else None,
+            'position_name': employee.position.name if employee.position else None,
+            'gender': employee.gender,
+            'regular_leave_days': employee.regular_leave_days,
+            'carryover_leave_days': employee.carryover_leave_days,
+            'is_active': employee.is_active,
+            'phone': employee.phone,
+            'personal_email': employee.personal_email,
+            'role_description': employee.role_description,
+            'notification_recipients': employee.notification_recipients,
+        } for employee in employees]),
+        'leave_types': pd.DataFrame(list(LeaveType.objects.values('name', 'short_name', 'subject_text', 'decision_text'))),
+        'public_holidays': pd.DataFrame(list(PublicHoliday.objects.values('name', 'day', 'month', 'year', 'is_fixed'))),
+        'header_texts': pd.DataFrame(list(HeaderText.objects.values('text', 'is_active'))),
+    }
+    for name, frame in tables.items():
+        frame.to_excel(os.path.join(directory, f'{name}.xlsx'), index=False)
+    return len(tables['employees'])
+
+
+@benchmark('import_data')
+def bench_import_data(context):
+    # Επανεισαγωγή του τρέχοντος μητρώου σε dry run: ανάγνωση, αντιστοίχιση και bulk εγγραφές, χωρίς commit
+    engines = []
+    with tempfile.TemporaryDirectory() as directory:
+        rows = _export_workbooks(directory, context.import_rows)
+
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):
+                engines.append(import_all_data(directory, dry_run=True))
+
+        result = measure(run, context.repeat)
+    engine = engines[-1]
+    return {
+        'import_all_data': {
+            **result,
+            'employee_rows': rows,
+            'errors': len(engine.errors),
+            'phases_ms': {name: seconds * 1000 for name, seconds in engine.timings.items() if not name.startswith('read ')},
+        },
+    }
+
+
+@benchmark('department_save')
+def bench_department_save(context):
+    departments = list(Department.objects.filter(head__isnull=False).select_related('head__user')[:context.sample_size])
+    if not departments:
+        return {}
+    candidates = {}
+    for department_id, employee_id in Employee.objects.filter(
+        department__in=departments, user__isnull=False,
+    ).values_list('department_id', 'id'):
+        candidates.setdefault(department_id, []).append(employee_id)
+    employees = Employee.objects.in_bulk([employee_id for ids in candidates.values() for employee_id in ids])
+    original_heads = {department.id: department.head for department in departments}
+
+    def change_heads():
+        # Εναλλαγή προϊσταμένου: αφαίρεση ρόλου από τον παλιό, ανάθεση στον νέο
+        for department in departments:
+            choices = candidates.get(department.id) or [department.head_id]
+            department.head = employees.get(context.rng.choice(choices), original_heads[department.id])
+            department.save()
+
+    with rolled_back():
+        result = measure(change_heads, context.repeat, len(departments))
+    invalidate_roles()
+    return {'role_sync': result}
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database': connection.vendor,
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def dataset():
+    return {
+        'services': Service.objects.count(),
+        'departments': Department.objects.count(),
+        'employees': Employee.objects.count(),
+        'leave_requests': LeaveRequest.objects.count(),
+        'leave_intervals': LeaveInterval.objects.count(),
+        'public_holidays': PublicHoliday.objects.count(),
+    }
+
+
+def run_benchmarks(context=None, only=None, log=None):
+    context = context or BenchmarkContext()
+    log = log or (lambda message: None)
+    unknown = set(only or ()) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+    results = {}
+    for name, function in BENCHMARKS.items():
+        if only and name not in only:
+            continue
+        log(f"Running {name}...")
+        results[name] = function(context)
+    return {
+        'format': RESULTS_FORMAT,
+        'environment': environment(),
+        'dataset': dataset(),
+        'parameters': {
+            'repeat': context.repeat, 'sample_size': context.sample_size,
+            'import_rows': context.import_rows, 'seed': context.seed,
+        },
+        'results': results,
+    }
+
+
+def compare_results(previous, current, metric='median_ms'):
+    """Λόγος τρέχοντος / προηγούμενου χρόνου για κάθε μέτρηση που υπάρχει και στα δύο."""
+    rows = []
+    for group, measurements in current['results'].items():
+        for name, values in measurements.items():
+            before = previous.get('results', {}).get(group, {}).get(name, {}).get(metric)
+            after = values.get(metric)
+            if before and after is not None:
+                rows.append((f'{group}.{name}', before, after, after / before))
+    return rows
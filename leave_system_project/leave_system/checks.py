@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+PROCESS_LOCAL_CACHES = ('django.core.cache.backends.locmem.LocMemCache', 'django.core.cache.backends.dummy.DummyCache')
+
+
+@register(Tags.caches)
+def shared_cache_check(app_configs, **kwargs):
+    # Οι εκδόσεις ρόλων και πινάκων αναφοράς ακυρώνονται μέσω της cache· με cache ανά διεργασία
+    # ένας worker δεν βλέπει τις αλλαγές των άλλων μέχρι να λήξει το TTL
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if settings.DEBUG or backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        f"The default cache backend {backend} is local to each process.",
+        hint="Role and reference data invalidations will not reach other workers. Point "
+             "LEAVE_SYSTEM_CACHE_BACKEND and LEAVE_SYSTEM_CACHE_LOCATION at Redis or Memcached.",
+        id='leave_system.W001',
+    )]
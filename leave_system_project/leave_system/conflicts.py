@@ -0,0 +1,189 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from .absences import ABSENCE_STATUSES, daily_headcounts
+from .holidays import holiday_calendar
+from .models import Employee, LeaveInterval
+
+DEFAULT_MAX_ABSENT_RATIO = 0.5
+
+
+class IntervalTree:
+    """Centered interval tree για ερωτήματα επικάλυψης σε O(log n + k)."""
+
+    __slots__ = ('center', 'by_start', 'by_end', 'left', 'right')
+
+    def __init__(self, intervals):
+        # intervals: λίστα (start, end, payload) με κλειστά άκρα
+        intervals = list(intervals)
+        self.left = self.right = None
+        if not intervals:
+            self.center = None
+            self.by_start = self.by_end = []
+            return
+        points = sorted(point for start, end, _ in intervals for point in (start, end))
+        self.center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for interval in intervals:
+            if interval[1] < self.center:
+                left.append(interval)
+            elif interval[0] > self.center:
+                right.append(interval)
+            else:
+                here.append(interval)
+        self.by_start = sorted(here, key=lambda interval: interval[0])
+        self.by_end = sorted(here, key=lambda interval: interval[1], reverse=True)
+        if left:
+            self.left = IntervalTree(left)
+        if right:
+            self.right = IntervalTree(right)
+
+    def overlapping(self, start, end):
+        found = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.center is None:
+                continue
+            if end < node.center:
+                for interval in node.by_start:
+                    if interval[0] > end:
+                        break
+                    found.append(interval)
+                if node.left:
+                    stack.append(node.left)
+            elif start > node.center:
+                for interval in node.by_end:
+                    if interval[1] < start:
+                        break
+                    found.append(interval)
+                if node.right:
+                    stack.append(node.right)
+            else:
+                # Όλα τα διαστήματα του κόμβου περιέχουν το center, άρα επικαλύπτονται
+                found.extend(node.by_start)
+                if node.left:
+                    stack.append(node.left)
+                if node.right:
+                    stack.append(node.right)
+        return found
+
+
+@dataclass
+class LeaveConflicts:
+    overlaps: list = field(default_factory=list)
+    understaffed_days: list = field(default_factory=list)
+    department_size: int = 0
+    absence_limit: int = 0
+
+    def __bool__(self):
+        return bool(self.overlaps or self.understaffed_days)
+
+
+def max_absent_ratio():
+    return getattr(settings, 'LEAVE_SYSTEM_MAX_ABSENT_RATIO', DEFAULT_MAX_ABSENT_RATIO)
+
+
+def _scope(employee_id, department_id):
+    return department_id if department_id else ('employee', employee_id)
+
+
+class ConflictChecker:
+    """Έλεγχος επικαλύψεων και υποστελέχωσης για μία ή πολλές νέες αιτήσεις μαζί.
+
+    Με ένα query φορτώνονται οι ενεργές απουσίες των υπαλλήλων και των τμημάτων
+    τους στο παράθυρο των νέων διαστημάτων. Μαζί με τα διαστήματα της ίδιας της
+    παρτίδας χτίζεται ένα interval tree ανά τμήμα, ώστε η παρτίδα να ελέγχεται
+    ως σύνολο (π.χ. δύο νέες αιτήσεις που μαζί αφήνουν το τμήμα χωρίς προσωπικό).
+    """
+
+    def __init__(self, submissions, exclude_request_ids=()):
+        # submissions: λίστα (key, employee, [(start, end), ...])· το key None δηλώνει υπάρχουσα αίτηση
+        self.submissions = [
+            (key, employee, [(start_date, end_date) for start_date, end_date in intervals if start_date <= end_date])
+            for key, employee, intervals in submissions
+        ]
+        self._by_key = {submission[0]: submission for submission in self.submissions}
+        self.trees = {}
+        self.department_sizes = {}
+        spans = [interval for _, _, intervals in self.submissions for interval in intervals]
+        if not spans:
+            return
+        window_start = min(start_date for start_date, _ in spans)
+        window_end = max(end_date for _, end_date in spans)
+        employee_ids = {employee.id for _, employee, _ in self.submissions}
+        department_ids = {employee.department_id for _, employee, _ in self.submissions if employee.department_id}
+
+        existing = LeaveInterval.objects.filter(
+            Q(leave_request__employee_id__in=employee_ids) | Q(leave_request__employee__department_id__in=department_ids),
+            leave_request__status__in=ABSENCE_STATUSES,
+            start_date__lte=window_end,
+            end_date__gte=window_start,
+        ).exclude(leave_request_id__in=list(exclude_request_ids))
+        by_scope = defaultdict(list)
+        for employee_id, department_id, leave_request_id, start_date, end_date in existing.values_list(
+            'leave_request__employee_id', 'leave_request__employee__department_id', 'leave_request_id',
+            'start_date', 'end_date',
+        ):
+            by_scope[_scope(employee_id, department_id)].append((start_date, end_date, (employee_id, leave_request_id, None)))
+        for key, employee, intervals in self.submissions:
+            for start_date, end_date in intervals:
+                by_scope[_scope(employee.id, employee.department_id)].append((start_date, end_date, (employee.id, None, key)))
+        self.trees = {scope: IntervalTree(intervals) for scope, intervals in by_scope.items()}
+
+        if department_ids:
+            self.department_sizes = dict(
+                Employee.objects.filter(department_id__in=department_ids, is_active=True)
+                .values('department_id').annotate(size=Count('id')).values_list('department_id', 'size')
+            )
+
+    def check(self, key):
+        _, employee, intervals = self._by_key[key]
+        conflicts = LeaveConflicts()
+        if not intervals:
+            return conflicts
+        tree = self.trees[_scope(employee.id, employee.department_id)]
+        if employee.department_id:
+            conflicts.department_size = self.department_sizes.get(employee.department_id, 0)
+            conflicts.absence_limit = int(conflicts.department_size * max_absent_ratio())
+
+        ordered = sorted(intervals)
+        for (_, previous_end), (start_date, end_date) in zip(ordered, ordered[1:]):
+            if start_date <= previous_end:
+                conflicts.overlaps.append({'leave_request': None, 'submission': key,
+                                           'start': start_date, 'end': min(previous_end, end_date)})
+
+        understaffed = set()
+        for start_date, end_date in intervals:
+            spans = defaultdict(list)
+            for other_start, other_end, (employee_id, leave_request_id, other_key) in tree.overlapping(start_date, end_date):
+                if other_key == key:
+                    continue
+                if employee_id == employee.id:
+                    conflicts.overlaps.append({
+                        'leave_request': leave_request_id,
+                        'submission': other_key,
+                        'start': max(start_date, other_start),
+                        'end': min(end_date, other_end),
+                    })
+                else:
+                    spans[employee_id].append((other_start, other_end))
+            if not employee.department_id:
+                continue
+            spans[employee.id].append((start_date, end_date))
+            for offset, absent in enumerate(daily_headcounts(start_date, end_date, spans)):
+                day = start_date + timedelta(days=offset)
+                if absent > conflicts.absence_limit and holiday_calendar.is_working_day(day):
+                    understaffed.add(day)
+        conflicts.understaffed_days = sorted(understaffed)
+        return conflicts
+
+
+def find_leave_conflicts(employee, intervals, exclude_request_id=None):
+    """Έλεγχος νέων διαστημάτων (start, end) ενός υπαλλήλου πριν την υποβολή."""
+    exclude = [exclude_request_id] if exclude_request_id is not None else []
+    return ConflictChecker([(0, employee, intervals)], exclude).check(0)
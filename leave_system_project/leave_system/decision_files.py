@@ -0,0 +1,194 @@
+import os
+import re
+import tempfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags, quote_etag
+
+DECISIONS_DIR = 'decisions'
+SHARDED_PATTERN = re.compile(rf'^{DECISIONS_DIR}/\d{{4}}/\d{{2}}/[^/]+$')
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+SENDFILE_HEADERS = {'x-accel-redirect': 'X-Accel-Redirect', 'x-sendfile': 'X-Sendfile'}
+
+
+def decision_relative_path(created_at, sch_email, fingerprint):
+    # decisions/YYYY/MM/ με βάση την ημερομηνία της αίτησης: κάθε αίτηση μένει πάντα στον ίδιο
+    # κατάλογο, οπότε η επανέκδοση με ίδιο αποτύπωμα βρίσκει το υπάρχον αρχείο
+    created_at = timezone.localtime(created_at) if created_at else timezone.localtime()
+    filename = f"decision_{sch_email or 'no_email'}_{fingerprint[:16]}.pdf"
+    return f'{DECISIONS_DIR}/{created_at:%Y}/{created_at:%m}/{filename}'
+
+
+def is_sharded(name):
+    return bool(SHARDED_PATTERN.match(name or ''))
+
+
+def write_atomic(path, write):
+    """Η write(tmp_path) γράφει σε προσωρινό αρχείο του ίδιου καταλόγου, που μετά παίρνει
+    τη θέση του με rename· δεν μένει ποτέ μισογραμμένο PDF στη θέση του."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        # Το mkstemp δίνει 0600· ο proxy (X-Accel-Redirect) πρέπει να μπορεί να το διαβάσει
+        os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS or 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def parse_range(header, size):
+    """(αρχή, τέλος) για ένα εύρος bytes· None για πλήρη απάντηση (χωρίς ή με μη
+    υποστηριζόμενο Range, π.χ. πολλαπλά εύρη). ValueError αν το εύρος είναι εκτός αρχείου."""
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if not suffix:
+            raise ValueError(header)
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def iter_file_range(path, start, length, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as pdf:
+        pdf.seek(start)
+        while length > 0:
+            data = pdf.read(min(chunk_size, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    # Μόνο ισχυρή σύγκριση: αν το αρχείο άλλαξε, στέλνεται ολόκληρο
+    return if_range == http_date(last_modified) or etag in parse_etags(if_range)
+
+
+def decision_response(request, name):
+    """Απάντηση για το PDF `name` (σχετικό με το MEDIA_ROOT), μετά τον έλεγχο δικαιωμάτων.
+
+    ETag/Last-Modified για 304 και If-Range, ένα εύρος bytes (206/416), και με
+    LEAVE_SYSTEM_DECISION_SENDFILE παράδοση στον proxy (X-Accel-Redirect ή X-Sendfile),
+    ώστε το αρχείο να μη διαβάζεται από τη διεργασία Python.
+    """
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("Decision PDF not found.")
+    size, last_modified = stat.st_size, int(stat.st_mtime)
+    # Ίδια μορφή με το ETag του nginx (mtime-μέγεθος σε hex)
+    etag = quote_etag(f'{last_modified:x}-{size:x}')
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        sendfile = getattr(settings, 'LEAVE_SYSTEM_DECISION_SENDFILE', None)
+        byte_range = None
+        if not sendfile and _if_range_matches(request, etag, last_modified):
+            try:
+                byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return response
+        if sendfile:
+            # Ο proxy εξυπηρετεί και τα Range· η εφαρμογή στέλνει μόνο headers
+            response = HttpResponse(content_type='application/pdf')
+            if sendfile == 'x-accel-redirect':
+                prefix = getattr(settings, 'LEAVE_SYSTEM_DECISION_ACCEL_PREFIX', '/protected-media/')
+                response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + name)
+            else:
+                response[SENDFILE_HEADERS[sendfile]] = path
+        elif byte_range is not None:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_file_range(path, start, end - start + 1), status=206, content_type='application/pdf',
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            response['Content-Length'] = str(end - start + 1)
+        else:
+            response = FileResponse(open(path, 'rb'), content_type='application/pdf')
+        response['Content-Disposition'] = f'inline; filename="{os.path.basename(name)}"'
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Ιδιωτικό αρχείο: όχι σε κοινόχρηστες caches, επανέλεγχος με ETag σε κάθε χρήση
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def plan_storage_migration():
+    """Οι μετακινήσεις (παλιό όνομα, νέο όνομα) για όσα PDF δεν είναι ακόμη στη μορφή decisions/YYYY/MM/."""
+    # Εισαγωγή εδώ για αποφυγή κυκλικού import
+    from .models import LeaveRequest
+
+    moves = {}
+    rows = LeaveRequest.objects.exclude(decision_pdf='').exclude(decision_pdf__isnull=True).values_list(
+        'decision_pdf', 'created_at',
+    ).iterator(chunk_size=2000)
+    for name, created_at in rows:
+        if is_sharded(name) or name in moves:
+            continue
+        created_at = timezone.localtime(created_at)
+        moves[name] = f'{DECISIONS_DIR}/{created_at:%Y}/{created_at:%m}/{os.path.basename(name)}'
+    return moves
+
+
+def migrate_decision_storage(dry_run=False, batch_size=500):
+    """Μεταφορά των υπαρχόντων PDF στη νέα διάταξη και ενημέρωση των αναφορών τους.
+
+    Κάθε αρχείο μετακινείται με rename (ίδιο filesystem) πριν αλλάξει το όνομα στη βάση,
+    οπότε μια διακοπή στη μέση αφήνει αρχεία που η επόμενη εκτέλεση βρίσκει ήδη στη θέση τους.
+    """
+    # Εισαγωγή εδώ για αποφυγή κυκλικού import
+    from django.db import transaction
+    from .models import DecisionNotification, LeaveRequest
+
+    moves = plan_storage_migration()
+    summary = {'files': len(moves), 'moved': 0, 'missing': 0, 'requests': 0, 'notifications': 0}
+    if dry_run:
+        return moves, summary
+    names = list(moves)
+    for start in range(0, len(names), batch_size):
+        batch = names[start:start + batch_size]
+        found = []
+        for name in batch:
+            source = os.path.join(settings.MEDIA_ROOT, name)
+            target = os.path.join(settings.MEDIA_ROOT, moves[name])
+            if os.path.exists(source):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(source, target)
+                summary['moved'] += 1
+            elif not os.path.exists(target):
+                # Χωρίς αρχείο η αναφορά μένει ως έχει· το PDF θα ξαναδημιουργηθεί με την επόμενη έκδοση
+                summary['missing'] += 1
+                continue
+            found.append(name)
+        with transaction.atomic():
+            for name in found:
+                summary['requests'] += LeaveRequest.objects.filter(decision_pdf=name).update(decision_pdf=moves[name])
+                summary['notifications'] += DecisionNotification.objects.filter(decision_pdf=name).update(
+                    decision_pdf=moves[name],
+                )
+    return moves, summary
@@ -0,0 +1,111 @@
+import csv
+import tempfile
+from datetime import date
+from itertools import islice
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from openpyxl import Workbook
+
+from .models import LeaveInterval, LeaveRequest
+from .reports import count_working_days
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_COLUMNS = [
+    'leave_request_id', 'status', 'created_at', 'protocol_number', 'leave_type',
+    'employee_id', 'sch_email', 'surname', 'name', 'department_name', 'service_name',
+    'start_date', 'end_date', 'working_days', 'request_working_days',
+]
+REQUEST_FIELDS = (
+    'id', 'status', 'created_at', 'protocol_number', 'leave_type__name',
+    'employee_id', 'employee__sch_email', 'employee__surname_in_accusative', 'employee__name_in_accusative',
+    'employee__department__name', 'employee__current_service__name',
+)
+
+
+def export_queryset(year=None, statuses=None):
+    leave_requests = LeaveRequest.objects.all()
+    if year is not None:
+        # Exists αντί για join + distinct: κάθε αίτηση εμφανίζεται μία φορά και η σειρά κατά id μένει φθηνή
+        leave_requests = leave_requests.filter(Exists(LeaveInterval.objects.filter(
+            leave_request=OuterRef('pk'), start_date__lte=date(year, 12, 31), end_date__gte=date(year, 1, 1),
+        )))
+    if statuses:
+        leave_requests = leave_requests.filter(status__in=statuses)
+    return leave_requests.order_by('id').values_list(*REQUEST_FIELDS)
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE, year=None):
+    """Μία γραμμή ανά διάστημα άδειας, σε κομμάτια των chunk_size αιτήσεων.
+
+    Οι αιτήσεις διαβάζονται με iterator() χωρίς cache του queryset και τα
+    διαστήματα κάθε κομματιού φέρνονται με ένα query· οι εργάσιμες ημέρες
+    υπολογίζονται μαζικά για όλο το κομμάτι. Η μνήμη εξαρτάται μόνο από το
+    chunk_size, όχι από το σύνολο των γραμμών. Με year τα διαστήματα περικόπτονται
+    στο έτος, ώστε οι εργάσιμες (και τα σύνολα ανά αίτηση) να αφορούν μόνο αυτό.
+    """
+    for requests in _chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        intervals = LeaveInterval.objects.filter(leave_request_id__in=[row[0] for row in requests])
+        if year is not None:
+            first, last = date(year, 1, 1), date(year, 12, 31)
+            intervals = intervals.filter(start_date__lte=last, end_date__gte=first)
+        intervals = list(
+            intervals.order_by('leave_request_id', 'start_date', 'id')
+            .values_list('leave_request_id', 'start_date', 'end_date')
+        )
+        if year is not None:
+            intervals = [
+                (request_id, max(start_date, first), min(end_date, last)) for request_id, start_date, end_date in intervals
+            ]
+        days = count_working_days([start for _, start, _ in intervals], [end for _, _, end in intervals]).tolist()
+        by_request, totals = {}, {}
+        for (request_id, start_date, end_date), working_days in zip(intervals, days):
+            by_request.setdefault(request_id, []).append((start_date, end_date, working_days))
+            totals[request_id] = totals.get(request_id, 0) + working_days
+        for request_id, status, created_at, *rest in requests:
+            created = timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M') if created_at else None
+            for start_date, end_date, working_days in by_request.get(request_id, [(None, None, None)]):
+                yield [
+                    request_id, status, created, *rest,
+                    start_date, end_date, working_days, totals.get(request_id, 0),
+                ]
+
+
+class _Echo:
+    # Το csv.writer γράφει σε αυτό και επιστρέφει τη γραμμή, χωρίς buffer
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    # BOM ώστε το Excel να ανοίγει σωστά τα ελληνικά
+    yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(rows, target=None):
+    """Write-only βιβλίο του openpyxl: οι γραμμές γράφονται αμέσως σε προσωρινό
+    αρχείο, οπότε η μνήμη μένει σταθερή ανεξάρτητα από το πλήθος τους."""
+    target = target if target is not None else tempfile.TemporaryFile()
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('leave_requests')
+    sheet.append(EXPORT_COLUMNS)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(target)
+    if hasattr(target, 'seek'):
+        target.seek(0)
+    return target
+
+
+def export_filename(year, export_format):
+    return f"leave_export_{year or 'all'}.{export_format}"
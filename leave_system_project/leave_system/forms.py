@@ -1,6 +1,10 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.db.models import Exists, OuterRef
+from django.forms.models import BaseInlineFormSet, inlineformset_factory
 from django.contrib.auth.models import User
+# Τα ModelForm χρειάζονται το μοντέλο κατά τον ορισμό της κλάσης· το models.py δεν εισάγει το forms.py
+from .models import LeaveInterval, LeaveRequest
 
 class RegisterForm(UserCreationForm):
     email = forms.EmailField(required=True, label="Υπηρεσιακό Email στο @sch.gr")
@@ -44,29 +48,107 @@ class RegisterForm(UserCreationForm):
             user.groups.add(employee_group)
         return user
 
+class ReferenceChoiceField(forms.ChoiceField):
+    """Επιλογή από πίνακα αναφοράς· οι επιλογές και η επικύρωση έρχονται από τη μνήμη, χωρίς query."""
+
+    def __init__(self, table, *args, **kwargs):
+        from .reference import reference_data  # Εισαγωγή εδώ για αποφυγή κυκλικού import
+        self.table = table
+        self.reference_data = reference_data
+        kwargs['choices'] = lambda: [('', '---------')] + [(row.pk, str(row)) for row in reference_data.all(table)]
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        row = self.reference_data.get(self.table, getattr(value, 'pk', value))
+        if row is None:
+            raise forms.ValidationError(
+                self.error_messages['invalid_choice'], code='invalid_choice', params={'value': value},
+            )
+        return row
+
+    def validate(self, value):
+        forms.Field.validate(self, value)
+
 class LeaveRequestForm(forms.ModelForm):
+    leave_type = ReferenceChoiceField('leave_types', label="Τύπος Άδειας")
+    confirm_understaffing = forms.BooleanField(
+        required=False, label="Υποβολή παρά την υποστελέχωση του τμήματος",
+    )
+
     class Meta:
-        model = None  # Θα το αντικαταστήσουμε μετά
+        model = LeaveRequest
         fields = ['leave_type']
-        widgets = {
-            'leave_type': forms.Select(),
-        }
-
-    def __init__(self, *args, **kwargs):
-        from .models import LeaveRequest  # Εισαγωγή εδώ για αποφυγή κυκλικού import
-        self.Meta.model = LeaveRequest
-        super().__init__(*args, **kwargs)
 
 class LeaveIntervalForm(forms.ModelForm):
     class Meta:
-        model = None  # Θα το αντικαταστήσουμε μετά
+        model = LeaveInterval
         fields = ['start_date', 'end_date']
         widgets = {
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        start_date = cleaned_data.get('start_date')
+        end_date = cleaned_data.get('end_date')
+        if start_date and end_date and end_date < start_date:
+            raise forms.ValidationError("Η ημερομηνία λήξης είναι πριν από την ημερομηνία έναρξης.")
+        return cleaned_data
+
+class BaseLeaveIntervalFormSet(BaseInlineFormSet):
+    """Όλα τα διαστήματα μιας αίτησης· ελέγχονται μαζί για επικαλύψεις και υποστελέχωση."""
+
+    def __init__(self, *args, employee=None, confirm_understaffing=False, **kwargs):
+        self.employee = employee
+        self.confirm_understaffing = confirm_understaffing
+        self.submission = None
+        super().__init__(*args, **kwargs)
+
+    def intervals(self):
+        return [
+            (form.cleaned_data['start_date'], form.cleaned_data['end_date'])
+            for form in self.forms
+            if form.cleaned_data.get('start_date') and form.cleaned_data.get('end_date')
+        ]
+
+    def clean(self):
+        super().clean()
+        if any(self.errors) or self.employee is None:
+            return
+        from .submission import LeaveSubmission, validate_submissions  # Εισαγωγή εδώ για αποφυγή κυκλικού import
+        self.submission = LeaveSubmission(
+            employee=self.employee, intervals=self.intervals(), confirm_understaffing=self.confirm_understaffing,
+        )
+        if not validate_submissions([self.submission]):
+            raise forms.ValidationError(self.submission.errors)
+
+LeaveIntervalFormSet = inlineformset_factory(
+    LeaveRequest, LeaveInterval, form=LeaveIntervalForm, formset=BaseLeaveIntervalFormSet,
+    extra=2, min_num=1, validate_min=True, can_delete=False,
+)
+
+class LeaveRequestFilterForm(forms.Form):
+    status = forms.ChoiceField(required=False, label="Κατάσταση")
+    year = forms.IntegerField(required=False, min_value=2000, max_value=2100, label="Έτος")
+    leave_type = ReferenceChoiceField('leave_types', required=False, label="Τύπος Άδειας")
+
     def __init__(self, *args, **kwargs):
-        from .models import LeaveInterval  # Εισαγωγή εδώ για αποφυγή κυκλικού import
-        self.Meta.model = LeaveInterval
-        super().__init__(*args, **kwargs)
\ No newline at end of file
+        super().__init__(*args, **kwargs)
+        self.fields['status'].choices = [('', '---------')] + LeaveRequest.STATUS_CHOICES
+
+    def filter(self, queryset):
+        if not self.is_valid():
+            return queryset
+        if self.cleaned_data['status']:
+            queryset = queryset.filter(status=self.cleaned_data['status'])
+        if self.cleaned_data['leave_type']:
+            queryset = queryset.filter(leave_type=self.cleaned_data['leave_type'])
+        if self.cleaned_data['year']:
+            year = self.cleaned_data['year']
+            queryset = queryset.filter(Exists(LeaveInterval.objects.filter(
+                leave_request=OuterRef('pk'), start_date__lte=f'{year}-12-31', end_date__gte=f'{year}-01-01',
+            )))
+        return queryset
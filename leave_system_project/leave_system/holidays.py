@@ -0,0 +1,122 @@
+import calendar as _calendar
+import threading
+from array import array
+from datetime import date, timedelta
+
+from .reference import reference_data
+
+
+class HolidayCalendar:
+    """Κοινό (ανά διεργασία) ημερολόγιο εργάσιμων ημερών.
+
+    Για κάθε έτος κρατάμε ένα bitmap εργάσιμων ημερών και τα prefix sums του,
+    ώστε το πλήθος εργάσιμων σε οποιοδήποτε διάστημα να υπολογίζεται σε O(1)
+    ανά έτος χωρίς κανένα query. Οι αργίες έρχονται από την cache πινάκων
+    αναφοράς και τα bitmaps ξαναχτίζονται όταν αλλάξει η έκδοσή τους.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holiday_rows = None
+        self._years = {}
+        self._version = None
+
+    def invalidate(self):
+        with self._lock:
+            self._holiday_rows = None
+            self._years = {}
+        reference_data.invalidate('public_holidays')
+
+    def _load_holiday_rows(self):
+        return [
+            (holiday.day, holiday.month, holiday.year, holiday.is_fixed)
+            for holiday in reference_data.all('public_holidays')
+        ]
+
+    def holidays_for_year(self, year):
+        return self._get_year(year)[0]
+
+    def _get_year(self, year):
+        version = reference_data.version('public_holidays')
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._holiday_rows = None
+                    self._years = {}
+                    self._version = version
+        entry = self._years.get(year)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._years.get(year)
+            if entry is None:
+                if self._holiday_rows is None:
+                    self._holiday_rows = self._load_holiday_rows()
+                entry = self._build_year(year, self._holiday_rows)
+                self._years[year] = entry
+        return entry
+
+    @staticmethod
+    def _build_year(year, holiday_rows):
+        holidays = set()
+        for day, month, holiday_year, is_fixed in holiday_rows:
+            if not is_fixed and holiday_year != year:
+                continue
+            try:
+                holidays.add(date(year, month, day))
+            except ValueError:
+                # π.χ. σταθερή αργία 29/2 σε μη δίσεκτο έτος
+                continue
+
+        days_in_year = 366 if _calendar.isleap(year) else 365
+        first_day = date(year, 1, 1)
+        bitmap = bytearray(days_in_year)
+        prefix = array('H', [0]) * (days_in_year + 1)
+        for offset in range(days_in_year):
+            current = first_day + timedelta(days=offset)
+            if current.weekday() < 5 and current not in holidays:
+                bitmap[offset] = 1
+            prefix[offset + 1] = prefix[offset] + bitmap[offset]
+        return frozenset(holidays), bitmap, prefix
+
+    def holidays_between(self, start_year, end_year):
+        holidays = set()
+        for year in range(start_year, end_year + 1):
+            holidays |= self.holidays_for_year(year)
+        return sorted(holidays)
+
+    def is_working_day(self, day):
+        bitmap = self._get_year(day.year)[1]
+        return bool(bitmap[day.timetuple().tm_yday - 1])
+
+    def working_days_by_year(self, start_date, end_date):
+        days = {}
+        for year in range(start_date.year, end_date.year + 1):
+            first = max(start_date, date(year, 1, 1))
+            last = min(end_date, date(year, 12, 31))
+            days[year] = self.working_days(first, last)
+        return days
+
+    def working_days_by_month(self, start_date, end_date):
+        days = {}
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            first = max(start_date, date(year, month, 1))
+            last = min(end_date, date(year, month, _calendar.monthrange(year, month)[1]))
+            days[(year, month)] = self.working_days(first, last)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return days
+
+    def working_days(self, start_date, end_date):
+        if end_date < start_date:
+            return 0
+        total = 0
+        for year in range(start_date.year, end_date.year + 1):
+            prefix = self._get_year(year)[2]
+            first = start_date.timetuple().tm_yday - 1 if year == start_date.year else 0
+            last = end_date.timetuple().tm_yday if year == end_date.year else len(prefix) - 1
+            total += prefix[last] - prefix[first]
+        return total
+
+
+holiday_calendar = HolidayCalendar()
@@ -1,135 +1,524 @@
+import csv
+import hashlib
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import openpyxl
 import pandas as pd
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User, Group
-from leave_system.models import Specialty, Service, Department, EmployeeType, EmployeePosition, Employee, LeaveType, PublicHoliday, HeaderText
-
-def import_specialties(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        Specialty.objects.get_or_create(
-            name=row['name'],
-            short_name=row['short_name']
-        )
+from django.db import transaction
+from django.utils import timezone
+from leave_system.absences import invalidate_absences
+from leave_system.holidays import holiday_calendar
+from leave_system.leave_statistics import sync_employee_statistics
+from leave_system.reference import reference_data
+from leave_system.roles import invalidate_roles
+from leave_system.models import rebuild_department_closure, Specialty, Service, Department, EmployeeType, EmployeePosition, Employee, LeaveType, PublicHoliday, HeaderText
+
+BATCH_SIZE = 500
+
+EMPLOYEE_FIELDS = [
+    'user', 'name_in_accusative', 'surname_in_accusative', 'father_name_in_genitive', 'specialty',
+    'current_service', 'department', 'employee_type', 'role_description', 'notification_recipients',
+    'regular_leave_days', 'carryover_leave_days', 'gender', 'personal_email', 'position', 'is_active', 'phone',
+    'roster_fingerprint', 'updated_at',
+]
+
+
+class ImportEngine:
+    """Μαζική εισαγωγή: οι πίνακες αναφοράς φορτώνονται μία φορά σε χάρτες name→id
+    και οι εγγραφές γράφονται με bulk_create/bulk_update, χωρίς queries ανά γραμμή."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.timings = {}
+        self.errors = []
+        self.counts = defaultdict(lambda: defaultdict(int))
+        self.pending_heads = {}
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - started
+
+    def error(self, source, row_number, message):
+        self.errors.append((source, row_number, message))
+
+    def read(self, file_path):
+        with self.phase(f'read {file_path}'):
+            df = pd.read_excel(file_path)
+            df = df.astype(object).where(pd.notna(df), None)
+            # Η γραμμή 1 του φύλλου είναι οι επικεφαλίδες
+            return [(index + 2, row) for index, row in enumerate(df.to_dict('records'))]
+
+    def name_map(self, model, field='name'):
+        return dict(model.objects.values_list(field, 'id'))
+
+    def create_missing(self, model, source, rows, key_fields, build):
+        existing = set(model.objects.values_list(*key_fields))
+        new_objects = []
+        for row_number, row in rows:
+            try:
+                obj = build(row)
+            except Exception as e:
+                self.error(source, row_number, str(e))
+                continue
+            key = tuple(getattr(obj, field) for field in key_fields)
+            if key in existing:
+                self.counts[source]['unchanged'] += 1
+                continue
+            existing.add(key)
+            new_objects.append(obj)
+        model.objects.bulk_create(new_objects, batch_size=BATCH_SIZE)
+        self.counts[source]['created'] += len(new_objects)
+        return new_objects
+
+    def resolve_department_heads(self):
+        if not self.pending_heads:
+            return
+        with self.phase('department heads'):
+            employees = dict(Employee.objects.filter(sch_email__in=set(self.pending_heads.values())).values_list('sch_email', 'id'))
+            departments = list(Department.objects.filter(id__in=self.pending_heads))
+            for department in departments:
+                email = self.pending_heads[department.id]
+                if email in employees:
+                    department.head_id = employees[email]
+                else:
+                    self.error('departments', None, f"Department head {email} not found")
+            with_head = [department for department in departments if department.head_id]
+            Department.objects.bulk_update(with_head, ['head'], batch_size=BATCH_SIZE)
+            # Το bulk_update παρακάμπτει το Department.save, οπότε ο ρόλος ανατίθεται εδώ
+            user_ids = Employee.objects.filter(
+                id__in=[department.head_id for department in with_head], user__isnull=False
+            ).values_list('user_id', flat=True)
+            add_users_to_group(user_ids, 'DepartmentHeads')
+            self.pending_heads = {}
+
+    def summary(self):
+        lines = []
+        for source, counts in self.counts.items():
+            lines.append(f"{source}: " + ', '.join(f"{key}={value}" for key, value in sorted(counts.items())))
+        for name, seconds in self.timings.items():
+            lines.append(f"{name}: {seconds:.3f}s")
+        return lines
+
+
+def as_text(value):
+    # Το Excel επιστρέφει τους αριθμούς τηλεφώνου ως float
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value) if value is not None else None
+
+
+def add_users_to_group(user_ids, group_name):
+    group = Group.objects.get(name=group_name)
+    through = User.groups.through
+    user_ids = list(user_ids)
+    through.objects.bulk_create(
+        [through(user_id=user_id, group_id=group.id) for user_id in user_ids],
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+    # Το bulk_create στον ενδιάμεσο πίνακα δεν στέλνει m2m_changed
+    invalidate_roles(user_ids)
+
+
+def import_specialties(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('specialties'):
+        engine.create_missing(Specialty, 'specialties', rows, ('name', 'short_name'),
+                              lambda row: Specialty(name=row['name'], short_name=row['short_name']))
     print("Specialties imported successfully.")
 
-def import_services(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        Service.objects.get_or_create(
-            name=row['name']
-        )
+def import_services(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('services'):
+        engine.create_missing(Service, 'services', rows, ('name',), lambda row: Service(name=row['name']))
     print("Services imported successfully.")
 
-def import_departments(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        service = Service.objects.get(name=row['service_name'])
-        head = Employee.objects.get(sch_email=row['head_email']) if row['head_email'] else None
-        Department.objects.get_or_create(
-            name=row['name'],
-            service=service,
-            defaults={'head': head}
-        )
+def import_departments(file_path, engine=None):
+    standalone = engine is None
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('departments'):
+        services = engine.name_map(Service)
+        existing = {(name, service_id): pk for pk, name, service_id in Department.objects.values_list('id', 'name', 'service_id')}
+        new_departments = []
+        heads = {}
+        for row_number, row in rows:
+            service_id = services.get(row['service_name'])
+            if service_id is None:
+                engine.error('departments', row_number, f"Service {row['service_name']} not found")
+                continue
+            key = (row['name'], service_id)
+            if key in existing:
+                engine.counts['departments']['unchanged'] += 1
+                continue
+            existing[key] = None
+            new_departments.append(Department(name=row['name'], service_id=service_id))
+            if row.get('head_email'):
+                heads[key] = row['head_email']
+        Department.objects.bulk_create(new_departments, batch_size=BATCH_SIZE)
+        engine.counts['departments']['created'] += len(new_departments)
+        if new_departments:
+            # Το bulk_create παρακάμπτει το Department.save που συντηρεί την ιεραρχία
+            rebuild_department_closure()
+        if heads:
+            # Οι προϊστάμενοι μπορεί να μην έχουν εισαχθεί ακόμα· επιλύονται μετά τους υπαλλήλους
+            for pk, name, service_id in Department.objects.values_list('id', 'name', 'service_id'):
+                if (name, service_id) in heads:
+                    engine.pending_heads[pk] = heads[(name, service_id)]
+    if standalone:
+        engine.resolve_department_heads()
     print("Departments imported successfully.")
 
-def import_employee_types(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        EmployeeType.objects.get_or_create(
-            name=row['name']
-        )
+def import_employee_types(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('employee types'):
+        engine.create_missing(EmployeeType, 'employee types', rows, ('name',), lambda row: EmployeeType(name=row['name']))
     print("Employee Types imported successfully.")
 
-def import_employee_positions(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        EmployeePosition.objects.get_or_create(
-            name=row['name']
-        )
+def import_employee_positions(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('employee positions'):
+        engine.create_missing(EmployeePosition, 'employee positions', rows, ('name',), lambda row: EmployeePosition(name=row['name']))
     print("Employee Positions imported successfully.")
 
-def import_employees(file_path):
-    df = pd.read_excel(file_path)
-    employee_group = Group.objects.get(name='Employee')
-    for _, row in df.iterrows():
-        user, _ = User.objects.get_or_create(
-            username=row['sch_email'],
-            email=row['sch_email'],
-            defaults={'password': User.objects.make_random_password()}
-        )
-        user.groups.add(employee_group)
-        specialty = Specialty.objects.get(name=row['specialty_name'])
-        current_service = Service.objects.get(name=row['current_service_name'])
-        department = Department.objects.get(name=row['department_name'])
-        employee_type = EmployeeType.objects.get(name=row['employee_type_name'])
-        position = EmployeePosition.objects.get(name=row['position_name'])
-        Employee.objects.get_or_create(
-            user=user,
-            name_in_accusative=row['name_in_accusative'],
-            surname_in_accusative=row['surname_in_accusative'],
-            father_name_in_genitive=row['father_name_in_genitive'],
-            specialty=specialty,
-            current_service=current_service,
-            department=department,
-            employee_type=employee_type,
-            role_description=row['role_description'],
-            notification_recipients=row['notification_recipients'],
-            regular_leave_days=row['regular_leave_days'],
-            carryover_leave_days=row['carryover_leave_days'],
-            gender=row['gender'],
-            sch_email=row['sch_email'],
-            personal_email=row['personal_email'],
-            position=position,
-            is_active=row['is_active'],
-            phone=row['phone']
-        )
+def as_int(value):
+    return int(float(value)) if value is not None else 0
+
+
+def as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'ναι', 'ν')
+    return bool(value)
+
+
+def department_map():
+    # Τμήματα με ίδιο όνομα σε διαφορετικές υπηρεσίες είναι νόμιμα· το κλειδί είναι (τμήμα, υπηρεσία).
+    # Όσα ζεύγη αντιστοιχούν σε περισσότερα από ένα τμήματα μένουν με None ώστε να αναφερθούν ως ασαφή
+    mapping = {}
+    for pk, name, service_name in Department.objects.values_list('id', 'name', 'service__name'):
+        key = (name, service_name)
+        mapping[key] = None if key in mapping else pk
+    return mapping
+
+
+def employee_lookups(engine):
+    with engine.phase('employees: reference maps'):
+        return {
+            'specialty': ('specialty_name', engine.name_map(Specialty)),
+            'current_service': ('current_service_name', engine.name_map(Service)),
+            'department': (('department_name', 'current_service_name'), department_map()),
+            'employee_type': ('employee_type_name', engine.name_map(EmployeeType)),
+            'position': ('position_name', engine.name_map(EmployeePosition)),
+        }
+
+
+def ensure_users(engine, emails):
+    with engine.phase('employees: users'):
+        users = dict(User.objects.filter(username__in=emails).values_list('username', 'id'))
+        new_users = [
+            User(username=email, email=email, password=make_password(None))
+            for email in sorted(set(emails) - set(users))
+        ]
+        if new_users:
+            User.objects.bulk_create(new_users, batch_size=BATCH_SIZE)
+            engine.counts['users']['created'] += len(new_users)
+            users = dict(User.objects.filter(username__in=emails).values_list('username', 'id'))
+            add_users_to_group([users[user.username] for user in new_users], 'Employee')
+        return users
+
+
+def employee_values(row, lookups):
+    values = {}
+    missing, ambiguous = [], []
+    for field, (column, mapping) in lookups.items():
+        if isinstance(column, tuple):
+            key = tuple(row.get(part) for part in column)
+            label = ', '.join(f"{part}={row.get(part)}" for part in column)
+        else:
+            key, label = row.get(column), f"{column}={row.get(column)}"
+        values[f'{field}_id'] = mapping.get(key)
+        if values[f'{field}_id'] is None:
+            (ambiguous if key in mapping else missing).append(label)
+    if missing or ambiguous:
+        problems = []
+        if missing:
+            problems.append("Not found: " + ', '.join(missing))
+        if ambiguous:
+            problems.append("Ambiguous: " + ', '.join(ambiguous))
+        return None, '; '.join(problems)
+    values.update(
+        name_in_accusative=row['name_in_accusative'],
+        surname_in_accusative=row['surname_in_accusative'],
+        father_name_in_genitive=row['father_name_in_genitive'],
+        role_description=row.get('role_description'),
+        notification_recipients=row.get('notification_recipients'),
+        regular_leave_days=as_int(row.get('regular_leave_days')),
+        carryover_leave_days=as_int(row.get('carryover_leave_days')),
+        gender=row['gender'],
+        personal_email=row.get('personal_email'),
+        is_active=as_bool(row.get('is_active')),
+        phone=as_text(row.get('phone')),
+    )
+    values['roster_fingerprint'] = roster_fingerprint(values)
+    return values, None
+
+
+def roster_fingerprint(values):
+    payload = json.dumps([[key, values[key]] for key in sorted(values) if key != 'user_id'], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def import_employees(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    lookups = employee_lookups(engine)
+
+    with engine.phase('employees: validate'):
+        names = {
+            tuple(name): email for *name, email in Employee.objects.values_list(
+                'name_in_accusative', 'surname_in_accusative', 'father_name_in_genitive', 'sch_email')
+        }
+        valid_rows = []
+        for row_number, row in rows:
+            email = row.get('sch_email')
+            if not email:
+                engine.error('employees', row_number, "Missing sch_email")
+                continue
+            values, error = employee_values(row, lookups)
+            if error:
+                engine.error('employees', row_number, error)
+                continue
+            name = (values['name_in_accusative'], values['surname_in_accusative'], values['father_name_in_genitive'])
+            if names.setdefault(name, email) != email:
+                engine.error('employees', row_number, f"Employee {' '.join(name)} already exists as {names[name]}")
+                continue
+            valid_rows.append((email, values))
+
+    # Χρήστες μόνο για τις έγκυρες γραμμές, ώστε μια γραμμή με σφάλμα να μην αφήνει ορφανό User
+    users = ensure_users(engine, {email for email, _ in valid_rows})
+
+    with engine.phase('employees: write'):
+        existing = {employee.sch_email: employee for employee in Employee.objects.filter(sch_email__in=users)}
+        to_create, to_update, moved = [], [], set()
+        for email, values in valid_rows:
+            values['user_id'] = users[email]
+            employee = existing.get(email)
+            if employee is None:
+                employee = Employee(sch_email=email, **values)
+                existing[email] = employee
+                to_create.append(employee)
+            else:
+                if employee.pk and (employee.department_id, employee.current_service_id) != (
+                        values['department_id'], values['current_service_id']):
+                    moved.add(employee.pk)
+                for field, value in values.items():
+                    setattr(employee, field, value)
+                if employee.pk:
+                    to_update.append(employee)
+        Employee.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+        # Το bulk_update δεν ενημερώνει τα auto_now πεδία
+        now = timezone.now()
+        for employee in to_update:
+            employee.updated_at = now
+        Employee.objects.bulk_update(to_update, EMPLOYEE_FIELDS, batch_size=BATCH_SIZE)
+        # Το bulk_update δεν στέλνει signals· οι αιτήσεις όσων άλλαξαν τμήμα μεταφέρονται στα στατιστικά
+        sync_employee_statistics(moved)
+        engine.counts['employees']['created'] += len(to_create)
+        engine.counts['employees']['updated'] += len(to_update)
     print("Employees imported successfully.")
 
-def import_leave_types(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        LeaveType.objects.get_or_create(
-            name=row['name'],
-            short_name=row['short_name'],
-            subject_text=row['subject_text'],
-            decision_text=row['decision_text']
+def iter_row_chunks(file_path, chunk_size=1000):
+    # Ανάγνωση σε κομμάτια, χωρίς φόρτωση ολόκληρου του φύλλου σε DataFrame
+    if file_path.lower().endswith('.csv'):
+        with open(file_path, newline='', encoding='utf-8-sig') as csv_file:
+            reader = csv.reader(csv_file)
+            yield from _chunk_rows(next(reader, []), reader, chunk_size)
+        return
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        yield from _chunk_rows(next(rows, ()), rows, chunk_size)
+    finally:
+        workbook.close()
+
+def _chunk_rows(header, rows, chunk_size):
+    header = [str(column).strip() if column is not None else '' for column in header]
+    chunk = []
+    for row_number, values in enumerate(rows, start=2):
+        row = {column: (None if value == '' else value) for column, value in zip(header, values)}
+        if not any(value is not None for value in row.values()):
+            continue
+        chunk.append((row_number, row))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def sync_employees(file_path, engine=None, chunk_size=1000, deactivate_missing=True):
+    engine = engine or ImportEngine()
+    lookups = employee_lookups(engine)
+    with engine.phase('sync: fingerprints'):
+        existing = {
+            email: (pk, fingerprint)
+            for pk, email, fingerprint in Employee.objects.filter(sch_email__isnull=False)
+            .values_list('id', 'sch_email', 'roster_fingerprint')
+        }
+        names = {
+            tuple(name): email for *name, email in Employee.objects.values_list(
+                'name_in_accusative', 'surname_in_accusative', 'father_name_in_genitive', 'sch_email')
+        }
+    seen = set()
+
+    for chunk in iter_row_chunks(file_path, chunk_size):
+        with engine.phase('sync: diff'):
+            new_rows, changed = [], {}
+            for row_number, row in chunk:
+                email = row.get('sch_email')
+                if not email:
+                    engine.error('employees', row_number, "Missing sch_email")
+                    continue
+                if email in seen:
+                    engine.error('employees', row_number, f"Duplicate sch_email {email}")
+                    continue
+                seen.add(email)
+                values, error = employee_values(row, lookups)
+                if error:
+                    engine.error('employees', row_number, error)
+                    continue
+                current = existing.get(email)
+                if current is not None and current[1] == values['roster_fingerprint']:
+                    engine.counts['employees']['unchanged'] += 1
+                    continue
+                name = (values['name_in_accusative'], values['surname_in_accusative'], values['father_name_in_genitive'])
+                if names.setdefault(name, email) != email:
+                    engine.error('employees', row_number, f"Employee {' '.join(name)} already exists as {names[name]}")
+                    continue
+                if current is None:
+                    new_rows.append((row_number, email, values))
+                else:
+                    changed[current[0]] = values
+
+        if new_rows:
+            users = ensure_users(engine, [email for _, email, _ in new_rows])
+            with engine.phase('sync: create'):
+                employees = [Employee(sch_email=email, user_id=users[email], **values) for _, email, values in new_rows]
+                Employee.objects.bulk_create(employees, batch_size=BATCH_SIZE)
+                engine.counts['employees']['created'] += len(employees)
+
+        if changed:
+            with engine.phase('sync: update'):
+                employees = list(Employee.objects.filter(id__in=changed))
+                now = timezone.now()
+                moved = []
+                for employee in employees:
+                    values = changed[employee.id]
+                    if (employee.department_id, employee.current_service_id) != (
+                            values['department_id'], values['current_service_id']):
+                        moved.append(employee.id)
+                    for field, value in values.items():
+                        setattr(employee, field, value)
+                    employee.updated_at = now
+                Employee.objects.bulk_update(employees, EMPLOYEE_FIELDS, batch_size=BATCH_SIZE)
+                sync_employee_statistics(moved)
+                engine.counts['employees']['updated'] += len(employees)
+
+    if deactivate_missing:
+        with engine.phase('sync: deactivate'):
+            # Μόνο όσοι προήλθαν από το μητρώο· οι εγγραφές μέσω register δεν αγγίζονται
+            missing = [pk for email, (pk, fingerprint) in existing.items() if email not in seen and fingerprint]
+            for start in range(0, len(missing), BATCH_SIZE):
+                Employee.objects.filter(id__in=missing[start:start + BATCH_SIZE]).update(
+                    is_active=False, roster_fingerprint=None, updated_at=timezone.now(),
+                )
+            engine.counts['employees']['deactivated'] += len(missing)
+    # Το bulk_update μπορεί να μετακίνησε υπαλλήλους σε άλλα τμήματα χωρίς signals
+    transaction.on_commit(invalidate_absences)
+    print("Employees synchronized successfully.")
+    return engine
+
+def import_leave_types(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('leave types'):
+        engine.create_missing(
+            LeaveType, 'leave types', rows, ('name', 'short_name', 'subject_text', 'decision_text'),
+            lambda row: LeaveType(name=row['name'], short_name=row['short_name'],
+                                  subject_text=row['subject_text'], decision_text=row['decision_text']),
         )
     print("Leave Types imported successfully.")
 
-def import_public_holidays(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        year = row['year'] if not pd.isna(row['year']) else None
-        PublicHoliday.objects.get_or_create(
-            name=row['name'],
-            day=row['day'],
-            month=row['month'],
-            year=year,
-            is_fixed=row['is_fixed']
+def import_public_holidays(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('public holidays'):
+        engine.create_missing(
+            PublicHoliday, 'public holidays', rows, ('name', 'day', 'month', 'year', 'is_fixed'),
+            lambda row: PublicHoliday(
+                name=row['name'], day=int(row['day']), month=int(row['month']),
+                year=int(row['year']) if row['year'] is not None else None, is_fixed=bool(row['is_fixed']),
+            ),
         )
+        # Το bulk_create δεν στέλνει post_save
+        transaction.on_commit(holiday_calendar.invalidate)
+        transaction.on_commit(invalidate_absences)
     print("Public Holidays imported successfully.")
 
-def import_header_texts(file_path):
-    df = pd.read_excel(file_path)
-    for _, row in df.iterrows():
-        HeaderText.objects.get_or_create(
-            text=row['text'],
-            is_active=row['is_active']
+def import_header_texts(file_path, engine=None):
+    engine = engine or ImportEngine()
+    rows = engine.read(file_path)
+    with engine.phase('header texts'):
+        created = engine.create_missing(
+            HeaderText, 'header texts', rows, ('text',),
+            lambda row: HeaderText(text=row['text'], is_active=bool(row['is_active'])),
         )
+        active = [header for header in created if header.is_active]
+        if active:
+            # Όπως στο HeaderText.save: ενεργή μένει μόνο η τελευταία
+            HeaderText.objects.exclude(id=active[-1].id).update(is_active=False)
     print("Header Texts imported successfully.")
 
-def import_all_data():
+IMPORTS = [
+    ('specialties', import_specialties),
+    ('services', import_services),
+    ('departments', import_departments),
+    ('employee_types', import_employee_types),
+    ('employee_positions', import_employee_positions),
+    ('employees', import_employees),
+    ('leave_types', import_leave_types),
+    ('public_holidays', import_public_holidays),
+    ('header_texts', import_header_texts),
+]
+
+def import_all_data(data_dir='data', dry_run=False, only=None):
+    engine = ImportEngine(dry_run=dry_run)
     try:
-        import_specialties('data/specialties.xlsx')
-        import_services('data/services.xlsx')
-        import_departments('data/departments.xlsx')
-        import_employee_types('data/employee_types.xlsx')
-        import_employee_positions('data/employee_positions.xlsx')
-        import_employees('data/employees.xlsx')
-        import_leave_types('data/leave_types.xlsx')
-        import_public_holidays('data/public_holidays.xlsx')
-        import_header_texts('data/header_texts.xlsx')
+        with transaction.atomic():
+            for name, import_function in IMPORTS:
+                if only and name not in only:
+                    continue
+                import_function(f'{data_dir}/{name}.xlsx', engine)
+            engine.resolve_department_heads()
+            # Το bulk_create δεν στέλνει signals στους πίνακες αναφοράς
+            transaction.on_commit(reference_data.invalidate)
+            if dry_run:
+                transaction.set_rollback(True)
     except Exception as e:
+        engine.error('import', None, str(e))
         print(f"Error during import: {str(e)}")
+    return engine
 
 if __name__ == "__main__":
-    import_all_data()
\ No newline at end of file
+    import_all_data()
@@ -0,0 +1,136 @@
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from pypdf import PdfWriter
+
+from .absences import invalidate_request_absences
+from .decision_files import write_atomic
+from .leave_statistics import sync_request_statistics
+from .models import LeaveRequest
+from .notifications import queue_decision_notifications
+from .pdf import decision_renderer
+
+
+@dataclass
+class IssueResult:
+    issued: list = field(default_factory=list)
+    failed: dict = field(default_factory=dict)
+    merged_path: str = None
+    elapsed: float = 0.0
+
+    @property
+    def documents_per_second(self):
+        return len(self.issued) / self.elapsed if self.elapsed else 0.0
+
+
+def assign_protocol_data(leave_requests, protocol_start=None, final_signatory=None, processed_by=None):
+    leave_requests = list(leave_requests)
+    next_number = protocol_start
+    update_fields = set()
+    for leave_request in leave_requests:
+        if next_number is not None and not leave_request.protocol_number:
+            leave_request.protocol_number = str(next_number)
+            next_number += 1
+            update_fields.add('protocol_number')
+        if final_signatory and not leave_request.final_signatory:
+            leave_request.final_signatory = final_signatory
+            update_fields.add('final_signatory')
+        if processed_by and not leave_request.processed_by_id:
+            leave_request.processed_by = processed_by
+            update_fields.add('processed_by')
+    if update_fields:
+        now = timezone.now()
+        for leave_request in leave_requests:
+            leave_request.updated_at = now
+        update_fields.add('updated_at')
+        with transaction.atomic():
+            LeaveRequest.objects.bulk_update(leave_requests, sorted(update_fields), batch_size=500)
+    return leave_requests
+
+
+def _render_one(leave_request_id):
+    try:
+        leave_request = LeaveRequest.objects.select_related(
+            'employee', 'employee__current_service', 'leave_type', 'processed_by'
+        ).get(id=leave_request_id)
+        leave_request.render_decision_pdf()
+        return leave_request_id, {
+            'decision_pdf': leave_request.decision_pdf.name,
+            'decision_fingerprint': leave_request.decision_fingerprint,
+            'processed_by_name': leave_request.processed_by_name,
+            'processed_by_phone': leave_request.processed_by_phone,
+        }, None
+    except Exception:
+        return leave_request_id, None, traceback.format_exc()
+
+
+def _init_worker():
+    # Κάθε διεργασία ανοίγει τη δική της σύνδεση στη βάση
+    connections.close_all()
+    decision_renderer.warm_up()
+
+
+def _merge(leave_requests, merged_path):
+    # Ένωση των αρχείων που έγραψαν ήδη οι workers· κανένα νέο render στη γονική διεργασία
+    writer = PdfWriter()
+    for leave_request in leave_requests:
+        writer.append(os.path.join(settings.MEDIA_ROOT, leave_request.decision_pdf.name))
+    write_atomic(os.path.abspath(merged_path), writer.write)
+
+
+def issue_decisions(leave_requests, processes=None, merged_path=None, protocol_start=None,
+                    final_signatory=None, processed_by=None):
+    started = time.perf_counter()
+    leave_requests = assign_protocol_data(
+        leave_requests.filter(status='APPROVED').order_by('id'),
+        protocol_start=protocol_start, final_signatory=final_signatory, processed_by=processed_by,
+    )
+    result = IssueResult()
+    rendered = {}
+
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as pool:
+        futures = [pool.submit(_render_one, leave_request.id) for leave_request in leave_requests]
+        for future in as_completed(futures):
+            leave_request_id, data, error = future.result()
+            if error:
+                result.failed[leave_request_id] = error
+            else:
+                rendered[leave_request_id] = data
+
+    issued = []
+    for leave_request in leave_requests:
+        data = rendered.get(leave_request.id)
+        if data is None:
+            continue
+        leave_request.decision_pdf.name = data['decision_pdf']
+        leave_request.decision_fingerprint = data['decision_fingerprint']
+        leave_request.processed_by_name = data['processed_by_name']
+        leave_request.processed_by_phone = data['processed_by_phone']
+        leave_request.status = 'ISSUED'
+        leave_request.updated_at = timezone.now()
+        issued.append(leave_request)
+    with transaction.atomic():
+        LeaveRequest.objects.bulk_update(
+            issued,
+            ['decision_pdf', 'decision_fingerprint', 'processed_by_name', 'processed_by_phone', 'status', 'updated_at'],
+            batch_size=500,
+        )
+        # Το bulk_update δεν στέλνει signals· η αλλαγή κατάστασης μεταφέρει τις ημέρες στο ISSUED
+        sync_request_statistics([leave_request.id for leave_request in issued])
+        invalidate_request_absences([leave_request.id for leave_request in issued])
+        queue_decision_notifications([leave_request.id for leave_request in issued])
+    result.issued = [leave_request.id for leave_request in issued]
+
+    if merged_path and issued:
+        _merge(issued, merged_path)
+        result.merged_path = merged_path
+
+    result.elapsed = time.perf_counter() - started
+    return result
@@ -0,0 +1,100 @@
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .absences import invalidate_request_absences
+from .leave_statistics import sync_request_statistics
+from .models import DecisionJob, LeaveRequest
+from .notifications import queue_decision_notifications
+from .pdf import decision_renderer
+
+logger = logging.getLogger(__name__)
+
+RETRY_BACKOFF_SECONDS = 30
+STALE_LOCK_SECONDS = 600
+
+
+def enqueue_decision_pdf(leave_request, max_attempts=3):
+    with transaction.atomic():
+        LeaveRequest.objects.filter(pk=leave_request.pk).update(status='GENERATING', updated_at=timezone.now())
+        leave_request.status = 'GENERATING'
+        sync_request_statistics([leave_request.pk])
+        invalidate_request_absences([leave_request.pk])
+        job = DecisionJob.objects.filter(leave_request=leave_request, status__in=['QUEUED', 'RUNNING']).first()
+        if job is None:
+            job = DecisionJob.objects.create(leave_request=leave_request, max_attempts=max_attempts)
+    return job
+
+
+def requeue_stale_jobs():
+    # Εργασίες που έμειναν RUNNING από worker που τερματίστηκε απότομα
+    cutoff = timezone.now() - timedelta(seconds=STALE_LOCK_SECONDS)
+    return DecisionJob.objects.filter(status='RUNNING', locked_at__lt=cutoff).update(status='QUEUED', locked_at=None)
+
+
+def claim_next_job():
+    now = timezone.now()
+    candidates = DecisionJob.objects.filter(status='QUEUED', available_at__lte=now).order_by('available_at', 'id')
+    for job_id in candidates.values_list('id', flat=True)[:10]:
+        # Το conditional UPDATE είναι atomic και σε SQLite, οπότε μόνο ένας worker παίρνει την εργασία
+        claimed = DecisionJob.objects.filter(id=job_id, status='QUEUED').update(
+            status='RUNNING', locked_at=now, updated_at=now,
+        )
+        if claimed:
+            return DecisionJob.objects.select_related('leave_request').get(id=job_id)
+    return None
+
+
+def run_job(job):
+    job.attempts += 1
+    try:
+        job.leave_request.generate_decision_pdf()
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = 'QUEUED'
+            job.available_at = timezone.now() + timedelta(seconds=RETRY_BACKOFF_SECONDS * job.attempts)
+        else:
+            job.status = 'FAILED'
+            # Η αίτηση επιστρέφει σε APPROVED ώστε να μπορεί να ξαναεκδοθεί
+            LeaveRequest.objects.filter(pk=job.leave_request_id, status='GENERATING').update(
+                status='APPROVED', updated_at=timezone.now(),
+            )
+            sync_request_statistics([job.leave_request_id])
+            invalidate_request_absences([job.leave_request_id])
+        logger.exception("Decision PDF job %s failed (attempt %s/%s)", job.id, job.attempts, job.max_attempts)
+    else:
+        job.status = 'DONE'
+        job.last_error = None
+        # Η αποστολή γίνεται από τον worker ειδοποιήσεων, όχι εδώ
+        queue_decision_notifications([job.leave_request_id])
+    job.locked_at = None
+    job.save()
+    return job
+
+
+def run_pending_jobs(limit=None):
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+def worker_loop(poll_interval=1.0, stop_event=None):
+    # Φόρτωση του WeasyPrint (stylesheet, γραμματοσειρές) μία φορά ανά διεργασία
+    decision_renderer.warm_up()
+    while stop_event is None or not stop_event.is_set():
+        close_old_connections()
+        job = claim_next_job()
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
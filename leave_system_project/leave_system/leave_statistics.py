@@ -0,0 +1,288 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Max, Min, Sum
+
+from .holidays import holiday_calendar
+from .ledger import USED_STATUSES
+from .models import CalendarDay, Department, LeaveInterval, LeaveRequest, LeaveStatistic
+from .reference import reference_data
+
+SYNC_CHUNK_SIZE = 500
+KEY_FIELDS = ('service_id', 'department_id', 'leave_type_id', 'status', 'year', 'month')
+
+
+def contribution(status, service_id, department_id, leave_type_id, intervals):
+    """Τι προσθέτει μια αίτηση στα στατιστικά: εργάσιμες ημέρες ανά μήνα και μία
+    αίτηση στον μήνα του πρώτου της διαστήματος."""
+    intervals = [(start_date, end_date) for start_date, end_date in intervals if end_date >= start_date]
+    if not intervals:
+        return {}
+    months = defaultdict(lambda: [0, 0])
+    for start_date, end_date in intervals:
+        for (year, month), days in holiday_calendar.working_days_by_month(start_date, end_date).items():
+            if days:
+                months[f'{year}-{month}'][0] += days
+    first = min(start_date for start_date, _ in intervals)
+    months[f'{first.year}-{first.month}'][1] += 1
+    return {
+        'key': [service_id or 0, department_id or 0, leave_type_id, status],
+        'months': dict(sorted(months.items())),
+    }
+
+
+def _deltas(snapshot, sign, deltas):
+    if not snapshot:
+        return
+    for period, (days, requests) in snapshot['months'].items():
+        year, month = map(int, period.split('-'))
+        delta = deltas[(*snapshot['key'], year, month)]
+        delta[0] += sign * days
+        delta[1] += sign * requests
+
+
+def _apply(deltas):
+    for key, (days, requests) in deltas.items():
+        if not days and not requests:
+            continue
+        cells = LeaveStatistic.objects.filter(**dict(zip(KEY_FIELDS, key)))
+        if cells.update(days=F('days') + days, requests=F('requests') + requests):
+            continue
+        try:
+            # Όπως στο ledger: η γραμμή μπορεί να δημιουργήθηκε από ταυτόχρονη συναλλαγή
+            with transaction.atomic():
+                LeaveStatistic.objects.create(**dict(zip(KEY_FIELDS, key)), days=days, requests=requests)
+        except IntegrityError:
+            cells.update(days=F('days') + days, requests=F('requests') + requests)
+
+
+def _intervals_by_request(leave_request_ids):
+    intervals = defaultdict(list)
+    for leave_request_id, start_date, end_date in LeaveInterval.objects.filter(
+        leave_request_id__in=leave_request_ids
+    ).values_list('leave_request_id', 'start_date', 'end_date'):
+        intervals[leave_request_id].append((start_date, end_date))
+    return intervals
+
+
+def sync_request_statistics(leave_request_ids):
+    """Ενημέρωση των στατιστικών για αιτήσεις που άλλαξαν (κατάσταση, διαστήματα, τμήμα).
+
+    Όπως στο ledger: η νέα συνεισφορά συγκρίνεται με το snapshot της αίτησης και
+    εφαρμόζεται μόνο η διαφορά, με δύο queries ανάγνωσης ανά κομμάτι αιτήσεων.
+    """
+    leave_request_ids = list(leave_request_ids)
+    for start in range(0, len(leave_request_ids), SYNC_CHUNK_SIZE):
+        chunk = leave_request_ids[start:start + SYNC_CHUNK_SIZE]
+        with transaction.atomic():
+            rows = list(LeaveRequest.objects.select_for_update(of=('self',)).filter(pk__in=chunk).values_list(
+                'id', 'status', 'employee__current_service_id', 'employee__department_id', 'leave_type_id',
+                'statistics_snapshot',
+            ))
+            intervals = _intervals_by_request([row[0] for row in rows])
+            deltas = defaultdict(lambda: [0, 0])
+            changed = []
+            for leave_request_id, status, service_id, department_id, leave_type_id, old_snapshot in rows:
+                new_snapshot = contribution(
+                    status, service_id, department_id, leave_type_id, intervals.get(leave_request_id, ()),
+                )
+                if new_snapshot == (old_snapshot or {}):
+                    continue
+                _deltas(old_snapshot, -1, deltas)
+                _deltas(new_snapshot, 1, deltas)
+                changed.append(LeaveRequest(id=leave_request_id, statistics_snapshot=new_snapshot))
+            _apply(deltas)
+            LeaveRequest.objects.bulk_update(changed, ['statistics_snapshot'], batch_size=SYNC_CHUNK_SIZE)
+
+
+def sync_employee_statistics(employee_ids):
+    # Μετακίνηση υπαλλήλου σε άλλο τμήμα ή υπηρεσία: οι αιτήσεις του αλλάζουν κελί
+    sync_request_statistics(LeaveRequest.objects.filter(employee_id__in=list(employee_ids)).values_list('id', flat=True))
+
+
+def record_new_request_statistics(items):
+    """Στατιστικά για αιτήσεις που δημιουργούνται με bulk_create (χωρίς signals).
+
+    items: [(leave_request, [(start, end), ...])] με φορτωμένο το leave_request.employee.
+    Συμπληρώνει το statistics_snapshot πριν το bulk_create.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for leave_request, intervals in items:
+        employee = leave_request.employee
+        snapshot = contribution(
+            leave_request.status, employee.current_service_id, employee.department_id,
+            leave_request.leave_type_id, intervals,
+        )
+        leave_request.statistics_snapshot = snapshot
+        _deltas(snapshot, 1, deltas)
+    with transaction.atomic():
+        _apply(deltas)
+
+
+def remove_request_statistics(leave_request_id):
+    with transaction.atomic():
+        snapshot = LeaveRequest.objects.filter(pk=leave_request_id).values_list('statistics_snapshot', flat=True).first()
+        deltas = defaultdict(lambda: [0, 0])
+        _deltas(snapshot, -1, deltas)
+        _apply(deltas)
+
+
+def refresh_calendar_days():
+    """Ημερολόγιο για όλο το εύρος των διαστημάτων, με τις εργάσιμες από το holiday_calendar."""
+    bounds = LeaveInterval.objects.aggregate(first=Min('start_date'), last=Max('end_date'))
+    if bounds['first'] is None:
+        CalendarDay.objects.all().delete()
+        return 0
+    first, last = date(bounds['first'].year, 1, 1), date(bounds['last'].year, 12, 31)
+    days = [first + timedelta(days=offset) for offset in range((last - first).days + 1)]
+    with transaction.atomic():
+        CalendarDay.objects.all().delete()
+        CalendarDay.objects.bulk_create([
+            CalendarDay(day=day, year=day.year, month=day.month, is_working_day=holiday_calendar.is_working_day(day))
+            for day in days
+        ], batch_size=2000)
+    return len(days)
+
+
+def _aggregate_sql():
+    # Ένα INSERT ... SELECT: εργάσιμες ημέρες από το join διαστημάτων με το ημερολόγιο,
+    # και οι αιτήσεις στον μήνα του πρώτου έγκυρου διαστήματος τους
+    tables = {
+        'statistic': LeaveStatistic._meta.db_table,
+        'interval': LeaveInterval._meta.db_table,
+        'request': LeaveRequest._meta.db_table,
+        'employee': LeaveRequest._meta.get_field('employee').related_model._meta.db_table,
+        'calendar': CalendarDay._meta.db_table,
+    }
+    return """
+        INSERT INTO {statistic} (service_id, department_id, leave_type_id, status, year, month, days, requests)
+        SELECT service_id, department_id, leave_type_id, status, year, month, SUM(days), SUM(requests)
+        FROM (
+            SELECT COALESCE(e.current_service_id, 0) AS service_id, COALESCE(e.department_id, 0) AS department_id,
+                   r.leave_type_id AS leave_type_id, r.status AS status, c.year AS year, c.month AS month,
+                   COUNT(*) AS days, 0 AS requests
+            FROM {interval} i
+            JOIN {request} r ON r.id = i.leave_request_id
+            JOIN {employee} e ON e.id = r.employee_id
+            JOIN {calendar} c ON c.day BETWEEN i.start_date AND i.end_date AND c.is_working_day = %s
+            GROUP BY 1, 2, 3, 4, 5, 6
+            UNION ALL
+            SELECT COALESCE(e.current_service_id, 0), COALESCE(e.department_id, 0),
+                   r.leave_type_id, r.status, c.year, c.month, 0, COUNT(*)
+            FROM {request} r
+            JOIN {employee} e ON e.id = r.employee_id
+            JOIN {calendar} c ON c.day = (
+                SELECT MIN(i.start_date) FROM {interval} i
+                WHERE i.leave_request_id = r.id AND i.end_date >= i.start_date
+            )
+            GROUP BY 1, 2, 3, 4, 5, 6
+        ) cells
+        GROUP BY service_id, department_id, leave_type_id, status, year, month
+    """.format(**tables)
+
+
+def _id_chunks(chunk_size=5000):
+    ids = list(LeaveRequest.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start:start + chunk_size]
+
+
+def rebuild_statistics():
+    """Πλήρης επαναϋπολογισμός με set-based SQL και νέα snapshots για τις αιτήσεις."""
+    calendar_days = refresh_calendar_days()
+    with transaction.atomic():
+        LeaveStatistic.objects.all().delete()
+        if calendar_days:
+            with connection.cursor() as cursor:
+                cursor.execute(_aggregate_sql(), [True])
+        # Τα snapshots ξαναγράφονται ώστε οι επόμενες αυξητικές ενημερώσεις να ξεκινούν από σωστή βάση
+        for leave_request_ids in _id_chunks():
+            requests = LeaveRequest.objects.filter(pk__in=leave_request_ids).values_list(
+                'id', 'status', 'employee__current_service_id', 'employee__department_id', 'leave_type_id',
+            )
+            intervals = _intervals_by_request(leave_request_ids)
+            LeaveRequest.objects.bulk_update([
+                LeaveRequest(id=leave_request_id, statistics_snapshot=contribution(
+                    status, service_id, department_id, leave_type_id, intervals.get(leave_request_id, ()),
+                ))
+                for leave_request_id, status, service_id, department_id, leave_type_id in requests
+            ], ['statistics_snapshot'], batch_size=SYNC_CHUNK_SIZE)
+    return LeaveStatistic.objects.count()
+
+
+def compute_statistics():
+    expected = defaultdict(lambda: [0, 0])
+    for leave_request_ids in _id_chunks():
+        intervals = _intervals_by_request(leave_request_ids)
+        for leave_request_id, status, service_id, department_id, leave_type_id in LeaveRequest.objects.filter(
+            pk__in=leave_request_ids,
+        ).values_list('id', 'status', 'employee__current_service_id', 'employee__department_id', 'leave_type_id'):
+            _deltas(contribution(
+                status, service_id, department_id, leave_type_id, intervals.get(leave_request_id, ()),
+            ), 1, expected)
+    return expected
+
+
+def verify_statistics():
+    """Σύγκριση των αποθηκευμένων συνόλων με πλήρη επαναϋπολογισμό από τις αιτήσεις."""
+    expected = compute_statistics()
+    stored = {
+        tuple(row[:6]): [row[6], row[7]]
+        for row in LeaveStatistic.objects.values_list(*KEY_FIELDS, 'days', 'requests')
+    }
+    return sorted(
+        (key, stored.get(key, [0, 0]), expected.get(key, [0, 0]))
+        for key in set(expected) | set(stored)
+        if stored.get(key, [0, 0]) != expected.get(key, [0, 0])
+    )
+
+
+def _ranked(totals, name):
+    rows = [{'id': pk, 'name': name(pk) or '-', 'days': days} for pk, days in totals.items()]
+    return sorted(rows, key=lambda row: (-row['days'], row['id']))
+
+
+def dashboard_data(year=None, history=5):
+    """Δεδομένα του dashboard μόνο από τον συγκεντρωτικό πίνακα· το κόστος εξαρτάται από
+    το πλήθος τμημάτων και μηνών, όχι από το πλήθος των αιτήσεων."""
+    years = list(LeaveStatistic.objects.order_by('year').values_list('year', flat=True).distinct())
+    if year is None:
+        year = years[-1] if years else date.today().year
+    shown_years = [shown for shown in years if year - history < shown <= year]
+
+    monthly = {shown: [0] * 12 for shown in shown_years}
+    for row in LeaveStatistic.objects.filter(year__in=shown_years, status__in=USED_STATUSES).values(
+        'year', 'month',
+    ).annotate(days=Sum('days')):
+        monthly[row['year']][row['month'] - 1] = row['days']
+
+    # Ένα πέρασμα στα κελιά του έτους· οι επιμέρους αναλύσεις αθροίζονται εδώ
+    by_service, by_department, by_leave_type = defaultdict(int), defaultdict(int), defaultdict(int)
+    by_status = defaultdict(lambda: [0, 0])
+    for service_id, department_id, leave_type_id, status, days, requests in LeaveStatistic.objects.filter(
+        year=year,
+    ).values('service_id', 'department_id', 'leave_type_id', 'status').annotate(
+        total_days=Sum('days'), total_requests=Sum('requests'),
+    ).values_list('service_id', 'department_id', 'leave_type_id', 'status', 'total_days', 'total_requests'):
+        by_status[status][0] += days
+        by_status[status][1] += requests
+        if status in USED_STATUSES:
+            by_service[service_id] += days
+            by_department[department_id] += days
+            by_leave_type[leave_type_id] += days
+
+    department_names = dict(Department.objects.filter(id__in=list(by_department)).values_list('id', 'name'))
+    statuses = dict(LeaveRequest.STATUS_CHOICES)
+    return {
+        'year': year,
+        'years': years,
+        'monthly': [{'year': shown, 'months': months, 'total': sum(months)} for shown, months in monthly.items()],
+        'by_service': _ranked(by_service, lambda pk: getattr(reference_data.get('services', pk), 'name', None)),
+        'by_department': _ranked(by_department, department_names.get),
+        'by_leave_type': _ranked(by_leave_type, lambda pk: getattr(reference_data.get('leave_types', pk), 'name', None)),
+        'by_status': [
+            {'status': status, 'label': statuses.get(status, status), 'days': days, 'requests': requests}
+            for status, (days, requests) in sorted(by_status.items())
+        ],
+    }
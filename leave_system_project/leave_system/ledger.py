@@ -0,0 +1,170 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .holidays import holiday_calendar
+from .models import LeaveBalance, LeaveInterval, LeaveRequest
+
+USED_STATUSES = ('APPROVED', 'GENERATING', 'ISSUED')
+PENDING_STATUSES = ('PENDING',)
+BUCKET_FIELDS = {'used': 'used_days', 'pending': 'pending_days'}
+
+
+def contribution(status, employee_id, leave_type_id, intervals):
+    # Τι προσθέτει μια αίτηση στο ledger: ημέρες ανά έτος, στη στήλη used ή pending
+    if status in USED_STATUSES:
+        bucket = 'used'
+    elif status in PENDING_STATUSES:
+        bucket = 'pending'
+    else:
+        return {}
+    years = defaultdict(int)
+    for start_date, end_date in intervals:
+        if end_date < start_date:
+            continue
+        for year, days in holiday_calendar.working_days_by_year(start_date, end_date).items():
+            years[year] += days
+    years = {str(year): days for year, days in sorted(years.items()) if days}
+    if not years:
+        return {}
+    return {'employee': employee_id, 'leave_type': leave_type_id, 'bucket': bucket, 'years': years}
+
+
+def _deltas(snapshot, sign, deltas):
+    if not snapshot:
+        return
+    field = BUCKET_FIELDS[snapshot['bucket']]
+    for year, days in snapshot['years'].items():
+        deltas[(snapshot['employee'], snapshot['leave_type'], int(year), field)] += sign * days
+
+
+def _apply(deltas):
+    for (employee_id, leave_type_id, year, field), days in deltas.items():
+        if not days:
+            continue
+        balances = LeaveBalance.objects.filter(employee_id=employee_id, leave_type_id=leave_type_id, year=year)
+        if balances.update(**{field: F(field) + days}):
+            continue
+        try:
+            # Savepoint: αν άλλη συναλλαγή δημιούργησε στο μεταξύ τη γραμμή, μόνο το INSERT αναιρείται
+            with transaction.atomic():
+                LeaveBalance.objects.create(employee_id=employee_id, leave_type_id=leave_type_id, year=year, **{field: days})
+        except IntegrityError:
+            balances.update(**{field: F(field) + days})
+
+
+def sync_request_ledger(leave_request_id):
+    with transaction.atomic():
+        row = LeaveRequest.objects.select_for_update().filter(pk=leave_request_id).values(
+            'status', 'employee_id', 'leave_type_id', 'ledger_snapshot'
+        ).first()
+        if row is None:
+            return
+        intervals = LeaveInterval.objects.filter(leave_request_id=leave_request_id).values_list('start_date', 'end_date')
+        new_snapshot = contribution(row['status'], row['employee_id'], row['leave_type_id'], intervals)
+        old_snapshot = row['ledger_snapshot'] or {}
+        if new_snapshot == old_snapshot:
+            return
+        deltas = defaultdict(int)
+        _deltas(old_snapshot, -1, deltas)
+        _deltas(new_snapshot, 1, deltas)
+        _apply(deltas)
+        LeaveRequest.objects.filter(pk=leave_request_id).update(ledger_snapshot=new_snapshot)
+
+
+def record_new_requests(items):
+    """Ledger για αιτήσεις που δημιουργούνται με bulk_create (χωρίς signals).
+
+    items: [(leave_request, [(start, end), ...])]. Συμπληρώνει το ledger_snapshot
+    πριν το bulk_create και ενημερώνει τα υπόλοιπα με ένα query ανάγνωσης.
+    """
+    deltas = defaultdict(int)
+    for leave_request, intervals in items:
+        snapshot = contribution(leave_request.status, leave_request.employee_id, leave_request.leave_type_id, intervals)
+        leave_request.ledger_snapshot = snapshot
+        _deltas(snapshot, 1, deltas)
+    rows = defaultdict(dict)
+    for (employee_id, leave_type_id, year, field), days in deltas.items():
+        if days:
+            rows[(employee_id, leave_type_id, year)][field] = days
+    if not rows:
+        return
+    with transaction.atomic():
+        existing = {
+            (balance.employee_id, balance.leave_type_id, balance.year): balance
+            for balance in LeaveBalance.objects.select_for_update().filter(
+                employee_id__in={key[0] for key in rows}, year__in={key[2] for key in rows},
+            )
+        }
+        updated, created = [], []
+        for key, fields in rows.items():
+            balance = existing.get(key)
+            if balance is None:
+                created.append(LeaveBalance(employee_id=key[0], leave_type_id=key[1], year=key[2], **fields))
+                continue
+            for field, days in fields.items():
+                setattr(balance, field, getattr(balance, field) + days)
+            updated.append(balance)
+        LeaveBalance.objects.bulk_update(updated, list(BUCKET_FIELDS.values()), batch_size=1000)
+        LeaveBalance.objects.bulk_create(created, batch_size=1000)
+
+
+def remove_request_ledger(leave_request_id):
+    with transaction.atomic():
+        snapshot = LeaveRequest.objects.filter(pk=leave_request_id).values_list('ledger_snapshot', flat=True).first()
+        deltas = defaultdict(int)
+        _deltas(snapshot, -1, deltas)
+        _apply(deltas)
+
+
+def compute_ledger():
+    intervals = defaultdict(list)
+    for leave_request_id, start_date, end_date in LeaveInterval.objects.values_list(
+        'leave_request_id', 'start_date', 'end_date'
+    ).iterator(chunk_size=5000):
+        intervals[leave_request_id].append((start_date, end_date))
+
+    balances = defaultdict(int)
+    snapshots = {}
+    for leave_request_id, status, employee_id, leave_type_id in LeaveRequest.objects.values_list(
+        'id', 'status', 'employee_id', 'leave_type_id'
+    ).iterator(chunk_size=5000):
+        snapshot = contribution(status, employee_id, leave_type_id, intervals.get(leave_request_id, ()))
+        snapshots[leave_request_id] = snapshot
+        _deltas(snapshot, 1, balances)
+    return balances, snapshots
+
+
+def verify_ledger():
+    expected, _ = compute_ledger()
+    stored = defaultdict(int)
+    for employee_id, leave_type_id, year, used_days, pending_days in LeaveBalance.objects.values_list(
+        'employee_id', 'leave_type_id', 'year', 'used_days', 'pending_days'
+    ):
+        stored[(employee_id, leave_type_id, year, 'used_days')] = used_days
+        stored[(employee_id, leave_type_id, year, 'pending_days')] = pending_days
+    return sorted(
+        (key, stored.get(key, 0), expected.get(key, 0))
+        for key in set(expected) | set(stored)
+        if stored.get(key, 0) != expected.get(key, 0)
+    )
+
+
+def rebuild_ledger():
+    expected, snapshots = compute_ledger()
+    rows = defaultdict(dict)
+    for (employee_id, leave_type_id, year, field), days in expected.items():
+        rows[(employee_id, leave_type_id, year)][field] = days
+    with transaction.atomic():
+        LeaveBalance.objects.all().delete()
+        LeaveBalance.objects.bulk_create([
+            LeaveBalance(employee_id=employee_id, leave_type_id=leave_type_id, year=year, **fields)
+            for (employee_id, leave_type_id, year), fields in rows.items()
+        ], batch_size=1000)
+        leave_requests = [
+            LeaveRequest(id=leave_request_id, ledger_snapshot=snapshot)
+            for leave_request_id, snapshot in snapshots.items()
+        ]
+        LeaveRequest.objects.bulk_update(leave_requests, ['ledger_snapshot'], batch_size=1000)
+    return len(rows)
@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from weasyprint import CSS, HTML
+
+from leave_system.models import LeaveRequest
+from leave_system.pdf import DECISION_STYLESHEET, decision_renderer
+
+
+class Command(BaseCommand):
+    help = "Σύγκριση χρόνου παραγωγής PDF απόφασης χωρίς και με το κοινό περιβάλλον WeasyPrint"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20)
+        parser.add_argument('--leave-request', type=int, default=None)
+
+    def handle(self, *args, **options):
+        leave_requests = LeaveRequest.objects.select_related('employee', 'leave_type', 'processed_by')
+        if options['leave_request']:
+            leave_request = leave_requests.filter(id=options['leave_request']).first()
+        else:
+            leave_request = leave_requests.first()
+        if leave_request is None:
+            raise CommandError("No leave request to render.")
+
+        html_content = leave_request.decision_html()
+        with open(os.path.join(settings.STATICFILES_DIRS[0], DECISION_STYLESHEET), encoding='utf-8') as stylesheet:
+            css_text = stylesheet.read()
+        count = options['count']
+
+        def cold():
+            # Όπως πριν: νέο stylesheet, νέες γραμματοσειρές και ανάγνωση file:// σε κάθε έγγραφο
+            HTML(string=html_content).write_pdf(stylesheets=[CSS(string=css_text)])
+
+        def warm():
+            decision_renderer.write_pdf(html_content)
+
+        decision_renderer.warm_up()
+        results = {}
+        for label, render in (('cold', cold), ('warm', warm)):
+            render()
+            started = time.perf_counter()
+            for _ in range(count):
+                render()
+            results[label] = (time.perf_counter() - started) / count * 1000
+            self.stdout.write(f"{label}: {results[label]:.1f} ms/document")
+
+        speedup = results['cold'] / results['warm'] if results['warm'] else 0
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {speedup:.2f}x over {count} documents."))
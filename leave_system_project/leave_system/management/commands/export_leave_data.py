@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from leave_system.exports import (
+    EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_filename, export_queryset, iter_csv, iter_export_rows, write_xlsx,
+)
+from leave_system.models import LeaveRequest
+
+
+class Command(BaseCommand):
+    help = "Εξαγωγή αιτήσεων αδειών με τα διαστήματα και τις εργάσιμες ημέρες τους σε CSV ή XLSX"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=None, help="Αιτήσεις με διάστημα μέσα στο έτος")
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--status', nargs='+', choices=[value for value, _ in LeaveRequest.STATUS_CHOICES])
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        output = options['output'] or export_filename(options['year'], options['format'])
+        count = 0
+
+        def counted(rows):
+            nonlocal count
+            for row in rows:
+                count += 1
+                yield row
+
+        rows = counted(iter_export_rows(
+            export_queryset(options['year'], options['status']), options['chunk_size'], year=options['year'],
+        ))
+        if options['format'] == 'xlsx':
+            write_xlsx(rows, output)
+        else:
+            with open(output, 'w', newline='', encoding='utf-8') as export_file:
+                export_file.writelines(iter_csv(rows))
+        self.stdout.write(self.style.SUCCESS(f"Exported {count} rows to {output}."))
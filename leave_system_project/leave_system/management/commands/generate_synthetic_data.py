@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leave_system.synthetic import SyntheticConfig, generate_organization
+
+
+class Command(BaseCommand):
+    help = "Δημιουργία συνθετικού οργανισμού (υπηρεσίες, τμήματα, υπάλληλοι, αιτήσεις αδειών) για μετρήσεις"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--services', type=int, default=5)
+        parser.add_argument('--departments-per-service', type=int, default=10)
+        parser.add_argument('--employees', type=int, default=10000)
+        parser.add_argument('--requests-per-employee', type=int, default=25)
+        parser.add_argument('--max-intervals', type=int, default=3, help="Μέγιστα διαστήματα ανά αίτηση")
+        parser.add_argument('--start-year', type=int, default=2021)
+        parser.add_argument('--end-year', type=int, default=2025)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default=None, help="Πρόθεμα ονομάτων (προεπιλογή syn<seed>)")
+        parser.add_argument('--skip-ledger', action='store_true', help="Χωρίς επαναϋπολογισμό του ledger")
+
+    def handle(self, *args, **options):
+        if options['services'] < 1 or options['departments_per_service'] < 1 or options['employees'] < 1:
+            raise CommandError("Services, departments per service and employees must be positive.")
+        if options['start_year'] > options['end_year']:
+            raise CommandError("--start-year must not be after --end-year.")
+        config = SyntheticConfig(
+            services=options['services'],
+            departments_per_service=options['departments_per_service'],
+            employees=options['employees'],
+            requests_per_employee=options['requests_per_employee'],
+            max_intervals=max(1, options['max_intervals']),
+            start_year=options['start_year'],
+            end_year=options['end_year'],
+            seed=options['seed'],
+            prefix=options['prefix'],
+            rebuild_ledger=not options['skip_ledger'],
+        )
+        try:
+            counts = generate_organization(config, log=self.stdout.write)
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            "Generated " + ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in counts.items()) + "."
+        ))
@@ -0,0 +1,31 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from leave_system.import_data import IMPORTS, import_all_data
+
+
+class Command(BaseCommand):
+    help = "Μαζική εισαγωγή δεδομένων από τα αρχεία Excel του φακέλου data"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data-dir', default='data')
+        parser.add_argument('--only', nargs='+', choices=[name for name, _ in IMPORTS])
+        parser.add_argument('--dry-run', action='store_true', help="Εκτέλεση χωρίς αποθήκευση")
+        parser.add_argument('--errors-csv', default=None, help="Αναφορά σφαλμάτων ανά γραμμή σε CSV")
+
+    def handle(self, *args, **options):
+        engine = import_all_data(options['data_dir'], dry_run=options['dry_run'], only=options['only'])
+
+        for line in engine.summary():
+            self.stdout.write(line)
+        for source, row_number, message in engine.errors:
+            self.stderr.write(f"{source} row {row_number}: {message}")
+        if options['errors_csv']:
+            with open(options['errors_csv'], 'w', newline='', encoding='utf-8') as errors_file:
+                writer = csv.writer(errors_file)
+                writer.writerow(['source', 'row', 'error'])
+                writer.writerows(engine.errors)
+
+        status = "Dry run finished" if options['dry_run'] else "Import finished"
+        self.stdout.write(self.style.SUCCESS(f"{status} with {len(engine.errors)} errors."))
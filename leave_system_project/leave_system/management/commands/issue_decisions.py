@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leave_system.issuance import issue_decisions
+from leave_system.models import Employee, LeaveRequest
+
+
+class Command(BaseCommand):
+    help = "Μαζική έκδοση αποφάσεων για εγκεκριμένες αιτήσεις, με παράλληλη παραγωγή PDF"
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help="IDs αιτήσεων (προεπιλογή: όλες οι APPROVED)")
+        parser.add_argument('--processes', type=int, default=None)
+        parser.add_argument('--protocol-start', type=int, default=None,
+                            help="Αρχικός αριθμός πρωτοκόλλου για αιτήσεις χωρίς πρωτόκολλο")
+        parser.add_argument('--final-signatory', default=None)
+        parser.add_argument('--processed-by', default=None, help="sch_email του υπαλλήλου που εκδίδει")
+        parser.add_argument('--merge', default=None, metavar='PATH', help="Ενιαίο PDF για εκτύπωση")
+
+    def handle(self, *args, **options):
+        leave_requests = LeaveRequest.objects.filter(status='APPROVED')
+        if options['ids']:
+            leave_requests = leave_requests.filter(id__in=options['ids'])
+
+        processed_by = None
+        if options['processed_by']:
+            try:
+                processed_by = Employee.objects.get(sch_email=options['processed_by'])
+            except Employee.DoesNotExist:
+                raise CommandError(f"Employee {options['processed_by']} not found.")
+
+        result = issue_decisions(
+            leave_requests,
+            processes=options['processes'],
+            merged_path=options['merge'],
+            protocol_start=options['protocol_start'],
+            final_signatory=options['final_signatory'],
+            processed_by=processed_by,
+        )
+
+        for leave_request_id, error in sorted(result.failed.items()):
+            self.stderr.write(f"LeaveRequest {leave_request_id} failed:\n{error}")
+        if result.merged_path:
+            self.stdout.write(f"Merged PDF written to {result.merged_path}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Issued {len(result.issued)} decisions ({len(result.failed)} failed) in "
+            f"{result.elapsed:.2f}s ({result.documents_per_second:.1f} docs/s)."
+        ))
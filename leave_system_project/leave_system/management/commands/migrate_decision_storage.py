@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from leave_system.decision_files import migrate_decision_storage
+
+
+class Command(BaseCommand):
+    help = "Μεταφορά των υπαρχόντων PDF αποφάσεων στη διάταξη decisions/YYYY/MM/"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Μόνο εμφάνιση των μετακινήσεων, χωρίς αλλαγές")
+        parser.add_argument('--batch-size', type=int, default=500, help="Αρχεία ανά συναλλαγή ενημέρωσης της βάσης")
+        parser.add_argument('--limit', type=int, default=20, help="Μετακινήσεις που εμφανίζονται στο dry run")
+
+    def handle(self, *args, **options):
+        moves, summary = migrate_decision_storage(dry_run=options['dry_run'], batch_size=options['batch_size'])
+        if options['dry_run']:
+            for old_name, new_name in list(moves.items())[:options['limit']]:
+                self.stdout.write(f"  {old_name} -> {new_name}")
+            self.stdout.write(self.style.SUCCESS(f"Dry run: {summary['files']} files would be moved; nothing was changed."))
+            return
+        if summary['missing']:
+            self.stdout.write(self.style.WARNING(f"{summary['missing']} referenced files were not found and were left as is."))
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved {summary['moved']} files; updated {summary['requests']} leave requests "
+            f"and {summary['notifications']} notifications."
+        ))
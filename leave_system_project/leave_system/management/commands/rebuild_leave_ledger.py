@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leave_system.ledger import rebuild_ledger, verify_ledger
+
+
+class Command(BaseCommand):
+    help = "Επαλήθευση ή πλήρης επαναϋπολογισμός του ledger υπολοίπων αδειών"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Μόνο σύγκριση, χωρίς εγγραφή")
+
+    def handle(self, *args, **options):
+        differences = verify_ledger()
+        for (employee_id, leave_type_id, year, field), stored, expected in differences:
+            self.stdout.write(
+                f"employee={employee_id} leave_type={leave_type_id} year={year} {field}: "
+                f"stored={stored} expected={expected}"
+            )
+        if options['check']:
+            if differences:
+                raise CommandError(f"Ledger has {len(differences)} differences.")
+            self.stdout.write(self.style.SUCCESS("Ledger matches a full recomputation."))
+            return
+        rows = rebuild_ledger()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt ledger with {rows} balances ({len(differences)} corrected)."))
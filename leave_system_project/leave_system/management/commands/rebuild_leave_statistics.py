@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from leave_system.leave_statistics import rebuild_statistics, verify_statistics
+
+
+class Command(BaseCommand):
+    help = "Επαλήθευση ή πλήρης επαναϋπολογισμός των συγκεντρωτικών στατιστικών αδειών (π.χ. μετά από αλλαγή αργιών)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Μόνο σύγκριση, χωρίς εγγραφή")
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = verify_statistics()
+            for key, stored, expected in differences:
+                cell = ' '.join(f"{field}={value}" for field, value in zip(
+                    ('service', 'department', 'leave_type', 'status', 'year', 'month'), key))
+                self.stdout.write(f"{cell}: stored={stored} expected={expected}")
+            if differences:
+                raise CommandError(f"Statistics have {len(differences)} differences.")
+            self.stdout.write(self.style.SUCCESS("Statistics match a full recomputation."))
+            return
+        rows = rebuild_statistics()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt statistics with {rows} rows."))
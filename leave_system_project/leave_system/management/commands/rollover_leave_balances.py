@@ -0,0 +1,73 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F, Q
+
+from leave_system.rollover import apply_rollover, plan_rollover
+
+SUMMARY_LINES = [
+    ('employees', "Active employees"),
+    ('changed', "Employees with changes"),
+    ('used_days', "Regular leave days used"),
+    ('carryover_before', "Carryover days before"),
+    ('carryover_after', "Carryover days after"),
+    ('expired_days', "Expired carryover days"),
+    ('capped_days', "Unused days over the cap"),
+    ('regular_reset', "Regular entitlements reset"),
+    ('pending_employees', "Employees with pending requests (not counted)"),
+    ('updated', "Employees updated"),
+]
+
+
+class Command(BaseCommand):
+    help = "Μεταφορά αχρησιμοποίητων ημερών κανονικής άδειας στο επόμενο έτος για όλους τους ενεργούς υπαλλήλους"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=None, help="Έτος που κλείνει (προεπιλογή: το προηγούμενο)")
+        parser.add_argument('--leave-type', action='append', dest='leave_types', default=None,
+                            help="short_name τύπου κανονικής άδειας (επαναλαμβανόμενο)")
+        parser.add_argument('--max-carryover', type=int, default=None, help="Ανώτατο όριο μεταφερόμενων ημερών")
+        parser.add_argument('--annual-days', type=int, default=None, help="Νέο ετήσιο δικαίωμα για όλους")
+        parser.add_argument('--dry-run', action='store_true', help="Μόνο σύνοψη των αλλαγών, χωρίς εγγραφή")
+        parser.add_argument('--limit', type=int, default=20, help="Αλλαγές ανά υπάλληλο που εμφανίζονται στο dry run")
+
+    def handle(self, *args, **options):
+        year = options['year'] or date.today().year - 1
+        rollover = {
+            'leave_types': options['leave_types'],
+            'max_carryover_days': options['max_carryover'],
+            'annual_leave_days': options['annual_days'],
+        }
+        try:
+            if options['dry_run']:
+                queryset, summary = plan_rollover(year, **rollover)
+                self.write_summary(summary)
+                self.write_changes(queryset, options['limit'], options['annual_days'])
+                self.stdout.write(self.style.SUCCESS(
+                    f"Dry run for {year} finished in {summary['seconds']:.2f}s; nothing was written."
+                ))
+                return
+            run = apply_rollover(year, **rollover)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.write_summary(run.summary)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled over {year} for {run.summary['updated']} employees in {run.summary['seconds']:.2f}s."
+        ))
+
+    def write_summary(self, summary):
+        for key, label in SUMMARY_LINES:
+            if key in summary:
+                self.stdout.write(f"{label}: {summary[key]}")
+
+    def write_changes(self, queryset, limit, annual_days):
+        changed = ~Q(new_carryover=F('carryover_leave_days'))
+        if annual_days is not None:
+            changed |= ~Q(regular_leave_days=annual_days)
+        for email, name, regular, before, used, after in queryset.filter(changed).order_by('id').values_list(
+            'sch_email', 'surname_in_accusative', 'regular_leave_days', 'carryover_leave_days', 'used_days',
+            'new_carryover',
+        )[:limit]:
+            self.stdout.write(
+                f"  {email or name}: regular={regular} used={used} carryover {before} -> {after}"
+            )
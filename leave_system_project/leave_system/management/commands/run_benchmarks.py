@@ -0,0 +1,58 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from leave_system.benchmarks import BENCHMARKS, BenchmarkContext, compare_results, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = "Χρονομέτρηση των κρίσιμων διαδρομών και αποθήκευση των αποτελεσμάτων σε JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default='benchmark-results.json')
+        parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS))
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--sample-size', type=int, default=1000)
+        parser.add_argument('--import-rows', type=int, default=2000, help="Υπάλληλοι στο αρχείο του import_data")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--compare', default=None, help="Προηγούμενο αρχείο αποτελεσμάτων για σύγκριση")
+        parser.add_argument('--max-ratio', type=float, default=None,
+                            help="Αποτυχία αν κάποια μέτρηση είναι πιο αργή από αυτόν τον λόγο")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as previous_file:
+                    previous = json.load(previous_file)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+
+        context = BenchmarkContext(
+            repeat=options['repeat'], sample_size=options['sample_size'],
+            import_rows=options['import_rows'], seed=options['seed'],
+        )
+        report = run_benchmarks(context, only=options['only'], log=self.stdout.write)
+        for group, measurements in report['results'].items():
+            if not measurements:
+                self.stdout.write(self.style.WARNING(f"{group}: skipped, no data"))
+            for name, values in measurements.items():
+                self.stdout.write(
+                    f"{group}.{name}: median {values['median_ms']:.3f} ms, p95 {values['p95_ms']:.3f} ms, "
+                    f"{values['queries']:.1f} queries per item"
+                )
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}."))
+
+        if previous is None:
+            return
+        regressions = []
+        for name, before, after, ratio in compare_results(previous, report):
+            self.stdout.write(f"{name}: {before:.3f} -> {after:.3f} ms ({ratio:.2f}x)")
+            if options['max_ratio'] and ratio > options['max_ratio']:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(f"Slower than {options['max_ratio']}x: {', '.join(regressions)}")
@@ -0,0 +1,52 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from leave_system.jobs import requeue_stale_jobs, run_pending_jobs, worker_loop
+
+
+def _worker(stop_event, poll_interval):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    connections.close_all()
+    worker_loop(poll_interval=poll_interval, stop_event=stop_event)
+
+
+class Command(BaseCommand):
+    help = "Εκτελεί τις εργασίες έκδοσης αποφάσεων PDF σε pool μόνιμων διεργασιών"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=max(1, multiprocessing.cpu_count() - 1))
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help="Εκτέλεση των εκκρεμών εργασιών και έξοδος")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_jobs()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale jobs.")
+
+        if options['once']:
+            processed = run_pending_jobs()
+            self.stdout.write(self.style.SUCCESS(f"Processed {processed} jobs."))
+            return
+
+        # Οι συνδέσεις DB δεν πρέπει να κληρονομηθούν από τις θυγατρικές διεργασίες
+        connections.close_all()
+        stop_event = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=_worker, args=(stop_event, options['poll_interval']), daemon=True)
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} decision workers.")
+
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
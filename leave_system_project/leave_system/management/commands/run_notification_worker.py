@@ -0,0 +1,40 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from leave_system.notifications import (
+    BATCH_SIZE, deliver_pending_notifications, notification_worker_loop, requeue_stale_deliveries,
+)
+
+
+class Command(BaseCommand):
+    help = "Αποστέλλει με email τις αποφάσεις που εκδόθηκαν, σε παρτίδες από μία σύνδεση SMTP"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float, default=5.0)
+        parser.add_argument('--once', action='store_true', help="Αποστολή των εκκρεμών μηνυμάτων και έξοδος")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale_deliveries()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale notifications.")
+
+        if options['once']:
+            totals = deliver_pending_notifications(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {totals['sent']} notifications ({totals['failed']} failed)."
+            ))
+            return
+
+        # Ένας worker αρκεί: η αποστολή περιμένει τον SMTP server, όχι τη CPU
+        stop_event = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+        self.stdout.write("Started notification worker.")
+        try:
+            notification_worker_loop(
+                batch_size=options['batch_size'], poll_interval=options['poll_interval'], stop_event=stop_event,
+            )
+        except KeyboardInterrupt:
+            stop_event.set()
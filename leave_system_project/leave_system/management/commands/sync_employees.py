@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from leave_system.import_data import ImportEngine, sync_employees
+
+
+class Command(BaseCommand):
+    help = "Διαφορικός συγχρονισμός του μητρώου υπαλλήλων (CSV/XLSX) με βάση το sch_email"
+
+    def add_arguments(self, parser):
+        parser.add_argument('file_path')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--no-deactivate', action='store_true',
+                            help="Να μην απενεργοποιούνται όσοι λείπουν από το αρχείο")
+        parser.add_argument('--dry-run', action='store_true', help="Εκτέλεση χωρίς αποθήκευση")
+
+    def handle(self, *args, **options):
+        engine = ImportEngine(dry_run=options['dry_run'])
+        with transaction.atomic():
+            sync_employees(
+                options['file_path'], engine,
+                chunk_size=options['chunk_size'],
+                deactivate_missing=not options['no_deactivate'],
+            )
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        for line in engine.summary():
+            self.stdout.write(line)
+        for source, row_number, message in engine.errors:
+            self.stderr.write(f"{source} row {row_number}: {message}")
+        status = "Dry run finished" if options['dry_run'] else "Sync finished"
+        self.stdout.write(self.style.SUCCESS(f"{status} with {len(engine.errors)} errors."))
@@ -0,0 +1,325 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.backends.django import DjangoTemplates, Template
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+PDF_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+BACKGROUND = 'background'
+MAX_SQL_LENGTH = 500
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Ιστόγραμμα με σταθερούς κάδους, όπως το histogram του Prometheus.
+
+    Το observe κάνει ένα bisect και ενημερώνει μετρητές κάτω από lock, ώστε το
+    κόστος ανά αίτημα να μένει αμελητέο.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, buckets, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value, *label_values):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            return None if series is None else {'buckets': list(series[0]), 'sum': series[1], 'count': series[2]}
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket_count
+                le = (('le', _format_value(float(bound))),)
+                yield f'{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}'
+            yield f'{self.name}_sum{_format_labels(self.labels, label_values)} {_format_value(float(total))}'
+            yield f'{self.name}_count{_format_labels(self.labels, label_values)} {count}'
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield f'{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}'
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+
+
+class MetricsRegistry:
+    """Μετρήσεις της διεργασίας. Με πολλούς workers ο Prometheus κάνει scrape τον καθένα
+    χωριστά και τα ιστογράμματα αθροίζονται στο query (sum by le)."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, function):
+        # Συναρτήσεις που επιστρέφουν (όνομα, τύπος, περιγραφή, [(labels, τιμή)]) τη στιγμή του scrape
+        self._collectors.append(function)
+        return function
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples())
+        for collect in self._collectors:
+            for name, kind, documentation, samples in collect():
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.reset()
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.register(Counter(
+    'leave_system_requests_total', 'HTTP requests by view, method and status class.', ('view', 'method', 'status'),
+))
+REQUEST_DURATION = registry.register(Histogram(
+    'leave_system_request_duration_seconds', 'Request latency by view.', LATENCY_BUCKETS, ('view', 'method'),
+))
+SQL_QUERIES = registry.register(Histogram(
+    'leave_system_sql_queries_per_request', 'SQL queries executed per request.', QUERY_COUNT_BUCKETS, ('view',),
+))
+SQL_DURATION = registry.register(Histogram(
+    'leave_system_sql_duration_seconds', 'Total SQL time per request.', LATENCY_BUCKETS, ('view',),
+))
+TEMPLATE_DURATION = registry.register(Histogram(
+    'leave_system_template_render_seconds', 'Template render time per request.', LATENCY_BUCKETS, ('view',),
+))
+PDF_DURATION = registry.register(Histogram(
+    'leave_system_pdf_render_seconds', 'WeasyPrint render time per document.', PDF_BUCKETS, ('view', 'operation'),
+))
+
+
+@registry.collector
+def reference_cache_samples():
+    from .reference import reference_data  # Εισαγωγή εδώ για αποφυγή κυκλικού import
+    stats = reference_data.stats()
+    for name, kind in (('hits', 'counter'), ('misses', 'counter')):
+        yield (
+            f'leave_system_reference_cache_{name}_total', kind, f'Reference table cache {name}.',
+            [({'table': table}, values[name]) for table, values in stats.items()],
+        )
+
+
+@dataclass
+class RequestStats:
+    view: str = None
+    queries: int = 0
+    sql_seconds: float = 0.0
+    template_seconds: float = 0.0
+    pdf_seconds: float = 0.0
+    top_queries: int = 0
+    slowest: list = field(default_factory=list)
+
+    def record_query(self, seconds, sql):
+        self.queries += 1
+        self.sql_seconds += seconds
+        if not self.top_queries:
+            return
+        # Min-heap με τα N πιο αργά queries· χωρίς παραμέτρους, για να μη γράφονται προσωπικά δεδομένα στο log
+        item = (seconds, self.queries, sql[:MAX_SQL_LENGTH])
+        if len(self.slowest) < self.top_queries:
+            heapq.heappush(self.slowest, item)
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, item)
+
+
+_current = ContextVar('leave_system_request_stats', default=None)
+
+
+def current_stats():
+    return _current.get()
+
+
+def _sql_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(time.perf_counter() - started, sql)
+
+
+@contextmanager
+def pdf_render_timer(operation):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None:
+            stats.pdf_seconds += elapsed
+        # Και εκτός αιτήματος (worker αποφάσεων, management commands)
+        PDF_DURATION.observe(elapsed, stats.view if stats and stats.view else BACKGROUND, operation)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return super().render(context, request)
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            stats.template_seconds += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """Το backend DjangoTemplates με χρονομέτρηση του render. Μετράει μόνο τα templates
+    που φορτώνονται από το backend (render, render_to_string), όχι τα include μέσα τους,
+    οπότε ο χρόνος δεν διπλομετριέται."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        # Το TemplateDoesNotExist το μετατρέπει ήδη το DjangoTemplates
+        return InstrumentedTemplate(super().get_template(template_name).template, self)
+
+
+def _view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    # Μόνο ονόματα view ως labels: τα paths (με ids) θα έδιναν απεριόριστες σειρές
+    return match.view_name if match else 'unresolved'
+
+
+class MetricsMiddleware:
+    """Καταγράφει ανά view χρόνο απόκρισης, πλήθος και χρόνο SQL, χρόνο templates και PDF.
+
+    Πρέπει να είναι πρώτο στο MIDDLEWARE ώστε να μετράει και τα queries των
+    υπόλοιπων middleware (session, auth, ρόλοι).
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'LEAVE_SYSTEM_METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = getattr(settings, 'LEAVE_SYSTEM_SLOW_REQUEST_SECONDS', None)
+        self.top_queries = getattr(settings, 'LEAVE_SYSTEM_SLOW_REQUEST_QUERIES', 5) if self.slow_seconds else 0
+
+    def __call__(self, request):
+        stats = RequestStats(top_queries=self.top_queries)
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_sql_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        elapsed = time.perf_counter() - started
+
+        view = stats.view = _view_label(request)
+        REQUESTS.inc(view, request.method, f'{response.status_code // 100}xx')
+        REQUEST_DURATION.observe(elapsed, view, request.method)
+        SQL_QUERIES.observe(stats.queries, view)
+        SQL_DURATION.observe(stats.sql_seconds, view)
+        TEMPLATE_DURATION.observe(stats.template_seconds, view)
+        if self.slow_seconds and elapsed >= self.slow_seconds:
+            self.log_slow_request(request, view, elapsed, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Το όνομα του view είναι γνωστό από εδώ και πέρα (π.χ. για το label του PDF)
+        stats = _current.get()
+        if stats is not None:
+            stats.view = _view_label(request)
+        return None
+
+    def log_slow_request(self, request, view, elapsed, stats):
+        lines = [
+            f"Slow request {request.method} {request.path} ({view}): {elapsed:.3f}s, "
+            f"{stats.queries} queries in {stats.sql_seconds:.3f}s, templates {stats.template_seconds:.3f}s, "
+            f"pdf {stats.pdf_seconds:.3f}s"
+        ]
+        for seconds, number, sql in sorted(stats.slowest, reverse=True):
+            lines.append(f"  #{number} {seconds * 1000:.1f} ms: {sql}")
+        logger.warning('\n'.join(lines))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='leaverequest',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Υπό Επεξεργασία'), ('APPROVED', 'Εγκρίθηκε'), ('GENERATING', 'Σε Έκδοση'), ('REJECTED', 'Απορρίφθηκε'), ('ISSUED', 'Εκδόθηκε')], default='PENDING', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='DecisionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('QUEUED', 'Σε Αναμονή'), ('RUNNING', 'Σε Εκτέλεση'), ('DONE', 'Ολοκληρώθηκε'), ('FAILED', 'Απέτυχε')], default='QUEUED', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('leave_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='decision_jobs', to='leave_system.leaverequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'available_at'], name='decisionjob_status_avail_idx')],
+            },
+        ),
+    ]
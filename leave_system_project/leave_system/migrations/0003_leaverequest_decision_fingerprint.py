@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0002_alter_leaverequest_status_decisionjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaverequest',
+            name='decision_fingerprint',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0003_leaverequest_decision_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='roster_fingerprint',
+            field=models.CharField(blank=True, max_length=40, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0004_employee_roster_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaverequest',
+            name='ledger_snapshot',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='LeaveBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('used_days', models.IntegerField(default=0)),
+                ('pending_days', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_balances', to='leave_system.employee')),
+                ('leave_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='leave_system.leavetype')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'year', 'leave_type'), name='unique_leave_balance')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0005_leaverequest_ledger_snapshot_leavebalance'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', '-created_at', '-id'], name='leaverequest_employee_keyset'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['-created_at', '-id'], name='leaverequest_keyset'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_closure(apps, schema_editor):
+    Department = apps.get_model('leave_system', 'Department')
+    DepartmentClosure = apps.get_model('leave_system', 'DepartmentClosure')
+    DepartmentClosure.objects.bulk_create([
+        DepartmentClosure(ancestor_id=pk, descendant_id=pk, depth=0)
+        for pk in Department.objects.values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0006_leaverequest_leaverequest_employee_keyset_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='leave_system.department'),
+        ),
+        migrations.CreateModel(
+            name='DepartmentClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.IntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='leave_system.department')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='leave_system.department')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'ancestor'], name='department_closure_desc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_department_closure')],
+            },
+        ),
+        migrations.RunPython(populate_closure, migrations.RunPython.noop),
+    ]
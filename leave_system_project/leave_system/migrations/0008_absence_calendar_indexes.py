@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0007_department_parent_departmentclosure'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='leaveinterval',
+            index=models.Index(fields=['start_date', 'end_date'], name='leaveinterval_range'),
+        ),
+        migrations.AddIndex(
+            model_name='leaveinterval',
+            index=models.Index(fields=['leave_request', 'end_date', 'start_date'], name='leaveinterval_request_range'),
+        ),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', 'status'], name='leaverequest_employee_status'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0009_employee_updated_at_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='leaverequest',
+            name='statistics_snapshot',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.CreateModel(
+            name='CalendarDay',
+            fields=[
+                ('day', models.DateField(primary_key=True, serialize=False)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('is_working_day', models.BooleanField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['is_working_day', 'day'], name='calendarday_working_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LeaveStatistic',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_id', models.IntegerField(default=0)),
+                ('department_id', models.IntegerField(default=0)),
+                ('leave_type_id', models.IntegerField()),
+                ('status', models.CharField(choices=[('PENDING', 'Υπό Επεξεργασία'), ('APPROVED', 'Εγκρίθηκε'), ('GENERATING', 'Σε Έκδοση'), ('REJECTED', 'Απορρίφθηκε'), ('ISSUED', 'Εκδόθηκε')], max_length=20)),
+                ('year', models.IntegerField()),
+                ('month', models.IntegerField()),
+                ('days', models.IntegerField(default=0)),
+                ('requests', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['department_id', 'year'], name='leavestatistic_department')],
+                'constraints': [models.UniqueConstraint(fields=('year', 'month', 'service_id', 'department_id', 'leave_type_id', 'status'), name='unique_leave_statistic')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0010_leave_statistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveRollover',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField(unique=True)),
+                ('leave_types', models.CharField(max_length=255)),
+                ('max_carryover_days', models.IntegerField(blank=True, null=True)),
+                ('annual_leave_days', models.IntegerField(blank=True, null=True)),
+                ('summary', models.JSONField(blank=True, default=dict)),
+                ('applied_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
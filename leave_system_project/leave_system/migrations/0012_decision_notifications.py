@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leave_system', '0011_leaverollover'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DecisionNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('decision_fingerprint', models.CharField(max_length=64)),
+                ('decision_pdf', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('leave_request', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications', to='leave_system.leaverequest')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='NotificationDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254)),
+                ('status', models.CharField(choices=[('QUEUED', 'Σε Αναμονή'), ('SENDING', 'Σε Αποστολή'), ('SENT', 'Εστάλη'), ('FAILED', 'Απέτυχε')], default='QUEUED', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=5)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim_token', models.CharField(blank=True, max_length=32, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='leave_system.decisionnotification')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='decisionnotification',
+            constraint=models.UniqueConstraint(fields=('leave_request', 'decision_fingerprint'), name='unique_decision_notification'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['status', 'available_at'], name='delivery_status_avail_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdelivery',
+            index=models.Index(fields=['claim_token'], name='delivery_claim_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationdelivery',
+            constraint=models.UniqueConstraint(fields=('notification', 'recipient'), name='unique_notification_recipient'),
+        ),
+    ]
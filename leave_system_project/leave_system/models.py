@@ -1,10 +1,17 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Exists, OuterRef
 from django.contrib.auth.models import User, Group
-from datetime import datetime, timedelta
-from django.template.loader import render_to_string
-from weasyprint import HTML
+from datetime import datetime
+from django.template.loader import get_template, render_to_string
 import os
+import hashlib
+import json
 from django.conf import settings
+from django.utils import timezone
+from .decision_files import decision_relative_path, write_atomic
+from .holidays import holiday_calendar
+from .pdf import DECISION_STYLESHEET, decision_renderer
 
 class Specialty(models.Model):
     name = models.CharField(max_length=255)
@@ -22,13 +29,24 @@ class Service(models.Model):
 class Department(models.Model):
     name = models.CharField(max_length=255)
     service = models.ForeignKey(Service, on_delete=models.CASCADE)
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
     head = models.ForeignKey('Employee', on_delete=models.SET_NULL, null=True, blank=True, related_name='headed_departments')
 
+    def clean(self):
+        if self.parent_id and self.id and (
+            self.parent_id == self.id
+            or DepartmentClosure.objects.filter(ancestor_id=self.id, descendant_id=self.parent_id).exists()
+        ):
+            raise ValidationError({'parent': "Ένα τμήμα δεν μπορεί να υπάγεται σε δικό του υποτμήμα."})
+
     def save(self, *args, **kwargs):
         old_department = Department.objects.get(id=self.id) if self.id else None
         old_head = old_department.head if old_department else None
 
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            self.clean()
+            super().save(*args, **kwargs)
+            self._sync_hierarchy(old_department)
 
         # Ενημέρωση ομάδας DepartmentHeads
         department_head_group = Group.objects.get(name='DepartmentHeads')
@@ -43,9 +61,65 @@ class Department(models.Model):
         if self.head and self.head.user:
             self.head.user.groups.add(department_head_group)
 
+    def _sync_hierarchy(self, old_department):
+        # Closure table: μία γραμμή (πρόγονος, απόγονος, βάθος) για κάθε ζεύγος της ιεραρχίας
+        if old_department is None:
+            links = [DepartmentClosure(ancestor_id=self.id, descendant_id=self.id, depth=0)]
+            if self.parent_id:
+                links += [
+                    DepartmentClosure(ancestor_id=ancestor_id, descendant_id=self.id, depth=depth + 1)
+                    for ancestor_id, depth in DepartmentClosure.objects.filter(
+                        descendant_id=self.parent_id).values_list('ancestor_id', 'depth')
+                ]
+            DepartmentClosure.objects.bulk_create(links, ignore_conflicts=True)
+            return
+        if old_department.parent_id == self.parent_id:
+            return
+        # Μετακίνηση υποδέντρου: κόβουμε τους παλιούς προγόνους και συνδέουμε με τους νέους
+        subtree = list(DepartmentClosure.objects.filter(ancestor_id=self.id).values_list('descendant_id', 'depth'))
+        subtree_ids = [descendant_id for descendant_id, _ in subtree]
+        DepartmentClosure.objects.filter(descendant_id__in=subtree_ids).exclude(ancestor_id__in=subtree_ids).delete()
+        if self.parent_id:
+            ancestors = DepartmentClosure.objects.filter(descendant_id=self.parent_id).values_list('ancestor_id', 'depth')
+            DepartmentClosure.objects.bulk_create([
+                DepartmentClosure(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=ancestor_depth + depth + 1)
+                for ancestor_id, ancestor_depth in ancestors
+                for descendant_id, depth in subtree
+            ])
+
     def __str__(self):
         return self.name
 
+def rebuild_department_closure():
+    parents = dict(Department.objects.values_list('id', 'parent_id'))
+    links = []
+    for department_id in parents:
+        ancestor_id, depth, seen = department_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            links.append(DepartmentClosure(ancestor_id=ancestor_id, descendant_id=department_id, depth=depth))
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    with transaction.atomic():
+        DepartmentClosure.objects.all().delete()
+        DepartmentClosure.objects.bulk_create(links, batch_size=1000)
+    return len(links)
+
+class DepartmentClosure(models.Model):
+    ancestor = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_department_closure')
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'ancestor'], name='department_closure_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor} > {self.descendant} ({self.depth})"
+
 class EmployeeType(models.Model):
     name = models.CharField(max_length=255)
 
@@ -77,6 +151,8 @@ class Employee(models.Model):
     position = models.ForeignKey(EmployeePosition, on_delete=models.SET_NULL, null=True)
     is_active = models.BooleanField(default=True)
     phone = models.CharField(max_length=20, null=True, blank=True)
+    roster_fingerprint = models.CharField(max_length=40, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         constraints = [
@@ -85,10 +161,33 @@ class Employee(models.Model):
                 name='unique_employee'
             )
         ]
+        indexes = [
+            models.Index(fields=['updated_at', 'id'], name='employee_sync'),
+        ]
 
     def full_name(self):
         return f"{self.name_in_accusative} {self.surname_in_accusative}"
 
+    def subordinate_departments(self):
+        # Όλα τα τμήματα κάτω από όσα διευθύνει, σε οποιοδήποτε βάθος
+        return Department.objects.filter(
+            Exists(DepartmentClosure.objects.filter(descendant=OuterRef('pk'), ancestor__head=self))
+        )
+
+    def subordinate_leave_requests(self):
+        return LeaveRequest.objects.filter(
+            Exists(DepartmentClosure.objects.filter(descendant=OuterRef('employee__department'), ancestor__head=self))
+        )
+
+    def used_leave_days(self, year, leave_type=None):
+        balances = self.leave_balances.filter(year=year)
+        if leave_type is not None:
+            balances = balances.filter(leave_type=leave_type)
+        return balances.aggregate(total=models.Sum('used_days'))['total'] or 0
+
+    def remaining_leave_days(self, year, leave_type):
+        return self.regular_leave_days + self.carryover_leave_days - self.used_leave_days(year, leave_type)
+
     def __str__(self):
         return self.full_name()
 
@@ -120,10 +219,23 @@ class PublicHoliday(models.Model):
             return datetime(self.year, self.month, self.day).date()
         return None
 
+def decision_template_version():
+    global _decision_template_version
+    if _decision_template_version is None:
+        digest = hashlib.sha256()
+        digest.update(get_template('leave_system/decision_template.html').template.source.encode('utf-8'))
+        with open(os.path.join(settings.STATICFILES_DIRS[0], DECISION_STYLESHEET), 'rb') as stylesheet:
+            digest.update(stylesheet.read())
+        _decision_template_version = digest.hexdigest()
+    return _decision_template_version
+
+_decision_template_version = None
+
 class LeaveRequest(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Υπό Επεξεργασία'),
         ('APPROVED', 'Εγκρίθηκε'),
+        ('GENERATING', 'Σε Έκδοση'),
         ('REJECTED', 'Απορρίφθηκε'),
         ('ISSUED', 'Εκδόθηκε'),
     ]
@@ -139,15 +251,33 @@ class LeaveRequest(models.Model):
     final_signatory = models.CharField(max_length=255, null=True, blank=True)
     custom_decision_text = models.TextField(null=True, blank=True)
     decision_pdf = models.FileField(upload_to='decisions/', null=True, blank=True)
+    decision_fingerprint = models.CharField(max_length=64, null=True, blank=True)
+    ledger_snapshot = models.JSONField(default=dict, blank=True)
+    statistics_snapshot = models.JSONField(default=dict, blank=True)
     header_text = models.TextField(null=True, blank=True)
     processed_by = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='processed_leaves')
     processed_by_name = models.CharField(max_length=255, null=True, blank=True)
     processed_by_phone = models.CharField(max_length=20, null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', '-created_at', '-id'], name='leaverequest_employee_keyset'),
+            models.Index(fields=['-created_at', '-id'], name='leaverequest_keyset'),
+            models.Index(fields=['employee', 'status'], name='leaverequest_employee_status'),
+            models.Index(fields=['updated_at', 'id'], name='leaverequest_sync'),
+        ]
+
+    SNAPSHOT_FIELDS = ('ledger_snapshot', 'statistics_snapshot')
+
     def save(self, *args, **kwargs):
         if not self.pk:
-            active_header = HeaderText.objects.filter(is_active=True).first()
-            self.header_text = active_header.text if active_header else "ΕΛΛΗΝΙΚΗ ΔΗΜΟΚΡΑΤΙΑ ΥΠΟΥΡΓΕΙΟ ΠΑΙΔΕΙΑΣ"
+            self.header_text = HeaderText.active_text()
+        elif not self._state.adding and kwargs.get('update_fields') is None:
+            # Τα snapshots τα γράφουν μόνο το ledger και τα στατιστικά· μια παλιά τιμή στη μνήμη δεν πρέπει να τα επικαλύψει
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.SNAPSHOT_FIELDS
+            ]
         super().save(*args, **kwargs)
 
     def calculate_total_working_days(self):
@@ -156,7 +286,7 @@ class LeaveRequest(models.Model):
             total_days += interval.calculate_working_days()
         return total_days
 
-    def generate_decision_pdf(self):
+    def decision_html(self):
         if self.processed_by:
             self.processed_by_name = self.processed_by.full_name()
             self.processed_by_phone = self.processed_by.phone
@@ -173,12 +303,50 @@ class LeaveRequest(models.Model):
             'date': datetime.now().strftime('%d/%m/%Y'),
             'static_url': 'file://' + settings.STATICFILES_DIRS[0] + '/'
         }
-        html_content = render_to_string('leave_system/decision_template.html', context)
-        pdf_file = f"decision_{(self.employee.sch_email or 'no_email')}_{self.created_at.strftime('%Y%m%d')}.pdf"
-        pdf_path = os.path.join(settings.MEDIA_ROOT, 'decisions', pdf_file)
-        os.makedirs(os.path.dirname(pdf_path), exist_ok=True)
-        HTML(string=html_content).write_pdf(pdf_path)
-        self.decision_pdf.name = os.path.join('decisions', pdf_file)
+        return render_to_string('leave_system/decision_template.html', context)
+
+    def compute_decision_fingerprint(self):
+        # Ό,τι επηρεάζει το περιεχόμενο της απόφασης· ίδιο αποτύπωμα σημαίνει ίδιο PDF
+        employee = self.employee
+        leave_type = self.leave_type
+        processed_by = self.processed_by
+        payload = {
+            'template': decision_template_version(),
+            'request': [
+                self.pk, self.header_text, self.protocol_number, self.kedasy_protocol_number,
+                self.custom_decision_text, self.calculate_total_working_days(),
+            ],
+            'leave_type': [leave_type.name, leave_type.subject_text, leave_type.decision_text],
+            'intervals': [[str(i.start_date), str(i.end_date)] for i in self.intervals.all()],
+            'employee': [
+                employee.name_in_accusative, employee.surname_in_accusative, employee.gender,
+                employee.role_description, employee.notification_recipients, employee.sch_email,
+            ],
+            'signatory': [
+                self.final_signatory,
+                processed_by.full_name() if processed_by else self.processed_by_name,
+                processed_by.phone if processed_by else self.processed_by_phone,
+            ],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def render_decision_pdf(self):
+        fingerprint = self.compute_decision_fingerprint()
+        pdf_name = decision_relative_path(self.created_at, self.employee.sch_email, fingerprint)
+        pdf_path = os.path.join(settings.MEDIA_ROOT, pdf_name)
+        html_content = None
+        if not os.path.exists(pdf_path):
+            html_content = self.decision_html()
+            write_atomic(pdf_path, lambda tmp_path: decision_renderer.write_pdf(html_content, tmp_path))
+        elif self.processed_by:
+            self.processed_by_name = self.processed_by.full_name()
+            self.processed_by_phone = self.processed_by.phone
+        self.decision_pdf.name = pdf_name
+        self.decision_fingerprint = fingerprint
+        return html_content
+
+    def generate_decision_pdf(self):
+        self.render_decision_pdf()
         self.status = 'ISSUED'
         self.save()
 
@@ -190,22 +358,14 @@ class LeaveInterval(models.Model):
     start_date = models.DateField()
     end_date = models.DateField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['start_date', 'end_date'], name='leaveinterval_range'),
+            models.Index(fields=['leave_request', 'end_date', 'start_date'], name='leaveinterval_request_range'),
+        ]
+
     def calculate_working_days(self):
-        current_date = self.start_date
-        working_days = 0
-        year = self.start_date.year
-        public_holidays = PublicHoliday.objects.all()
-        holiday_dates = set()
-        for holiday in public_holidays:
-            holiday_date = holiday.get_date_for_year(year)
-            if holiday_date and self.start_date <= holiday_date <= self.end_date:
-                holiday_dates.add(holiday_date)
-
-        while current_date <= self.end_date:
-            if current_date.weekday() not in [5, 6] and current_date not in holiday_dates:
-                working_days += 1
-            current_date += timedelta(days=1)
-        return working_days
+        return holiday_calendar.working_days(self.start_date, self.end_date)
 
     def __str__(self):
         return f"{self.start_date} - {self.end_date}"
@@ -215,6 +375,13 @@ class HeaderText(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_active = models.BooleanField(default=True)
 
+    DEFAULT_TEXT = "ΕΛΛΗΝΙΚΗ ΔΗΜΟΚΡΑΤΙΑ ΥΠΟΥΡΓΕΙΟ ΠΑΙΔΕΙΑΣ"
+
+    @classmethod
+    def active_text(cls):
+        from .reference import reference_data  # Εισαγωγή εδώ για αποφυγή κυκλικού import
+        return reference_data.header_text()
+
     def save(self, *args, **kwargs):
         if self.is_active:
             HeaderText.objects.exclude(id=self.id).update(is_active=False)
@@ -222,4 +389,154 @@ class HeaderText(models.Model):
 
     def __str__(self):
         return f"Header ({self.created_at})"
-    
\ No newline at end of file
+    
+class DecisionJob(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED', 'Σε Αναμονή'),
+        ('RUNNING', 'Σε Εκτέλεση'),
+        ('DONE', 'Ολοκληρώθηκε'),
+        ('FAILED', 'Απέτυχε'),
+    ]
+
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE, related_name='decision_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    available_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='decisionjob_status_avail_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.leave_request} - {self.status} ({self.attempts}/{self.max_attempts})"
+
+class LeaveBalance(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='leave_balances')
+    year = models.IntegerField()
+    leave_type = models.ForeignKey(LeaveType, on_delete=models.CASCADE)
+    used_days = models.IntegerField(default=0)
+    pending_days = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'year', 'leave_type'], name='unique_leave_balance')
+        ]
+
+    def __str__(self):
+        return f"{self.employee} - {self.leave_type} - {self.year}: {self.used_days}"
+
+
+class LeaveStatistic(models.Model):
+    # Σύνολα ανά υπηρεσία, τμήμα, τύπο άδειας, κατάσταση και μήνα. Απλά ids αντί για ForeignKey,
+    # ώστε η διαγραφή ενός τμήματος να μη σπάει τις αφαιρέσεις από παλιά snapshots· 0 = χωρίς
+    # υπηρεσία/τμήμα, για να ισχύει το unique constraint (τα NULL δεν συγκρίνονται)
+    service_id = models.IntegerField(default=0)
+    department_id = models.IntegerField(default=0)
+    leave_type_id = models.IntegerField()
+    status = models.CharField(max_length=20, choices=LeaveRequest.STATUS_CHOICES)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    days = models.IntegerField(default=0)
+    requests = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['year', 'month', 'service_id', 'department_id', 'leave_type_id', 'status'],
+                name='unique_leave_statistic',
+            )
+        ]
+        indexes = [
+            models.Index(fields=['department_id', 'year'], name='leavestatistic_department'),
+        ]
+
+    def __str__(self):
+        return f"{self.year}-{self.month:02d} {self.status}: {self.days}"
+
+
+class CalendarDay(models.Model):
+    # Ημερολόγιο για τον set-based επαναϋπολογισμό των στατιστικών (join διαστημάτων με ημέρες)
+    day = models.DateField(primary_key=True)
+    year = models.IntegerField()
+    month = models.IntegerField()
+    is_working_day = models.BooleanField()
+
+    class Meta:
+        indexes = [
+            # Εύρος ημερών μόνο στις εργάσιμες, χωρίς σάρωση του ημερολογίου ανά διάστημα
+            models.Index(fields=['is_working_day', 'day'], name='calendarday_working_day'),
+        ]
+
+    def __str__(self):
+        return str(self.day)
+
+
+
+class LeaveRollover(models.Model):
+    # Μία εγγραφή ανά έτος που κλείνει· το unique εμποδίζει τη διπλή μεταφορά υπολοίπων
+    year = models.IntegerField(unique=True)
+    leave_types = models.CharField(max_length=255)
+    max_carryover_days = models.IntegerField(null=True, blank=True)
+    annual_leave_days = models.IntegerField(null=True, blank=True)
+    summary = models.JSONField(default=dict, blank=True)
+    applied_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.year} ({self.applied_at:%Y-%m-%d %H:%M})"
+
+
+class DecisionNotification(models.Model):
+    # Ένα μήνυμα ανά εκδοθείσα απόφαση· νέα έκδοση (άλλο αποτύπωμα) σημαίνει νέα κοινοποίηση
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.CASCADE, related_name='notifications')
+    decision_fingerprint = models.CharField(max_length=64)
+    decision_pdf = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['leave_request', 'decision_fingerprint'], name='unique_decision_notification')
+        ]
+
+    def __str__(self):
+        return f"{self.leave_request} ({self.decision_fingerprint[:8]})"
+
+
+class NotificationDelivery(models.Model):
+    STATUS_CHOICES = [
+        ('QUEUED', 'Σε Αναμονή'),
+        ('SENDING', 'Σε Αποστολή'),
+        ('SENT', 'Εστάλη'),
+        ('FAILED', 'Απέτυχε'),
+    ]
+
+    notification = models.ForeignKey(DecisionNotification, on_delete=models.CASCADE, related_name='deliveries')
+    recipient = models.EmailField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    available_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, null=True, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'recipient'], name='unique_notification_recipient')
+        ]
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='delivery_status_avail_idx'),
+            models.Index(fields=['claim_token'], name='delivery_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.recipient} - {self.status} ({self.attempts}/{self.max_attempts})"
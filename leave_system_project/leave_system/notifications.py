@@ -0,0 +1,237 @@
+import logging
+import os
+import re
+import smtplib
+import time
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import DecisionNotification, LeaveRequest, NotificationDelivery
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+RETRY_BACKOFF_SECONDS = 60
+MAX_BACKOFF_SECONDS = 6 * 3600
+STALE_LOCK_SECONDS = 600
+EMAIL_PATTERN = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+DELIVERY_FIELDS = ['status', 'attempts', 'available_at', 'claim_token', 'locked_at', 'sent_at', 'last_error', 'updated_at']
+
+
+def decision_recipients(employee_email, notification_recipients):
+    # Η κοινοποίηση είναι ελεύθερο κείμενο (μία γραμμή ανά αποδέκτη)· αποστολή μόνο όπου υπάρχει email
+    recipients = []
+    if employee_email and getattr(settings, 'LEAVE_SYSTEM_NOTIFY_EMPLOYEE', True):
+        recipients.append(employee_email.lower())
+    for email in EMAIL_PATTERN.findall(notification_recipients or ''):
+        if email.lower() not in recipients:
+            recipients.append(email.lower())
+    return recipients
+
+
+def queue_decision_notifications(leave_request_ids, max_attempts=5):
+    """Ένα μήνυμα ανά εκδοθείσα απόφαση και μία αποστολή ανά αποδέκτη.
+
+    Καλείται μετά την έκδοση (worker αποφάσεων, μαζική έκδοση) και δεν στέλνει τίποτα·
+    η αποστολή γίνεται από τον run_notification_worker. Μια δεύτερη κλήση για την ίδια
+    απόφαση δεν δημιουργεί διπλά μηνύματα (unique ανά αποτύπωμα και αποδέκτη).
+    """
+    rows = LeaveRequest.objects.filter(
+        pk__in=list(leave_request_ids), status='ISSUED', decision_fingerprint__isnull=False,
+    ).exclude(decision_pdf='').exclude(decision_pdf__isnull=True).values_list(
+        'id', 'decision_fingerprint', 'decision_pdf', 'employee__sch_email', 'employee__notification_recipients',
+    )
+    recipients, notifications = {}, []
+    for leave_request_id, fingerprint, decision_pdf, employee_email, notification_recipients in rows:
+        addresses = decision_recipients(employee_email, notification_recipients)
+        if not addresses:
+            continue
+        recipients[(leave_request_id, fingerprint)] = addresses
+        notifications.append(DecisionNotification(
+            leave_request_id=leave_request_id, decision_fingerprint=fingerprint, decision_pdf=decision_pdf,
+        ))
+    if not notifications:
+        return 0
+    with transaction.atomic():
+        DecisionNotification.objects.bulk_create(notifications, ignore_conflicts=True)
+        # Με ignore_conflicts δεν επιστρέφονται ids, οπότε τα μηνύματα ξαναδιαβάζονται
+        existing = DecisionNotification.objects.filter(
+            leave_request_id__in={leave_request_id for leave_request_id, _ in recipients},
+        ).values_list('id', 'leave_request_id', 'decision_fingerprint')
+        NotificationDelivery.objects.bulk_create([
+            NotificationDelivery(notification_id=notification_id, recipient=recipient, max_attempts=max_attempts)
+            for notification_id, leave_request_id, fingerprint in existing
+            for recipient in recipients.get((leave_request_id, fingerprint), ())
+        ], ignore_conflicts=True)
+    return len(notifications)
+
+
+def requeue_stale_deliveries():
+    # Αποστολές που έμειναν SENDING από worker που τερματίστηκε απότομα
+    cutoff = timezone.now() - timedelta(seconds=STALE_LOCK_SECONDS)
+    return NotificationDelivery.objects.filter(status='SENDING', locked_at__lt=cutoff).update(
+        status='QUEUED', claim_token=None, locked_at=None,
+    )
+
+
+def claim_deliveries(batch_size=BATCH_SIZE):
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    candidates = list(NotificationDelivery.objects.filter(
+        status='QUEUED', available_at__lte=now,
+    ).order_by('available_at', 'id').values_list('id', flat=True)[:batch_size])
+    if not candidates:
+        return []
+    # Ένα conditional UPDATE για όλη την παρτίδα· το token ξεχωρίζει όσες πήρε αυτός ο worker
+    NotificationDelivery.objects.filter(id__in=candidates, status='QUEUED').update(
+        status='SENDING', claim_token=token, locked_at=now, updated_at=now,
+    )
+    return list(NotificationDelivery.objects.filter(claim_token=token).select_related(
+        'notification__leave_request__employee', 'notification__leave_request__leave_type',
+    ).order_by('notification_id', 'id'))
+
+
+def build_message(delivery, pdf_content):
+    notification = delivery.notification
+    leave_request = notification.leave_request
+    employee = leave_request.employee
+    protocol = f" (αρ. πρωτ. {leave_request.protocol_number})" if leave_request.protocol_number else ''
+    message = EmailMessage(
+        subject=f"Απόφαση χορήγησης άδειας: {leave_request.leave_type.name} - {employee.full_name()}",
+        body=(
+            f"Σας κοινοποιείται η απόφαση χορήγησης {leave_request.leave_type.name} "
+            f"του/της {employee.full_name()}{protocol}.\n\nΗ απόφαση επισυνάπτεται σε μορφή PDF.\n"
+        ),
+        to=[delivery.recipient],
+    )
+    message.attach(os.path.basename(notification.decision_pdf), pdf_content, 'application/pdf')
+    return message
+
+
+def _retry_or_fail(delivery, error, permanent=False):
+    delivery.last_error = error
+    if permanent or delivery.attempts >= delivery.max_attempts:
+        delivery.status = 'FAILED'
+    else:
+        delivery.status = 'QUEUED'
+        # Εκθετική αναμονή: 1, 2, 4, ... λεπτά, με ανώτατο όριο
+        backoff = min(RETRY_BACKOFF_SECONDS * 2 ** (delivery.attempts - 1), MAX_BACKOFF_SECONDS)
+        delivery.available_at = timezone.now() + timedelta(seconds=backoff)
+
+
+def _release(deliveries, delay=0):
+    # Επιστροφή στην ουρά χωρίς χρέωση προσπάθειας (π.χ. ο SMTP server δεν απαντά)
+    for delivery in deliveries:
+        delivery.status = 'QUEUED'
+        delivery.claim_token = None
+        delivery.locked_at = None
+        delivery.available_at = timezone.now() + timedelta(seconds=delay)
+        delivery.updated_at = timezone.now()
+
+
+def _open(connection, deliveries):
+    try:
+        connection.open()
+    except Exception:
+        logger.exception("Could not open SMTP connection; %s notifications returned to the queue", len(deliveries))
+        _release(deliveries, RETRY_BACKOFF_SECONDS)
+        NotificationDelivery.objects.bulk_update(deliveries, DELIVERY_FIELDS, batch_size=500)
+        return False
+    return True
+
+
+def send_deliveries(deliveries, connection):
+    """Αποστολή μιας παρτίδας από την ίδια ανοιχτή σύνδεση SMTP, ένα μήνυμα ανά αποδέκτη.
+
+    Η άρνηση ενός παραλήπτη (5xx) είναι μόνιμη αποτυχία μόνο για αυτόν. Σφάλμα σύνδεσης
+    κλείνει τη σύνδεση και επιστρέφει το υπόλοιπο της παρτίδας στην ουρά (με αναμονή,
+    χωρίς να χρεωθεί προσπάθεια). Επιστρέφει (εστάλησαν, απέτυχαν).
+    """
+    attachments = {}
+    sent = failed = 0
+    for index, delivery in enumerate(deliveries):
+        delivery.attempts += 1
+        delivery.claim_token = None
+        delivery.locked_at = None
+        notification = delivery.notification
+        try:
+            if notification.id not in attachments:
+                with default_storage.open(notification.decision_pdf, 'rb') as pdf:
+                    attachments[notification.id] = pdf.read()
+            message = build_message(delivery, attachments[notification.id])
+        except Exception:
+            _retry_or_fail(delivery, traceback.format_exc())
+            failed += 1
+            continue
+        try:
+            connection.send_messages([message])
+        except smtplib.SMTPResponseException as exc:
+            _retry_or_fail(delivery, f"{exc.smtp_code} {exc.smtp_error!r}", permanent=exc.smtp_code >= 500)
+            failed += 1
+        except smtplib.SMTPRecipientsRefused as exc:
+            _retry_or_fail(delivery, repr(exc.recipients), permanent=True)
+            failed += 1
+        except Exception:
+            _retry_or_fail(delivery, traceback.format_exc())
+            failed += 1
+            logger.exception("SMTP connection failed while sending notification %s", delivery.id)
+            connection.close()
+            _release(deliveries[index + 1:], RETRY_BACKOFF_SECONDS)
+            break
+        else:
+            delivery.status = 'SENT'
+            delivery.sent_at = timezone.now()
+            delivery.last_error = None
+            sent += 1
+    now = timezone.now()
+    for delivery in deliveries:
+        delivery.updated_at = now
+    NotificationDelivery.objects.bulk_update(deliveries, DELIVERY_FIELDS, batch_size=500)
+    return sent, failed
+
+
+def deliver_pending_notifications(batch_size=BATCH_SIZE, limit=None, connection=None):
+    """Αποστολή των εκκρεμών μηνυμάτων σε παρτίδες, από μία σύνδεση SMTP για όλες."""
+    connection = connection or get_connection()
+    totals = {'sent': 0, 'failed': 0}
+    try:
+        while limit is None or totals['sent'] + totals['failed'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - totals['sent'] - totals['failed'])
+            deliveries = claim_deliveries(size)
+            if not deliveries:
+                break
+            # Δεν ανοίγει νέα σύνδεση αν η προηγούμενη είναι ακόμη ανοιχτή
+            if not _open(connection, deliveries):
+                break
+            sent, failed = send_deliveries(deliveries, connection)
+            totals['sent'] += sent
+            totals['failed'] += failed
+    finally:
+        connection.close()
+    return totals
+
+
+def notification_worker_loop(batch_size=BATCH_SIZE, poll_interval=5.0, stop_event=None):
+    connection = get_connection()
+    try:
+        while stop_event is None or not stop_event.is_set():
+            close_old_connections()
+            deliveries = claim_deliveries(batch_size)
+            if not deliveries:
+                # Η σύνδεση SMTP δεν μένει ανοιχτή όσο η ουρά είναι άδεια
+                connection.close()
+                time.sleep(poll_interval)
+                continue
+            if not _open(connection, deliveries):
+                time.sleep(poll_interval)
+                continue
+            send_deliveries(deliveries, connection)
+    finally:
+        connection.close()
@@ -0,0 +1,49 @@
+import base64
+from dataclasses import dataclass
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = 50
+
+
+@dataclass
+class KeysetPage:
+    items: list
+    next_cursor: str = None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def encode_cursor(obj, field='created_at'):
+    raw = f"{getattr(obj, field).isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        value, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        value = parse_datetime(value)
+        return (value, int(pk)) if value else None
+    except (ValueError, UnicodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE, field='created_at', descending=True):
+    # Σελιδοποίηση με cursor στο (field, id): σταθερό κόστος ανά σελίδα, χωρίς OFFSET
+    if descending:
+        queryset = queryset.order_by(f'-{field}', '-id')
+    else:
+        queryset = queryset.order_by(field, 'id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        value, pk = position
+        after = 'lt' if descending else 'gt'
+        queryset = queryset.filter(Q(**{f'{field}__{after}': value}) | Q(**{field: value, f'id__{after}': pk}))
+    items = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(items[page_size - 1], field) if len(items) > page_size else None
+    return KeysetPage(items[:page_size], next_cursor)
@@ -0,0 +1,107 @@
+import mimetypes
+import os
+import threading
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from weasyprint import CSS, HTML
+from weasyprint.text.fonts import FontConfiguration
+
+from .metrics import pdf_render_timer
+
+try:
+    from weasyprint.urls import URLFetcher, URLFetcherResponse
+except ImportError:  # WeasyPrint < 66: οι fetchers είναι απλές συναρτήσεις
+    from weasyprint import default_url_fetcher
+    URLFetcher = None
+
+DECISION_STYLESHEET = 'css/decision.css'
+
+
+class StaticAssetCache:
+    """Κρατά στη μνήμη τα static αρχεία (π.χ. το λογότυπο) που ζητά το WeasyPrint."""
+
+    def __init__(self, roots):
+        self.roots = [os.path.realpath(root) for root in roots]
+        self._assets = {}
+
+    def get(self, url):
+        if url in self._assets:
+            return self._assets[url]
+        parsed = urlparse(url)
+        if parsed.scheme != 'file':
+            return None
+        path = os.path.realpath(unquote(parsed.path))
+        if not any(path.startswith(root + os.sep) for root in self.roots) or not os.path.isfile(path):
+            return None
+        with open(path, 'rb') as asset:
+            data = asset.read()
+        mime_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        self._assets[url] = (data, mime_type)
+        return self._assets[url]
+
+
+def make_url_fetcher(asset_cache):
+    if URLFetcher is not None:
+        class CachedURLFetcher(URLFetcher):
+            def fetch(self, url, headers=None):
+                asset = asset_cache.get(url)
+                if asset is None:
+                    return super().fetch(url, headers)
+                data, mime_type = asset
+                return URLFetcherResponse(url, data, {'Content-Type': mime_type})
+
+        return CachedURLFetcher()
+
+    def fetcher(url, *args, **kwargs):
+        asset = asset_cache.get(url)
+        if asset is None:
+            return default_url_fetcher(url, *args, **kwargs)
+        data, mime_type = asset
+        return {'string': data, 'mime_type': mime_type, 'redirected_url': url}
+
+    return fetcher
+
+
+class DecisionRenderer:
+    """Κοινό περιβάλλον WeasyPrint για όλες τις αποφάσεις μιας διεργασίας.
+
+    Το stylesheet αναλύεται μία φορά, η ρύθμιση γραμματοσειρών μοιράζεται και
+    τα static αρχεία σερβίρονται από μνήμη αντί για file:// σε κάθε έγγραφο.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _setup(self):
+        with self._lock:
+            if self._ready:
+                return
+            static_dir = settings.STATICFILES_DIRS[0]
+            self.font_config = FontConfiguration()
+            self.url_fetcher = make_url_fetcher(StaticAssetCache(settings.STATICFILES_DIRS))
+            with open(os.path.join(static_dir, DECISION_STYLESHEET), encoding='utf-8') as stylesheet:
+                self.stylesheets = [CSS(string=stylesheet.read(), font_config=self.font_config)]
+            self._ready = True
+
+    def warm_up(self):
+        if not self._ready:
+            self._setup()
+
+    def _html(self, html_content):
+        self.warm_up()
+        return HTML(string=html_content, base_url=settings.STATICFILES_DIRS[0], url_fetcher=self.url_fetcher)
+
+    def render(self, html_content):
+        with pdf_render_timer('render'):
+            return self._html(html_content).render(stylesheets=self.stylesheets, font_config=self.font_config)
+
+    def write_pdf(self, html_content, target=None):
+        with pdf_render_timer('write_pdf'):
+            return self._html(html_content).write_pdf(
+                target, stylesheets=self.stylesheets, font_config=self.font_config
+            )
+
+
+decision_renderer = DecisionRenderer()
@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+
+from .checks import PROCESS_LOCAL_CACHES
+
+VERSION_CHECK_SECONDS = 2.0
+
+# Πίνακες αναφοράς: όνομα -> (μοντέλο, ταξινόμηση)
+REFERENCE_TABLES = {
+    'leave_types': ('LeaveType', ('name', 'id')),
+    'specialties': ('Specialty', ('name', 'id')),
+    'services': ('Service', ('name', 'id')),
+    'employee_types': ('EmployeeType', ('name', 'id')),
+    'employee_positions': ('EmployeePosition', ('name', 'id')),
+    'public_holidays': ('PublicHoliday', ('id',)),
+    'header_texts': ('HeaderText', ('id',)),
+}
+
+
+def _version_key(name):
+    return f'leave_system:reference:{name}'
+
+
+class ReferenceData:
+    """Πίνακες αναφοράς στη μνήμη της διεργασίας, με κοινό μετρητή έκδοσης στην cache.
+
+    Κάθε πίνακας φορτώνεται μία φορά και σερβίρεται από τη μνήμη μέχρι να αλλάξει
+    ο μετρητής του (signals post_save/post_delete σε οποιονδήποτε worker). Ο
+    μετρητής ελέγχεται το πολύ μία φορά ανά VERSION_CHECK_SECONDS, με ένα get_many
+    για όλους τους πίνακες. Οι άλλοι workers βλέπουν την αλλαγή μόνο αν η cache είναι
+    κοινόχρηστη (όχι LocMemCache).
+    """
+
+    def __init__(self, check_interval=VERSION_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._versions = {}
+        self._checked_at = None
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def _shared_versions(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._versions
+        keys = {_version_key(name): name for name in REFERENCE_TABLES}
+        stored = cache.get_many(list(keys))
+        for key in keys:
+            if key not in stored:
+                # Τυχαία αρχική τιμή: αν το κλειδί χαθεί από την cache, η νέα τιμή δεν συμπίπτει με την παλιά
+                cache.add(key, random.getrandbits(48), None)
+                stored[key] = cache.get(key)
+        self._versions = {name: stored[key] for key, name in keys.items()}
+        self._checked_at = now
+        return self._versions
+
+    def version(self, name):
+        return self._shared_versions()[name]
+
+    def _table(self, name):
+        version = self.version(name)
+        entry = self._tables.get(name)
+        if entry is not None and entry[0] == version:
+            self.hits[name] += 1
+            return entry
+        with self._lock:
+            entry = self._tables.get(name)
+            if entry is not None and entry[0] == version:
+                self.hits[name] += 1
+                return entry
+            self.misses[name] += 1
+            model_name, ordering = REFERENCE_TABLES[name]
+            rows = tuple(apps.get_model('leave_system', model_name).objects.order_by(*ordering))
+            entry = (version, rows, {row.pk: row for row in rows})
+            self._tables[name] = entry
+        return entry
+
+    def all(self, name):
+        return self._table(name)[1]
+
+    def get(self, name, pk):
+        try:
+            return self._table(name)[2].get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+    def header_text(self):
+        from .models import HeaderText  # Εισαγωγή εδώ για αποφυγή κυκλικού import
+        active = [header for header in self.all('header_texts') if header.is_active]
+        return active[0].text if active else HeaderText.DEFAULT_TEXT
+
+    def invalidate(self, name=None):
+        names = [name] if name else list(REFERENCE_TABLES)
+        for table in names:
+            key = _version_key(table)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, random.getrandbits(48), None)
+            self._tables.pop(table, None)
+        # Ο επόμενος έλεγχος διαβάζει αμέσως τους νέους μετρητές
+        self._checked_at = None
+
+    def stats(self):
+        return {
+            name: {
+                'hits': self.hits[name],
+                'misses': self.misses[name],
+                'rows': len(self._tables[name][1]) if name in self._tables else None,
+            }
+            for name in REFERENCE_TABLES
+        }
+
+
+def cache_backend():
+    # Το backend που κρατά τους μετρητές έκδοσης· με cache ανά διεργασία δεν υπάρχει συνέπεια μεταξύ workers
+    backend_class = type(caches[DEFAULT_CACHE_ALIAS])
+    path = f'{backend_class.__module__}.{backend_class.__qualname__}'
+    return {'backend': path, 'shared': path not in PROCESS_LOCAL_CACHES}
+
+
+reference_data = ReferenceData()
+
+
+def table_for_model(model):
+    for name, (model_name, _) in REFERENCE_TABLES.items():
+        if model.__name__ == model_name and model._meta.app_label == 'leave_system':
+            return name
+    return None
@@ -0,0 +1,105 @@
+import time
+import uuid
+
+from django.core.cache import cache
+
+ROLE_SESSION_KEY = '_leave_system_roles'
+ROLE_CACHE_TTL = 300
+# Οι σφραγίδες διαβάζονται από την cache το πολύ μία φορά ανά διάστημα και χρήστη, όπως στο ReferenceData
+ROLE_VERSION_CHECK_SECONDS = 2.0
+GLOBAL_VERSION_KEY = 'leave_system:roles:all'
+
+_checked_versions = {}
+
+
+class Roles(frozenset):
+    @property
+    def is_admin(self):
+        return 'Administrator' in self
+
+    @property
+    def is_leave_officer_or_admin(self):
+        return bool(self & {'LeaveOfficer', 'Administrator'})
+
+    @property
+    def is_department_head(self):
+        return 'DepartmentHeads' in self
+
+    @property
+    def is_employee(self):
+        return 'Employee' in self
+
+
+def _user_version_key(user_id):
+    return f'leave_system:roles:{user_id}'
+
+
+def role_versions(user_id):
+    now = time.monotonic()
+    checked = _checked_versions.get(user_id)
+    if checked is not None and now - checked[0] < ROLE_VERSION_CHECK_SECONDS:
+        return checked[1]
+    keys = [GLOBAL_VERSION_KEY, _user_version_key(user_id)]
+    stored = cache.get_many(keys)
+    for key in keys:
+        if key not in stored:
+            cache.add(key, uuid.uuid4().hex, None)
+            stored[key] = cache.get(key)
+    versions = [stored[key] for key in keys]
+    _checked_versions[user_id] = (now, versions)
+    return versions
+
+
+def invalidate_roles(user_ids=None):
+    # Νέα σφραγίδα έκδοσης: οι ρόλοι στο session όσων επηρεάζονται ξαναφορτώνονται
+    if user_ids is None:
+        cache.set(GLOBAL_VERSION_KEY, uuid.uuid4().hex, None)
+        _checked_versions.clear()
+        return
+    cache.set_many({_user_version_key(user_id): uuid.uuid4().hex for user_id in user_ids}, None)
+    for user_id in user_ids:
+        _checked_versions.pop(user_id, None)
+
+
+def get_roles(user, session=None):
+    if not user.is_authenticated:
+        return Roles()
+    roles = getattr(user, '_leave_system_roles', None)
+    if roles is not None:
+        return roles
+
+    versions = role_versions(user.pk)
+    entry = session.get(ROLE_SESSION_KEY) if session is not None else None
+    if (entry and entry.get('user') == user.pk and entry.get('versions') == versions
+            and time.time() - entry.get('loaded', 0) < ROLE_CACHE_TTL):
+        roles = Roles(entry['roles'])
+    else:
+        roles = Roles(user.groups.values_list('name', flat=True))
+        if session is not None:
+            session[ROLE_SESSION_KEY] = {
+                'user': user.pk, 'versions': versions, 'roles': sorted(roles), 'loaded': time.time(),
+            }
+    user._leave_system_roles = roles
+    return roles
+
+
+class RoleMiddleware:
+    """Φορτώνει τους ρόλους του χρήστη από το session πριν τρέξουν τα user_passes_test."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if hasattr(request, 'user') and request.user.is_authenticated:
+            get_roles(request.user, getattr(request, 'session', None))
+        return None
+
+
+def user_roles(request):
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {'user_roles': Roles()}
+    return {'user_roles': get_roles(user, getattr(request, 'session', None))}
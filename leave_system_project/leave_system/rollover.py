@@ -0,0 +1,137 @@
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+from .models import Employee, LeaveBalance, LeaveRollover, LeaveType
+
+
+def rollover_options(leave_types=None, max_carryover_days=None, annual_leave_days=None):
+    # Οι παράμετροι της γραμμής εντολών υπερισχύουν των settings
+    return {
+        'leave_types': list(leave_types or getattr(settings, 'LEAVE_SYSTEM_REGULAR_LEAVE_TYPES', ['ΚΑ'])),
+        'max_carryover_days': (
+            max_carryover_days if max_carryover_days is not None
+            else getattr(settings, 'LEAVE_SYSTEM_MAX_CARRYOVER_DAYS', None)
+        ),
+        'annual_leave_days': (
+            annual_leave_days if annual_leave_days is not None
+            else getattr(settings, 'LEAVE_SYSTEM_ANNUAL_LEAVE_DAYS', None)
+        ),
+    }
+
+
+def rollover_expressions(year, leave_type_ids, max_carryover_days=None):
+    """Οι νέες τιμές ως εκφράσεις SQL, ίδιες για το annotate της προεπισκόπησης και το UPDATE.
+
+    Οι ημέρες του έτους καλύπτονται πρώτα από το υπόλοιπο που μεταφέρθηκε και ό,τι
+    μείνει από αυτό λήγει· μεταφέρονται μόνο οι αχρησιμοποίητες ημέρες του ετήσιου
+    δικαιώματος, έως το ανώτατο όριο. Οι χρησιμοποιημένες ημέρες έρχονται από το ledger.
+    """
+    used = Coalesce(Subquery(
+        LeaveBalance.objects.filter(employee=OuterRef('pk'), year=year, leave_type_id__in=leave_type_ids)
+        .values('employee').annotate(total=Sum('used_days')).values('total'),
+        output_field=IntegerField(),
+    ), Value(0))
+    unused = Greatest(F('regular_leave_days') - Greatest(used - F('carryover_leave_days'), Value(0)), Value(0))
+    return {
+        'used_days': used,
+        'unused_days': unused,
+        'expired_days': Greatest(F('carryover_leave_days') - used, Value(0)),
+        'new_carryover': unused if max_carryover_days is None else Least(unused, Value(max_carryover_days)),
+    }
+
+
+def rollover_queryset(year, leave_type_ids, max_carryover_days=None):
+    # Ενεργοί υπάλληλοι με τις νέες τιμές ως annotations
+    return Employee.objects.filter(is_active=True).annotate(
+        **rollover_expressions(year, leave_type_ids, max_carryover_days),
+    )
+
+
+def rollover_summary(year, leave_type_ids, max_carryover_days=None, annual_leave_days=None):
+    # Αθροίσματα απευθείας πάνω στις εκφράσεις: ένα aggregate πάνω σε annotations με subquery
+    # τα μεταφέρει σε εξωτερικό SELECT, όπου στο SQLite τα ονόματα στηλών γίνονται literals
+    expressions = rollover_expressions(year, leave_type_ids, max_carryover_days)
+    changed = ~Q(carryover_leave_days=expressions['new_carryover'])
+    if annual_leave_days is not None:
+        changed |= ~Q(regular_leave_days=annual_leave_days)
+    summary = Employee.objects.filter(is_active=True).aggregate(
+        employees=Count('id'),
+        changed=Count('id', filter=changed),
+        used_days=Coalesce(Sum(expressions['used_days']), 0),
+        carryover_before=Coalesce(Sum('carryover_leave_days'), 0),
+        carryover_after=Coalesce(Sum(expressions['new_carryover']), 0),
+        expired_days=Coalesce(Sum(expressions['expired_days']), 0),
+        capped_days=Coalesce(Sum(expressions['unused_days'] - expressions['new_carryover']), 0),
+    )
+    if annual_leave_days is not None:
+        summary['regular_reset'] = Employee.objects.filter(is_active=True).exclude(
+            regular_leave_days=annual_leave_days,
+        ).count()
+    # Αιτήσεις που εκκρεμούν δεν μετράνε ως χρησιμοποιημένες· αναφέρονται για έλεγχο πριν την εφαρμογή
+    summary['pending_employees'] = LeaveBalance.objects.filter(
+        year=year, leave_type_id__in=leave_type_ids, pending_days__gt=0, employee__is_active=True,
+    ).values('employee').distinct().count()
+    return summary
+
+
+def _leave_type_ids(short_names):
+    ids = list(LeaveType.objects.filter(short_name__in=short_names).values_list('id', flat=True))
+    if not ids:
+        raise ValueError(f"No leave types with short name {', '.join(short_names)}.")
+    return ids
+
+
+def plan_rollover(year, **options):
+    """Η μεταφορά υπολοίπων του `year` χωρίς εγγραφή: (queryset με τις νέες τιμές, σύνοψη)."""
+    options = rollover_options(**options)
+    leave_type_ids = _leave_type_ids(options['leave_types'])
+    started = time.perf_counter()
+    summary = rollover_summary(year, leave_type_ids, options['max_carryover_days'], options['annual_leave_days'])
+    summary['seconds'] = time.perf_counter() - started
+    return rollover_queryset(year, leave_type_ids, options['max_carryover_days']), summary
+
+
+def apply_rollover(year, **options):
+    """Μεταφορά υπολοίπων του `year` στο επόμενο έτος με ένα UPDATE για όλους τους ενεργούς υπαλλήλους.
+
+    Η εγγραφή LeaveRollover του έτους γίνεται στην ίδια συναλλαγή, οπότε μια δεύτερη
+    εκτέλεση (ή μια ταυτόχρονη) αποτυγχάνει χωρίς να αλλάξει κανένα υπόλοιπο.
+    """
+    if year >= date.today().year:
+        raise ValueError(f"Year {year} has not ended yet.")
+    if LeaveRollover.objects.filter(year__gte=year).exists():
+        raise ValueError(f"Leave balances for {year} (or a later year) have already been rolled over.")
+    options = rollover_options(**options)
+    started = time.perf_counter()
+    try:
+        with transaction.atomic():
+            run = LeaveRollover.objects.create(
+                year=year, leave_types=','.join(options['leave_types']),
+                max_carryover_days=options['max_carryover_days'], annual_leave_days=options['annual_leave_days'],
+            )
+            leave_type_ids = _leave_type_ids(options['leave_types'])
+            summary = rollover_summary(
+                year, leave_type_ids, options['max_carryover_days'], options['annual_leave_days'],
+            )
+            expressions = rollover_expressions(year, leave_type_ids, options['max_carryover_days'])
+            fields = {
+                # Όλες οι εκφράσεις του SET διαβάζουν τις παλιές τιμές της γραμμής
+                'carryover_leave_days': expressions['new_carryover'],
+                # update() δεν ενημερώνει το auto_now· χρειάζεται για τον διαφορικό συγχρονισμό του API
+                'updated_at': timezone.now(),
+            }
+            if options['annual_leave_days'] is not None:
+                fields['regular_leave_days'] = options['annual_leave_days']
+            summary['updated'] = Employee.objects.filter(is_active=True).update(**fields)
+            summary['seconds'] = time.perf_counter() - started
+            run.summary = summary
+            run.save(update_fields=['summary'])
+    except IntegrityError:
+        raise ValueError(f"Leave balances for {year} have already been rolled over.")
+    return run
@@ -0,0 +1,148 @@
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .absences import invalidate_absences
+from .holidays import holiday_calendar
+from .ledger import remove_request_ledger, sync_request_ledger
+from .leave_statistics import remove_request_statistics, sync_employee_statistics, sync_request_statistics
+from .models import (
+    Department, Employee, EmployeePosition, EmployeeType, HeaderText, LeaveInterval, LeaveRequest, LeaveType,
+    PublicHoliday, Service, Specialty, rebuild_department_closure,
+)
+from .reference import reference_data, table_for_model
+from .roles import invalidate_roles
+
+
+def _deleted_directly(origin, model):
+    # Στις διαγραφές με cascade από άλλο μοντέλο (π.χ. Employee) το ledger διαγράφεται μαζί
+    if origin is None:
+        return True
+    if isinstance(origin, QuerySet):
+        return origin.model is model
+    return isinstance(origin, model)
+
+
+@receiver(post_save, sender=PublicHoliday)
+@receiver(post_delete, sender=PublicHoliday)
+def invalidate_holiday_calendar(sender, **kwargs):
+    # Αυξάνει και τον μετρητή έκδοσης των αργιών στην cache πινάκων αναφοράς
+    holiday_calendar.invalidate()
+    transaction.on_commit(invalidate_absences)
+
+
+@receiver(post_save, sender=LeaveType)
+@receiver(post_delete, sender=LeaveType)
+@receiver(post_save, sender=Specialty)
+@receiver(post_delete, sender=Specialty)
+@receiver(post_save, sender=Service)
+@receiver(post_delete, sender=Service)
+@receiver(post_save, sender=EmployeeType)
+@receiver(post_delete, sender=EmployeeType)
+@receiver(post_save, sender=EmployeePosition)
+@receiver(post_delete, sender=EmployeePosition)
+@receiver(post_save, sender=HeaderText)
+@receiver(post_delete, sender=HeaderText)
+def invalidate_reference_data(sender, **kwargs):
+    reference_data.invalidate(table_for_model(sender))
+
+
+@receiver(post_save, sender=LeaveRequest)
+def update_ledger_for_request(sender, instance, **kwargs):
+    sync_request_ledger(instance.pk)
+    sync_request_statistics([instance.pk])
+
+
+@receiver(post_save, sender=LeaveRequest)
+@receiver(post_delete, sender=LeaveRequest)
+def invalidate_absences_for_request(sender, instance, **kwargs):
+    department_id = Employee.objects.filter(pk=instance.employee_id).values_list('department_id', flat=True).first()
+    # Μετά το commit: αλλιώς ένας ταυτόχρονος υπολογισμός θα αποθήκευε τα παλιά δεδομένα με τη νέα σφραγίδα
+    transaction.on_commit(lambda: invalidate_absences([department_id]))
+
+
+@receiver(post_save, sender=LeaveInterval)
+@receiver(post_delete, sender=LeaveInterval)
+def invalidate_absences_for_interval(sender, instance, **kwargs):
+    department_id = LeaveRequest.objects.filter(pk=instance.leave_request_id).values_list(
+        'employee__department_id', flat=True
+    ).first()
+    transaction.on_commit(lambda: invalidate_absences([department_id]))
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+@receiver(post_save, sender=Department)
+def invalidate_all_absences(sender, **kwargs):
+    # Μετακίνηση υπαλλήλου ή αλλαγή τμήματος: δεν ξέρουμε το παλιό τμήμα, οπότε ακυρώνονται όλα
+    transaction.on_commit(invalidate_absences)
+
+
+@receiver(pre_delete, sender=LeaveRequest)
+def remove_ledger_for_request(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, LeaveRequest):
+        remove_request_ledger(instance.pk)
+    # Τα στατιστικά δεν διαγράφονται με cascade από τον υπάλληλο, οπότε αφαιρούνται πάντα
+    remove_request_statistics(instance.pk)
+
+
+@receiver(post_save, sender=LeaveInterval)
+@receiver(post_delete, sender=LeaveInterval)
+def touch_request_for_interval(sender, instance, **kwargs):
+    # Τα διαστήματα είναι μέρος της αίτησης στο API, οπότε αλλάζουν και το ETag της
+    LeaveRequest.objects.filter(pk=instance.leave_request_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=LeaveInterval)
+def update_ledger_for_interval(sender, instance, **kwargs):
+    sync_request_ledger(instance.leave_request_id)
+    sync_request_statistics([instance.leave_request_id])
+
+
+@receiver(post_delete, sender=LeaveInterval)
+def update_ledger_for_deleted_interval(sender, instance, origin=None, **kwargs):
+    if _deleted_directly(origin, LeaveInterval):
+        sync_request_ledger(instance.leave_request_id)
+        sync_request_statistics([instance.leave_request_id])
+
+
+@receiver(post_save, sender=Employee)
+def update_statistics_for_employee(sender, instance, created, **kwargs):
+    # Τα στατιστικά μετράνε στο τρέχον τμήμα του υπαλλήλου· χωρίς αλλαγή τμήματος δεν γράφεται τίποτα
+    if not created:
+        sync_employee_statistics([instance.pk])
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    # Καλύπτει manage_users, Department.save και το admin, που αλλάζουν τις ομάδες μέσω του m2m
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_roles([instance.pk])
+    elif pk_set:
+        invalidate_roles(pk_set)
+    else:
+        invalidate_roles()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_all_roles(sender, **kwargs):
+    invalidate_roles()
+
+
+@receiver(pre_delete, sender=Department)
+def remember_department_employees(sender, instance, **kwargs):
+    instance._employee_ids = list(Employee.objects.filter(department=instance).values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Department)
+def rebuild_hierarchy_after_delete(sender, instance, **kwargs):
+    # Τα υποτμήματα ανεβαίνουν ένα επίπεδο (SET_NULL) χωρίς save, οπότε ξαναχτίζεται το closure
+    rebuild_department_closure()
+    transaction.on_commit(invalidate_absences)
+    # Οι υπάλληλοι του τμήματος μένουν χωρίς τμήμα (SET_NULL, χωρίς signals)
+    sync_employee_statistics(getattr(instance, '_employee_ids', ()))
@@ -0,0 +1,168 @@
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.db import transaction
+
+from .absences import invalidate_absences
+from .conflicts import ConflictChecker
+from .ledger import record_new_requests
+from .leave_statistics import record_new_request_statistics
+from .models import Employee, HeaderText, LeaveInterval, LeaveRequest, LeaveType
+from .reference import reference_data
+
+MAX_BATCH_SIZE = 500
+BATCH_STATUSES = ('PENDING', 'APPROVED')
+
+
+@dataclass
+class LeaveSubmission:
+    employee: Employee = None
+    leave_type: LeaveType = None
+    intervals: list = field(default_factory=list)
+    status: str = 'PENDING'
+    confirm_understaffing: bool = False
+    errors: list = field(default_factory=list)
+    leave_request: LeaveRequest = None
+
+
+def _format_day(day):
+    return day.strftime('%d/%m/%Y')
+
+
+def validate_submissions(submissions):
+    """Ελέγχει όλες τις αιτήσεις μαζί· επιστρέφει True αν καμία δεν έχει σφάλματα."""
+    checkable = [(index, submission) for index, submission in enumerate(submissions) if submission.employee]
+    for _, submission in checkable:
+        for start_date, end_date in submission.intervals:
+            if end_date < start_date:
+                submission.errors.append(
+                    f"Η ημερομηνία λήξης {_format_day(end_date)} είναι πριν από την έναρξη {_format_day(start_date)}."
+                )
+    checker = ConflictChecker([(index, submission.employee, submission.intervals) for index, submission in checkable])
+    for index, submission in checkable:
+        conflicts = checker.check(index)
+        for overlap in conflicts.overlaps:
+            if overlap['leave_request']:
+                source = f"την αίτηση #{overlap['leave_request']}"
+            elif overlap['submission'] == index:
+                source = "άλλο διάστημα της ίδιας αίτησης"
+            else:
+                source = f"την αίτηση {overlap['submission'] + 1} της παρτίδας"
+            submission.errors.append(
+                f"Επικαλύπτεται με {source} ({_format_day(overlap['start'])} - {_format_day(overlap['end'])})."
+            )
+        if conflicts.understaffed_days and not submission.confirm_understaffing:
+            submission.errors.append("Στις {} απουσιάζουν περισσότεροι από {} από τους {} υπαλλήλους του τμήματος.".format(
+                ', '.join(day.strftime('%d/%m') for day in conflicts.understaffed_days),
+                conflicts.absence_limit, conflicts.department_size,
+            ))
+    return not any(submission.errors for submission in submissions)
+
+
+def create_submissions(submissions):
+    """Αποθήκευση σε μία συναλλαγή με bulk_create αντί για save ανά αίτηση.
+
+    Ο έλεγχος επικαλύψεων γίνεται ξανά μέσα στη συναλλαγή, αφού κλειδωθούν οι
+    υπάλληλοι, ώστε δύο ταυτόχρονες υποβολές να μην περάσουν και οι δύο. Αν
+    βρεθούν σφάλματα δεν αποθηκεύεται τίποτα και επιστρέφεται None (τα σφάλματα
+    είναι στο submission.errors). Το bulk_create δεν στέλνει signals, οπότε ledger,
+    στατιστικά και ημερολόγιο απουσιών ενημερώνονται εδώ για όλη την παρτίδα.
+    """
+    header_text = HeaderText.active_text()
+    leave_requests = [
+        LeaveRequest(
+            employee=submission.employee, leave_type=submission.leave_type,
+            status=submission.status, header_text=header_text,
+        )
+        for submission in submissions
+    ]
+    with transaction.atomic():
+        # FOR UPDATE με σταθερή σειρά για αποφυγή deadlock· στο SQLite το BEGIN IMMEDIATE κλειδώνει ήδη τη βάση
+        list(Employee.objects.select_for_update().filter(
+            id__in={submission.employee.id for submission in submissions},
+        ).order_by('id').values_list('id', flat=True))
+        if not validate_submissions(submissions):
+            return None
+        items = [(leave_request, submission.intervals) for leave_request, submission in zip(leave_requests, submissions)]
+        record_new_requests(items)
+        record_new_request_statistics(items)
+        LeaveRequest.objects.bulk_create(leave_requests, batch_size=500)
+        LeaveInterval.objects.bulk_create([
+            LeaveInterval(leave_request=leave_request, start_date=start_date, end_date=end_date)
+            for leave_request, submission in zip(leave_requests, submissions)
+            for start_date, end_date in submission.intervals
+        ], batch_size=1000)
+        department_ids = {submission.employee.department_id for submission in submissions}
+        transaction.on_commit(lambda: invalidate_absences(department_ids))
+    for leave_request, submission in zip(leave_requests, submissions):
+        submission.leave_request = leave_request
+    return leave_requests
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Μη έγκυρη ημερομηνία: {value!r}.")
+
+
+def _reference(value):
+    # Μόνο id (int, όχι bool: True == 1) ή κείμενο· λίστες και αντικείμενα JSON δεν είναι hashable
+    if isinstance(value, str) or (isinstance(value, int) and not isinstance(value, bool)):
+        return value
+    return None
+
+
+def parse_batch(entries):
+    """Μετατρέπει τις εγγραφές JSON σε LeaveSubmission με ένα query για τους υπαλλήλους.
+
+    Κάθε εγγραφή: {"employee": id ή sch_email, "leave_type": id ή short_name,
+    "intervals": [{"start_date": "YYYY-MM-DD", "end_date": "YYYY-MM-DD"}, ...],
+    "status": "PENDING"|"APPROVED", "confirm_understaffing": bool}
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValueError("Αναμένεται μη κενή λίστα αιτήσεων.")
+    if len(entries) > MAX_BATCH_SIZE:
+        raise ValueError(f"Έως {MAX_BATCH_SIZE} αιτήσεις ανά παρτίδα.")
+    if not all(isinstance(entry, dict) for entry in entries):
+        raise ValueError("Κάθε αίτηση πρέπει να είναι αντικείμενο JSON.")
+
+    references = [_reference(entry.get('employee')) for entry in entries]
+    employees = Employee.objects.filter(
+        id__in=[reference for reference in references if isinstance(reference, int)]
+    ) | Employee.objects.filter(sch_email__in=[reference for reference in references if isinstance(reference, str)])
+    by_reference = {}
+    for employee in employees:
+        by_reference[employee.id] = employee
+        if employee.sch_email:
+            by_reference[employee.sch_email] = employee
+    leave_types = {}
+    for leave_type in reference_data.all('leave_types'):
+        leave_types[leave_type.id] = leave_type
+        leave_types[leave_type.short_name] = leave_type
+
+    submissions = []
+    for entry, reference in zip(entries, references):
+        submission = LeaveSubmission(
+            employee=by_reference.get(reference),
+            leave_type=leave_types.get(_reference(entry.get('leave_type'))),
+            status=entry.get('status', 'PENDING'),
+            confirm_understaffing=bool(entry.get('confirm_understaffing')),
+        )
+        if submission.employee is None:
+            submission.errors.append(f"Άγνωστος υπάλληλος: {entry.get('employee')!r}.")
+        if submission.leave_type is None:
+            submission.errors.append(f"Άγνωστος τύπος άδειας: {entry.get('leave_type')!r}.")
+        if submission.status not in BATCH_STATUSES:
+            submission.errors.append(f"Μη επιτρεπτή κατάσταση: {submission.status!r}.")
+        intervals = entry.get('intervals')
+        if not isinstance(intervals, list) or not intervals:
+            submission.errors.append("Απαιτείται τουλάχιστον ένα διάστημα.")
+            intervals = []
+        for interval in intervals:
+            try:
+                submission.intervals.append((_parse_date(interval.get('start_date')), _parse_date(interval.get('end_date'))))
+            except (AttributeError, ValueError) as e:
+                submission.errors.append(str(e) if isinstance(e, ValueError) else "Μη έγκυρο διάστημα.")
+        submissions.append(submission)
+    return submissions
@@ -0,0 +1,242 @@
+import random
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.db import transaction
+
+from .absences import invalidate_absences
+from .holidays import holiday_calendar
+from .ledger import rebuild_ledger
+from .leave_statistics import rebuild_statistics
+from .models import (
+    Department, Employee, EmployeePosition, EmployeeType, HeaderText, LeaveInterval, LeaveRequest, LeaveType,
+    PublicHoliday, Service, Specialty, rebuild_department_closure,
+)
+from .reference import reference_data
+from .roles import invalidate_roles
+
+GROUPS = ('Employee', 'LeaveOfficer', 'Administrator', 'DepartmentHeads')
+LEAVE_TYPES = [
+    ('Κανονική Άδεια', 'ΚΑ'), ('Αναρρωτική Άδεια', 'ΑΝ'), ('Άδεια Μητρότητας', 'ΜΗ'),
+    ('Άδεια Αιμοδοσίας', 'ΑΙ'), ('Ειδική Άδεια', 'ΕΙ'),
+]
+FIXED_HOLIDAYS = [
+    ('Πρωτοχρονιά', 1, 1), ('Θεοφάνεια', 6, 1), ('25η Μαρτίου', 25, 3), ('Πρωτομαγιά', 1, 5),
+    ('Κοίμηση της Θεοτόκου', 15, 8), ('28η Οκτωβρίου', 28, 10), ('Χριστούγεννα', 25, 12),
+    ('Σύναξη της Θεοτόκου', 26, 12),
+]
+MOVABLE_HOLIDAYS = [('Καθαρά Δευτέρα', -48), ('Μεγάλη Παρασκευή', -2), ('Δευτέρα του Πάσχα', 1), ('Αγίου Πνεύματος', 50)]
+STATUS_WEIGHTS = [('ISSUED', 60), ('APPROVED', 10), ('PENDING', 15), ('REJECTED', 15)]
+
+
+@dataclass
+class SyntheticConfig:
+    services: int = 5
+    departments_per_service: int = 10
+    employees: int = 10000
+    requests_per_employee: int = 25
+    max_intervals: int = 3
+    start_year: int = 2021
+    end_year: int = 2025
+    seed: int = 42
+    batch_size: int = 5000
+    rebuild_ledger: bool = True
+    prefix: str = field(default=None)
+
+    def __post_init__(self):
+        if self.prefix is None:
+            self.prefix = f'syn{self.seed}'
+
+
+def orthodox_easter(year):
+    # Αλγόριθμος Meeus για το Ιουλιανό Πάσχα, μετατροπή σε Γρηγοριανό (1900-2099)
+    a, b, c = year % 4, year % 7, year % 19
+    d = (19 * c + 15) % 30
+    e = (2 * a + 4 * b - d + 34) % 7
+    month, day = divmod(d + e + 114, 31)
+    return date(year, month, day + 1) + timedelta(days=13)
+
+
+def _ensure(model, names, **extra):
+    existing = set(model.objects.filter(name__in=names).values_list('name', flat=True))
+    model.objects.bulk_create([model(name=name, **extra) for name in names if name not in existing])
+    return list(model.objects.filter(name__in=names))
+
+
+def _reference_tables(config):
+    for name in GROUPS:
+        Group.objects.get_or_create(name=name)
+    existing = set(LeaveType.objects.values_list('short_name', flat=True))
+    LeaveType.objects.bulk_create([
+        LeaveType(name=name, short_name=short_name, subject_text=f'Χορήγηση {name}', decision_text=f'χορηγούμε {name}')
+        for name, short_name in LEAVE_TYPES if short_name not in existing
+    ])
+    specialties = _ensure(Specialty, [f'ΠΕ{70 + i}' for i in range(10)], short_name='ΠΕ')
+    employee_types = _ensure(EmployeeType, ['Μόνιμος', 'Αναπληρωτής', 'Διοικητικός'])
+    positions = _ensure(EmployeePosition, ['Εκπαιδευτικός', 'Ψυχολόγος', 'Κοινωνικός Λειτουργός', 'Διοικητικός Υπάλληλος'])
+    if not HeaderText.objects.exists():
+        HeaderText.objects.create(text=HeaderText.DEFAULT_TEXT)
+
+    if not PublicHoliday.objects.filter(is_fixed=True).exists():
+        PublicHoliday.objects.bulk_create([
+            PublicHoliday(name=name, day=day, month=month, is_fixed=True) for name, day, month in FIXED_HOLIDAYS
+        ])
+    existing_years = set(PublicHoliday.objects.filter(is_fixed=False).values_list('year', flat=True))
+    movable = []
+    for year in range(config.start_year, config.end_year + 1):
+        if year in existing_years:
+            continue
+        easter = orthodox_easter(year)
+        for name, offset in MOVABLE_HOLIDAYS:
+            day = easter + timedelta(days=offset)
+            movable.append(PublicHoliday(name=name, day=day.day, month=day.month, year=year, is_fixed=False))
+    PublicHoliday.objects.bulk_create(movable)
+    return list(LeaveType.objects.all()), specialties, employee_types, positions
+
+
+def _organization(config):
+    services = Service.objects.bulk_create([
+        Service(name=f'{config.prefix} Διεύθυνση {number + 1}') for number in range(config.services)
+    ])
+    # Ένα γραφείο διευθυντή ανά υπηρεσία, με τα τμήματα της υπηρεσίας από κάτω
+    roots = Department.objects.bulk_create([
+        Department(name=f'{service.name} / Γραφείο Διευθυντή', service=service) for service in services
+    ])
+    children = Department.objects.bulk_create([
+        Department(name=f'{root.service.name} / Τμήμα {number + 1}', service=root.service, parent=root)
+        for root in roots
+        for number in range(config.departments_per_service - 1)
+    ], batch_size=config.batch_size)
+    departments = roots + children
+    return services, departments
+
+
+def _people(config, rng, departments, specialties, employee_types, positions):
+    password = make_password(None)
+    emails = [f'{config.prefix}.{number}@sch.gr' for number in range(config.employees)]
+    User.objects.bulk_create(
+        [User(username=email, email=email, password=password) for email in emails], batch_size=config.batch_size,
+    )
+    users = dict(User.objects.filter(username__in=emails).values_list('username', 'id'))
+    employee_group = Group.objects.get(name='Employee')
+    User.groups.through.objects.bulk_create([
+        User.groups.through(user_id=user_id, group_id=employee_group.id) for user_id in users.values()
+    ], batch_size=config.batch_size)
+
+    employees = []
+    for number, email in enumerate(emails):
+        department = departments[number % len(departments)] if number < len(departments) else rng.choice(departments)
+        employees.append(Employee(
+            user_id=users[email], sch_email=email,
+            name_in_accusative=f'Όνομα{number}', surname_in_accusative=f'{config.prefix}Επώνυμο{number}',
+            father_name_in_genitive=f'Πατρώνυμο{number % 97}', gender=rng.choice('ΑΓ'),
+            specialty=rng.choice(specialties), current_service_id=department.service_id, department=department,
+            employee_type=rng.choice(employee_types), position=rng.choice(positions),
+            regular_leave_days=rng.choice((20, 23, 25)), carryover_leave_days=rng.randint(0, 10),
+        ))
+    Employee.objects.bulk_create(employees, batch_size=config.batch_size)
+
+    # Ένας προϊστάμενος ανά τμήμα, από τους υπαλλήλους του
+    heads = {}
+    for employee in employees:
+        heads.setdefault(employee.department_id, employee)
+    for department in departments:
+        department.head = heads.get(department.id)
+    Department.objects.bulk_update(departments, ['head'], batch_size=config.batch_size)
+    heads_group = Group.objects.get(name='DepartmentHeads')
+    User.groups.through.objects.bulk_create([
+        User.groups.through(user_id=head.user_id, group_id=heads_group.id) for head in heads.values()
+    ], ignore_conflicts=True)
+    return employees
+
+
+def _leave_for_employee(config, rng, employee, leave_types, first_day, span_days):
+    # Μη επικαλυπτόμενα διαστήματα: ταξινομημένες αρχές και διάρκεια 1-5 ημερών
+    wanted = config.requests_per_employee * rng.randint(1, config.max_intervals)
+    starts = sorted(rng.sample(range(span_days), min(wanted, span_days)))
+    spans, last_end = [], -1
+    for offset in starts:
+        if offset <= last_end + 1:
+            continue
+        length = rng.randint(1, 5)
+        spans.append((offset, min(offset + length - 1, span_days - 1)))
+        last_end = spans[-1][1]
+    rng.shuffle(spans)
+    groups = [[] for _ in range(config.requests_per_employee)]
+    for index, span in enumerate(spans):
+        groups[index % config.requests_per_employee].append(span)
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    for group in groups:
+        if not group:
+            continue
+        leave_request = LeaveRequest(
+            employee=employee, leave_type=rng.choice(leave_types), status=rng.choices(statuses, weights)[0],
+            header_text=HeaderText.DEFAULT_TEXT,
+        )
+        intervals = [
+            LeaveInterval(start_date=first_day + timedelta(days=start), end_date=first_day + timedelta(days=end))
+            for start, end in sorted(group)
+        ]
+        yield leave_request, intervals
+
+
+def _leave_requests(config, rng, employees, leave_types):
+    first_day = date(config.start_year, 1, 1)
+    span_days = (date(config.end_year, 12, 31) - first_day).days + 1
+    totals = {'leave_requests': 0, 'leave_intervals': 0}
+    chunk = max(1, config.batch_size // max(1, config.requests_per_employee))
+    for start in range(0, len(employees), chunk):
+        pairs = [
+            pair for employee in employees[start:start + chunk]
+            for pair in _leave_for_employee(config, rng, employee, leave_types, first_day, span_days)
+        ]
+        with transaction.atomic():
+            LeaveRequest.objects.bulk_create([leave_request for leave_request, _ in pairs], batch_size=config.batch_size)
+            intervals = []
+            for leave_request, request_intervals in pairs:
+                for interval in request_intervals:
+                    interval.leave_request = leave_request
+                    intervals.append(interval)
+            LeaveInterval.objects.bulk_create(intervals, batch_size=config.batch_size)
+        totals['leave_requests'] += len(pairs)
+        totals['leave_intervals'] += len(intervals)
+    return totals
+
+
+def generate_organization(config=None, log=None):
+    """Συνθετικός οργανισμός για μετρήσεις σε ρεαλιστική κλίμακα.
+
+    Όλα γράφονται με bulk_create, οπότε στο τέλος ξαναχτίζονται ό,τι κρατούν τα
+    signals: ιεραρχία τμημάτων, ledger υπολοίπων και οι caches.
+    """
+    config = config or SyntheticConfig()
+    log = log or (lambda message: None)
+    rng = random.Random(config.seed)
+    if Service.objects.filter(name__startswith=f'{config.prefix} ').exists():
+        raise ValueError(f"Synthetic data with prefix {config.prefix!r} already exists.")
+
+    with transaction.atomic():
+        leave_types, specialties, employee_types, positions = _reference_tables(config)
+        services, departments = _organization(config)
+        log(f"{len(services)} services, {len(departments)} departments")
+        employees = _people(config, rng, departments, specialties, employee_types, positions)
+        log(f"{len(employees)} employees")
+    totals = _leave_requests(config, rng, employees, leave_types)
+    log(f"{totals['leave_requests']} leave requests, {totals['leave_intervals']} intervals")
+
+    rebuild_department_closure()
+    if config.rebuild_ledger:
+        log(f"{rebuild_ledger()} ledger rows")
+        log(f"{rebuild_statistics()} statistics rows")
+    reference_data.invalidate()
+    holiday_calendar.invalidate()
+    invalidate_absences()
+    invalidate_roles()
+    return {
+        'services': len(services),
+        'departments': len(departments),
+        'employees': len(employees),
+        **totals,
+    }
@@ -1,3 +1,1760 @@
-from django.test import TestCase
+import base64
+import contextlib
+import csv
+import importlib
+import io
+import json
+import os
+import random
+import shutil
+import smtplib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from pypdf import PdfReader, PdfWriter
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection, connections, transaction
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+from django.utils import timezone
+from leave_system_project import urls as project_urls
+from leave_system_project.database import database_config, sqlite_config
+
+from .absences import absence_calendar, daily_headcounts
+from .benchmarks import BenchmarkContext, compare_results, run_benchmarks
+from .checks import shared_cache_check
+from .conflicts import IntervalTree, find_leave_conflicts
+from .decision_files import is_sharded, parse_range
+from .exports import EXPORT_COLUMNS, export_queryset, iter_export_rows
+from .forms import LeaveIntervalFormSet, LeaveRequestFilterForm
+from .holidays import holiday_calendar
+from .issuance import issue_decisions
+from .import_data import ImportEngine, import_all_data, sync_employees
+from .jobs import enqueue_decision_pdf, run_pending_jobs
+from . import ledger, leave_statistics
+from .leave_statistics import dashboard_data, rebuild_statistics, verify_statistics
+from .ledger import rebuild_ledger, verify_ledger
+from .metrics import PDF_DURATION, REQUEST_DURATION, SQL_QUERIES, TEMPLATE_DURATION, Histogram, registry
+from .models import (
+    DecisionJob, DecisionNotification, Department, DepartmentClosure, Employee, EmployeePosition, EmployeeType, HeaderText, LeaveBalance, LeaveInterval, LeaveRequest,
+    LeaveRollover, LeaveStatistic, LeaveType, NotificationDelivery, PublicHoliday, Service, Specialty,
+    rebuild_department_closure,
+)
+from .notifications import deliver_pending_notifications, queue_decision_notifications
+from .pagination import keyset_page
+from .pdf import DecisionRenderer, StaticAssetCache, URLFetcher, decision_renderer
+from .reference import ReferenceData, cache_backend, reference_data
+from .rollover import apply_rollover, plan_rollover
+from .reports import working_days_by_employee, working_days_by_interval, working_days_by_request
+from .roles import invalidate_roles, role_versions
+from .submission import LeaveSubmission, create_submissions, validate_submissions
+from .synthetic import SyntheticConfig, generate_organization, orthodox_easter
+
+
+class BulkWorkingDaysTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        PublicHoliday.objects.create(name='Πρωτοχρονιά', day=1, month=1, is_fixed=True)
+        PublicHoliday.objects.create(name='Θεοφάνια', day=6, month=1, is_fixed=True)
+        PublicHoliday.objects.create(name='25η Μαρτίου', day=25, month=3, is_fixed=True)
+        PublicHoliday.objects.create(name='Χριστούγεννα', day=25, month=12, is_fixed=True)
+        PublicHoliday.objects.create(name='Καθαρά Δευτέρα', day=18, month=3, year=2024)
+        PublicHoliday.objects.create(name='Καθαρά Δευτέρα', day=3, month=3, year=2025)
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+
+        rng = random.Random(20241231)
+        for e in range(5):
+            employee = Employee.objects.create(
+                name_in_accusative=f'Όνομα{e}', surname_in_accusative=f'Επώνυμο{e}',
+                father_name_in_genitive='Πατρός', gender='Α',
+            )
+            for _ in range(8):
+                leave_request = LeaveRequest.objects.create(employee=employee, leave_type=leave_type)
+                for _ in range(rng.randint(1, 3)):
+                    start = date(2023, 11, 1) + timedelta(days=rng.randint(0, 800))
+                    end = start + timedelta(days=rng.randint(-2, 40))
+                    LeaveInterval.objects.create(leave_request=leave_request, start_date=start, end_date=end)
+
+    def setUp(self):
+        # Το rollback των tests δεν στέλνει signals, οπότε καθαρίζουμε την cache ρητά
+        holiday_calendar.invalidate()
+
+    def test_bulk_matches_scalar(self):
+        by_interval = working_days_by_interval()
+        for interval in LeaveInterval.objects.all():
+            self.assertEqual(by_interval[interval.id], interval.calculate_working_days())
+
+        by_request = working_days_by_request()
+        for leave_request in LeaveRequest.objects.all():
+            self.assertEqual(by_request[leave_request.id], leave_request.calculate_total_working_days())
+
+        by_employee = working_days_by_employee()
+        for employee in Employee.objects.all():
+            expected = sum(lr.calculate_total_working_days() for lr in employee.leave_requests.all())
+            self.assertEqual(by_employee[employee.id], expected)
+
+    def test_bulk_uses_single_query(self):
+        working_days_by_interval()
+        with self.assertNumQueries(1):
+            working_days_by_request(LeaveInterval.objects.filter(start_date__year=2024))
+
+
+class HolidayCalendarTests(TestCase):
+    def setUp(self):
+        PublicHoliday.objects.create(name='Χριστούγεννα', day=25, month=12, is_fixed=True)
+        PublicHoliday.objects.create(name='Πρωτοχρονιά', day=1, month=1, is_fixed=True)
+        PublicHoliday.objects.create(name='Θεοφάνεια', day=6, month=1, is_fixed=True)
+        PublicHoliday.objects.create(name='Καθαρά Δευτέρα', day=3, month=3, year=2025)
+        PublicHoliday.objects.create(name='Καθαρά Δευτέρα', day=23, month=2, year=2026)
+        holiday_calendar.invalidate()
+
+    @staticmethod
+    def brute_force(start_date, end_date):
+        holidays = PublicHoliday.objects.all()
+        count = 0
+        day = start_date
+        while day <= end_date:
+            if day.weekday() < 5 and all(holiday.get_date_for_year(day.year) != day for holiday in holidays):
+                count += 1
+            day += timedelta(days=1)
+        return count
+
+    def test_cross_year_range_counts_both_years(self):
+        start_date, end_date = date(2024, 12, 20), date(2026, 3, 10)
+        self.assertEqual(holiday_calendar.working_days(start_date, end_date), self.brute_force(start_date, end_date))
+        by_year = holiday_calendar.working_days_by_year(start_date, end_date)
+        self.assertEqual(by_year, {
+            year: self.brute_force(max(start_date, date(year, 1, 1)), min(end_date, date(year, 12, 31)))
+            for year in (2024, 2025, 2026)
+        })
+        # Δεκέμβριος προς Ιανουάριο: η Πρωτοχρονιά και τα Θεοφάνεια του νέου έτους δεν μετράνε
+        self.assertEqual(holiday_calendar.working_days(date(2025, 12, 29), date(2026, 1, 9)), 8)
+
+    def test_fixed_and_movable_holidays(self):
+        self.assertFalse(holiday_calendar.is_working_day(date(2026, 12, 25)))
+        self.assertFalse(holiday_calendar.is_working_day(date(2025, 3, 3)))
+        self.assertFalse(holiday_calendar.is_working_day(date(2026, 2, 23)))
+        # Η κινητή αργία ισχύει μόνο για το έτος της
+        self.assertTrue(holiday_calendar.is_working_day(date(2026, 3, 3)))
+        self.assertEqual(holiday_calendar.holidays_between(2026, 2026), [
+            date(2026, 1, 1), date(2026, 1, 6), date(2026, 2, 23), date(2026, 12, 25),
+        ])
+
+    def test_holiday_changes_invalidate_calendar(self):
+        start_date, end_date = date(2025, 12, 1), date(2026, 1, 31)
+        before = holiday_calendar.working_days(start_date, end_date)
+        holiday = PublicHoliday.objects.create(name='Αργία', day=2, month=1, year=2026)
+        self.assertEqual(holiday_calendar.working_days(start_date, end_date), before - 1)
+        holiday.year = 2027
+        holiday.save()
+        self.assertEqual(holiday_calendar.working_days(start_date, end_date), before)
+        holiday.year = 2026
+        holiday.save()
+        holiday.delete()
+        self.assertEqual(holiday_calendar.working_days(start_date, end_date), before)
+
+    def test_no_queries_after_warm_up(self):
+        expected = self.brute_force(date(2024, 12, 20), date(2026, 3, 10))
+        holiday_calendar.working_days(date(2024, 12, 20), date(2026, 3, 10))
+        with self.assertNumQueries(0):
+            self.assertEqual(holiday_calendar.working_days(date(2024, 12, 20), date(2026, 3, 10)), expected)
+            holiday_calendar.is_working_day(date(2025, 12, 31))
+            holiday_calendar.working_days_by_month(date(2025, 12, 1), date(2026, 1, 31))
+
+
+class DecisionJobQueueTests(TestCase):
+    def setUp(self):
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        employee = Employee.objects.create(
+            name_in_accusative='Μαρία', surname_in_accusative='Παπαδοπούλου',
+            father_name_in_genitive='Γεωργίου', gender='Γ', sch_email='maria@sch.gr',
+        )
+        self.leave_request = LeaveRequest.objects.create(employee=employee, leave_type=leave_type, status='APPROVED')
+
+    def test_job_issues_decision(self):
+        job = enqueue_decision_pdf(self.leave_request)
+        self.assertEqual(LeaveRequest.objects.get(pk=self.leave_request.pk).status, 'GENERATING')
+        self.assertEqual(enqueue_decision_pdf(self.leave_request).pk, job.pk)
+        with mock.patch.object(LeaveRequest, 'generate_decision_pdf', autospec=True) as generate:
+            generate.side_effect = lambda lr: LeaveRequest.objects.filter(pk=lr.pk).update(status='ISSUED')
+            self.assertEqual(run_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'DONE')
+        self.assertEqual(LeaveRequest.objects.get(pk=self.leave_request.pk).status, 'ISSUED')
+
+    def test_failed_job_retries_then_fails(self):
+        job = enqueue_decision_pdf(self.leave_request, max_attempts=2)
+        with mock.patch.object(LeaveRequest, 'generate_decision_pdf', side_effect=RuntimeError('boom')), \
+                self.assertLogs('leave_system.jobs', 'ERROR'):
+            run_pending_jobs()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+            DecisionJob.objects.filter(pk=job.pk).update(available_at=job.created_at)
+            run_pending_jobs()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+        self.assertIn('boom', job.last_error)
+        self.assertEqual(LeaveRequest.objects.get(pk=self.leave_request.pk).status, 'APPROVED')
+
+
+class DecisionIssuanceTests(TransactionTestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        # Τα threads βλέπουν την ίδια in-memory βάση· οι διεργασίες του pool θα άνοιγαν άλλη
+        patcher = mock.patch('leave_system.issuance.ProcessPoolExecutor', ThreadPoolExecutor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.leave_requests = []
+        for number, surname in enumerate(('Αλεξίου', 'Αποτυχίας', 'Δήμου')):
+            employee = Employee.objects.create(
+                name_in_accusative=f'Όνομα{number}', surname_in_accusative=surname, father_name_in_genitive='-',
+                gender='Α', sch_email=f'employee{number}@sch.gr',
+            )
+            leave_request = LeaveRequest.objects.create(employee=employee, leave_type=leave_type, status='APPROVED')
+            LeaveInterval.objects.create(leave_request=leave_request, start_date=date(2025, 3, 3), end_date=date(2025, 3, 4))
+            self.leave_requests.append(leave_request)
+        LeaveRequest.objects.filter(pk=self.leave_requests[2].pk).update(protocol_number='77')
+
+    def _write_pdf(self, html_content, target=None):
+        if 'Αποτυχίας' in html_content:
+            raise RuntimeError('render failed')
+        writer = PdfWriter()
+        writer.add_blank_page(width=595, height=842)
+        writer.write(target)
+
+    def issue(self, **options):
+        with mock.patch.object(decision_renderer, 'write_pdf', side_effect=self._write_pdf):
+            return issue_decisions(LeaveRequest.objects.all(), processes=2, **options)
+
+    def test_issue_assigns_protocol_and_isolates_failures(self):
+        merged_path = os.path.join(self.media_root, 'print', 'merged.pdf')
+        with mock.patch.object(decision_renderer, 'render') as render:
+            result = self.issue(protocol_start=100, final_signatory='Ο Διευθυντής', merged_path=merged_path)
+        # Η ένωση διαβάζει τα αρχεία των workers· κανένα δεύτερο render
+        render.assert_not_called()
+
+        ok, failed, numbered = self.leave_requests
+        self.assertEqual(result.issued, [ok.pk, numbered.pk])
+        self.assertEqual(list(result.failed), [failed.pk])
+        self.assertIn('render failed', result.failed[failed.pk])
+        rows = {pk: row for pk, *row in LeaveRequest.objects.values_list('pk', 'status', 'protocol_number', 'final_signatory')}
+        self.assertEqual(rows[ok.pk], ['ISSUED', '100', 'Ο Διευθυντής'])
+        self.assertEqual(rows[failed.pk], ['APPROVED', '101', 'Ο Διευθυντής'])
+        self.assertEqual(rows[numbered.pk], ['ISSUED', '77', 'Ο Διευθυντής'])
+        self.assertEqual(len(PdfReader(merged_path).pages), 2)
+        self.assertEqual([name for name in os.listdir(os.path.dirname(merged_path))], ['merged.pdf'])
+
+    def test_admin_action_queues_approved_requests(self):
+        User.objects.create_superuser('admin', password='pw')
+        self.client.login(username='admin', password='pw')
+        LeaveRequest.objects.filter(pk=self.leave_requests[0].pk).update(status='PENDING')
+        response = self.client.post(reverse('admin:leave_system_leaverequest_changelist'), {
+            'action': 'issue_decisions', '_selected_action': [leave_request.pk for leave_request in self.leave_requests],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            set(DecisionJob.objects.values_list('leave_request_id', flat=True)),
+            {self.leave_requests[1].pk, self.leave_requests[2].pk},
+        )
+
+
+class DecisionPdfCacheTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        employee = Employee.objects.create(
+            name_in_accusative='Νίκο', surname_in_accusative='Γεωργίου',
+            father_name_in_genitive='Ιωάννη', gender='Α', sch_email='nikos@sch.gr',
+        )
+        self.leave_request = LeaveRequest.objects.create(employee=employee, leave_type=leave_type, status='APPROVED')
+        LeaveInterval.objects.create(leave_request=self.leave_request, start_date=date(2025, 3, 3), end_date=date(2025, 3, 4))
+
+    def _write_pdf(self, html_content, target=None):
+        with open(target, 'wb') as pdf:
+            pdf.write(b'%PDF-1.4')
+
+    def test_identical_inputs_skip_render(self):
+        with mock.patch.object(decision_renderer, 'write_pdf', side_effect=self._write_pdf) as write_pdf:
+            self.leave_request.generate_decision_pdf()
+            first_name = self.leave_request.decision_pdf.name
+            self.leave_request.generate_decision_pdf()
+            self.assertEqual(write_pdf.call_count, 1)
+            self.assertEqual(self.leave_request.decision_pdf.name, first_name)
+
+            self.leave_request.custom_decision_text = 'Διόρθωση'
+            self.leave_request.generate_decision_pdf()
+            self.assertEqual(write_pdf.call_count, 2)
+            self.assertNotEqual(self.leave_request.decision_pdf.name, first_name)
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, first_name)))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, self.leave_request.decision_pdf.name)))
+
+
+class DecisionRendererTests(SimpleTestCase):
+    LOGO = b'\x89PNG\r\n\x1a\nlogo'
+
+    def setUp(self):
+        self.static_dir = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.static_dir)
+        os.makedirs(os.path.join(self.static_dir, 'css'))
+        with open(os.path.join(self.static_dir, 'css', 'decision.css'), 'w', encoding='utf-8') as stylesheet:
+            stylesheet.write('body { font-family: serif; }')
+        with open(os.path.join(self.static_dir, 'logo.png'), 'wb') as logo:
+            logo.write(self.LOGO)
+        override = override_settings(STATICFILES_DIRS=[self.static_dir])
+        override.enable()
+        self.addCleanup(override.disable)
+        self.logo_url = 'file://' + os.path.join(self.static_dir, 'logo.png')
+
+    @staticmethod
+    def fetch(url_fetcher, url):
+        if URLFetcher is not None:
+            response = url_fetcher.fetch(url)
+            return response.body, response.headers['Content-Type']
+        response = url_fetcher(url)
+        return response['string'], response['mime_type']
+
+    def test_asset_cache_reads_each_file_once(self):
+        asset_cache = StaticAssetCache([self.static_dir])
+        with mock.patch('builtins.open', wraps=open) as opened:
+            self.assertEqual(asset_cache.get(self.logo_url), (self.LOGO, 'image/png'))
+            self.assertEqual(asset_cache.get(self.logo_url), (self.LOGO, 'image/png'))
+        self.assertEqual(opened.call_count, 1)
+        self.assertIsNone(asset_cache.get('file://' + os.path.abspath(__file__)))
+        self.assertIsNone(asset_cache.get('https://example.com/logo.png'))
+
+    def test_renders_share_stylesheet_fonts_and_assets(self):
+        # Ψεύτικο HTML που ζητά τα αρχεία από τον url_fetcher, όπως το WeasyPrint
+        documents = []
+
+        class FakeHTML:
+            def __init__(self, string, base_url, url_fetcher):
+                self.url_fetcher = url_fetcher
+
+            def write_pdf(html, target, stylesheets, font_config):
+                documents.append({
+                    'stylesheets': stylesheets,
+                    'font_config': font_config,
+                    'logo': self.fetch(html.url_fetcher, self.logo_url),
+                    'remote': self.fetch(html.url_fetcher, 'https://example.com/seal.png'),
+                })
+                return b'%PDF-1.4'
+
+        fallback = (
+            mock.patch.object(URLFetcher, 'fetch', autospec=True, return_value=mock.Mock(body=b'seal', headers={'Content-Type': 'image/png'}))
+            if URLFetcher is not None else
+            mock.patch('leave_system.pdf.default_url_fetcher', return_value={'string': b'seal', 'mime_type': 'image/png'})
+        )
+        renderer = DecisionRenderer()
+        with mock.patch('leave_system.pdf.HTML', FakeHTML), \
+                mock.patch('leave_system.pdf.CSS', wraps=lambda **kwargs: mock.Mock()) as css, \
+                mock.patch('leave_system.pdf.FontConfiguration', wraps=mock.Mock) as font_configuration, \
+                mock.patch('builtins.open', wraps=open) as opened, fallback as default_fetcher:
+            renderer.write_pdf('<img src="logo.png">')
+            renderer.write_pdf('<img src="logo.png">')
+
+        self.assertEqual(css.call_count, 1)
+        self.assertEqual(font_configuration.call_count, 1)
+        self.assertIs(documents[0]['stylesheets'], documents[1]['stylesheets'])
+        self.assertIs(documents[0]['font_config'], documents[1]['font_config'])
+        self.assertEqual([document['logo'] for document in documents], [(self.LOGO, 'image/png')] * 2)
+        # Stylesheet και λογότυπο διαβάζονται από τον δίσκο μία φορά για όλες τις αποφάσεις
+        self.assertEqual([call.args[0] for call in opened.call_args_list], [
+            os.path.join(self.static_dir, 'css/decision.css'),
+            os.path.join(self.static_dir, 'logo.png'),
+        ])
+        # Ό,τι δεν είναι static αρχείο περνά στον προεπιλεγμένο fetcher
+        self.assertEqual(default_fetcher.call_count, 2)
+        self.assertEqual(documents[1]['remote'], (b'seal', 'image/png'))
+
+
+class ImportDataTests(TestCase):
+    EMPLOYEE_COLUMNS = [
+        'sch_email', 'name_in_accusative', 'surname_in_accusative', 'father_name_in_genitive', 'gender',
+        'specialty_name', 'current_service_name', 'department_name', 'employee_type_name', 'position_name',
+        'regular_leave_days', 'carryover_leave_days', 'is_active', 'phone',
+    ]
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        for name in ('Employee', 'DepartmentHeads'):
+            Group.objects.create(name=name)
+        Specialty.objects.create(name='ΠΕ70', short_name='ΠΕ')
+        EmployeeType.objects.create(name='Μόνιμος')
+        EmployeePosition.objects.create(name='Εκπαιδευτικός')
+        self.write('services', ['name'], [['Διεύθυνση Α'], ['Διεύθυνση Β']])
+        # Ίδιο όνομα τμήματος σε δύο υπηρεσίες
+        self.write('departments', ['name', 'service_name'], [['Τμήμα Α', 'Διεύθυνση Α'], ['Τμήμα Α', 'Διεύθυνση Β']])
+        engine = self.run_import('services', 'departments')
+        self.assertEqual(engine.errors, [])
+
+    def write(self, name, columns, rows):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(columns)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(os.path.join(self.data_dir, f'{name}.xlsx'))
+
+    @staticmethod
+    def employee_row(number, service='Διεύθυνση Α', specialty='ΠΕ70', phone='2100000000'):
+        return [
+            f'employee{number}@sch.gr', f'Όνομα{number}', 'Αλεξίου', 'Πέτρου', 'Α',
+            specialty, service, 'Τμήμα Α', 'Μόνιμος', 'Εκπαιδευτικός', 25, 2, 1, phone,
+        ]
+
+    def run_import(self, *only, dry_run=False):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return import_all_data(self.data_dir, dry_run=dry_run, only=only)
+
+    def test_create_and_update(self):
+        self.write('employees', self.EMPLOYEE_COLUMNS, [self.employee_row(1), self.employee_row(2, service='Διεύθυνση Β')])
+        engine = self.run_import('employees')
+        self.assertEqual(engine.errors, [])
+        self.assertEqual(engine.counts['employees']['created'], 2)
+        employee = Employee.objects.get(sch_email='employee2@sch.gr')
+        # Το τμήμα επιλύεται στην υπηρεσία του υπαλλήλου, όχι στο πρώτο τμήμα με το ίδιο όνομα
+        self.assertEqual(employee.department.service.name, 'Διεύθυνση Β')
+        self.assertTrue(employee.user.groups.filter(name='Employee').exists())
+
+        self.write('employees', self.EMPLOYEE_COLUMNS, [self.employee_row(1), self.employee_row(2, phone='2109999999')])
+        engine = self.run_import('employees')
+        self.assertEqual(engine.counts['employees']['updated'], 2)
+        self.assertEqual(Employee.objects.get(sch_email='employee2@sch.gr').phone, '2109999999')
+        self.assertEqual(Employee.objects.count(), 2)
+
+    def test_unresolved_foreign_keys_are_row_errors(self):
+        self.write('employees', self.EMPLOYEE_COLUMNS, [
+            self.employee_row(1), self.employee_row(2, specialty='ΠΕ99'), self.employee_row(3, service='Διεύθυνση Γ'),
+        ])
+        engine = self.run_import('employees')
+        self.assertEqual(engine.errors, [
+            ('employees', 3, 'Not found: specialty_name=ΠΕ99'),
+            ('employees', 4, 'Not found: current_service_name=Διεύθυνση Γ, '
+                             'department_name=Τμήμα Α, current_service_name=Διεύθυνση Γ'),
+        ])
+        self.assertEqual(list(Employee.objects.values_list('sch_email', flat=True)), ['employee1@sch.gr'])
+        # Οι γραμμές με σφάλμα δεν αφήνουν ορφανούς χρήστες
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['employee1@sch.gr'])
+        self.assertEqual(engine.counts['users']['created'], 1)
+
+    def test_ambiguous_department_is_a_row_error(self):
+        Department.objects.create(name='Τμήμα Α', service=Service.objects.get(name='Διεύθυνση Α'))
+        self.write('employees', self.EMPLOYEE_COLUMNS, [self.employee_row(1), self.employee_row(2, service='Διεύθυνση Β')])
+        engine = self.run_import('employees')
+        self.assertEqual(engine.errors, [
+            ('employees', 2, 'Ambiguous: department_name=Τμήμα Α, current_service_name=Διεύθυνση Α'),
+        ])
+        self.assertEqual(list(Employee.objects.values_list('sch_email', flat=True)), ['employee2@sch.gr'])
+        self.assertEqual(list(User.objects.values_list('username', flat=True)), ['employee2@sch.gr'])
+
+    def test_dry_run_writes_error_report_only(self):
+        self.write('employees', self.EMPLOYEE_COLUMNS, [self.employee_row(1), self.employee_row(2, specialty='ΠΕ99')])
+        errors_csv = os.path.join(self.data_dir, 'errors.csv')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(io.StringIO()):
+            call_command(
+                'import_data', '--data-dir', self.data_dir, '--only', 'employees', '--dry-run',
+                '--errors-csv', errors_csv, stdout=stdout, stderr=io.StringIO(),
+            )
+        self.assertIn('Dry run finished with 1 errors.', stdout.getvalue())
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(User.objects.filter(username='employee1@sch.gr').exists())
+        with open(errors_csv, encoding='utf-8') as report:
+            self.assertEqual(list(csv.reader(report)), [
+                ['source', 'row', 'error'], ['employees', '3', 'Not found: specialty_name=ΠΕ99'],
+            ])
+
+
+class EmployeeSyncTests(TestCase):
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+        for name in ('Employee', 'DepartmentHeads'):
+            Group.objects.create(name=name)
+        Specialty.objects.create(name='ΠΕ70', short_name='ΠΕ')
+        EmployeeType.objects.create(name='Μόνιμος')
+        EmployeePosition.objects.create(name='Εκπαιδευτικός')
+        for name in ('Διεύθυνση Α', 'Διεύθυνση Β'):
+            Department.objects.create(name='Τμήμα Α', service=Service.objects.create(name=name))
+
+    def roster(self, name, rows):
+        path = os.path.join(self.data_dir, name)
+        if name.endswith('.csv'):
+            with open(path, 'w', newline='', encoding='utf-8') as roster:
+                writer = csv.writer(roster)
+                writer.writerow(ImportDataTests.EMPLOYEE_COLUMNS)
+                writer.writerows(rows)
+        else:
+            workbook = openpyxl.Workbook()
+            workbook.active.append(ImportDataTests.EMPLOYEE_COLUMNS)
+            for row in rows:
+                workbook.active.append(row)
+            workbook.save(path)
+        return path
+
+    def sync(self, path, chunk_size=1000):
+        engine = ImportEngine()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sync_employees(path, engine, chunk_size=chunk_size)
+        return engine
+
+    def row(self, number, **changes):
+        return ImportDataTests.employee_row(number, **changes)
+
+    def fingerprints(self):
+        return dict(Employee.objects.values_list('sch_email', 'roster_fingerprint'))
+
+    def test_csv_and_xlsx_give_the_same_fingerprints(self):
+        rows = [self.row(number, service='Διεύθυνση Β') for number in range(3)]
+        engine = self.sync(self.roster('roster.xlsx', rows))
+        self.assertEqual(engine.counts['employees']['created'], 3)
+        fingerprints = self.fingerprints()
+
+        engine = self.sync(self.roster('roster.csv', rows))
+        self.assertEqual(engine.counts['employees']['unchanged'], 3)
+        self.assertNotIn('updated', engine.counts['employees'])
+        self.assertEqual(self.fingerprints(), fingerprints)
+
+    def test_unchanged_changed_and_missing_in_small_chunks(self):
+        self.sync(self.roster('roster.xlsx', [self.row(number) for number in range(4)]))
+        untouched = Employee.objects.get(sch_email='employee0@sch.gr').updated_at
+        # Νέος υπάλληλος, αλλαγμένο τηλέφωνο, διπλό email σε άλλο κομμάτι, ένας απών
+        engine = self.sync(self.roster('roster.csv', [
+            self.row(0), self.row(1, phone='2109999999'), self.row(2), self.row(4), self.row(1),
+        ]), chunk_size=2)
+
+        self.assertEqual(dict(engine.counts['employees']), {'unchanged': 2, 'updated': 1, 'created': 1, 'deactivated': 1})
+        self.assertEqual(engine.errors, [('employees', 6, 'Duplicate sch_email employee1@sch.gr')])
+        employees = {employee.sch_email: employee for employee in Employee.objects.all()}
+        self.assertEqual(employees['employee0@sch.gr'].updated_at, untouched)
+        self.assertEqual(employees['employee1@sch.gr'].phone, '2109999999')
+        self.assertFalse(employees['employee3@sch.gr'].is_active)
+        self.assertIsNone(employees['employee3@sch.gr'].roster_fingerprint)
+        self.assertTrue(employees['employee4@sch.gr'].is_active)
+
+
+class LeaveLedgerTests(TestCase):
+    def setUp(self):
+        holiday_calendar.invalidate()
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.employee = Employee.objects.create(
+            name_in_accusative='Ελένη', surname_in_accusative='Δημητρίου',
+            father_name_in_genitive='Κωνσταντίνου', gender='Γ',
+        )
+        self.leave_request = LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type)
+        # 29/12/2025 - 2/1/2026: 3 εργάσιμες το 2025 και 2 το 2026
+        self.interval = LeaveInterval.objects.create(
+            leave_request=self.leave_request, start_date=date(2025, 12, 29), end_date=date(2026, 1, 2),
+        )
+
+    def balance(self, year):
+        return LeaveBalance.objects.filter(employee=self.employee, year=year).values_list('used_days', 'pending_days').first()
+
+    def test_status_transitions_and_interval_edits(self):
+        self.assertEqual(self.balance(2025), (0, 3))
+        self.assertEqual(self.balance(2026), (0, 2))
+
+        self.leave_request.status = 'APPROVED'
+        self.leave_request.save()
+        self.assertEqual(self.balance(2025), (3, 0))
+        self.assertEqual(self.employee.used_leave_days(2026, self.leave_type), 2)
+
+        self.interval.end_date = date(2025, 12, 30)
+        self.interval.save()
+        self.assertEqual(self.balance(2025), (2, 0))
+        self.assertEqual(self.balance(2026), (0, 0))
+
+        self.leave_request.status = 'REJECTED'
+        self.leave_request.save()
+        self.assertEqual(self.balance(2025), (0, 0))
+        self.assertEqual(verify_ledger(), [])
+
+    def test_concurrently_created_rows_are_incremented(self):
+        # Άλλη συναλλαγή δημιουργεί τη γραμμή ανάμεσα στο UPDATE (0 γραμμές) και στο INSERT
+        def racing_insert(row):
+            original = QuerySet.update
+
+            def update(queryset, **kwargs):
+                if not row.pk:
+                    row.save()
+                    return 0
+                return original(queryset, **kwargs)
+            return mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update)
+
+        with racing_insert(LeaveBalance(employee=self.employee, leave_type=self.leave_type, year=2030, used_days=5)):
+            ledger._apply({(self.employee.id, self.leave_type.id, 2030, 'used_days'): 3})
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employee, year=2030).used_days, 8)
+
+        key = dict(service_id=0, department_id=0, leave_type_id=self.leave_type.id, status='ISSUED', year=2030, month=1)
+        with racing_insert(LeaveStatistic(**key, days=5, requests=1)):
+            leave_statistics._apply({tuple(key.values()): (3, 1)})
+        cell = LeaveStatistic.objects.get(**key)
+        self.assertEqual((cell.days, cell.requests), (8, 2))
+
+    def test_delete_and_rebuild(self):
+        other = LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type, status='ISSUED')
+        LeaveInterval.objects.create(leave_request=other, start_date=date(2025, 3, 3), end_date=date(2025, 3, 7))
+        self.assertEqual(self.balance(2025), (5, 3))
+        self.leave_request.delete()
+        self.assertEqual(self.balance(2025), (5, 0))
+        self.assertEqual(verify_ledger(), [])
+
+        LeaveBalance.objects.update(used_days=99)
+        self.assertNotEqual(verify_ledger(), [])
+        rebuild_ledger()
+        self.assertEqual(verify_ledger(), [])
+        self.assertEqual(self.balance(2025), (5, 0))
+
+
+class AbsenceCalendarTests(TestCase):
+    def setUp(self):
+        Group.objects.create(name='DepartmentHeads')
+        holiday_calendar.invalidate()
+        cache.clear()
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        service = Service.objects.create(name='Διεύθυνση')
+        self.department = Department.objects.create(name='Τμήμα', service=service)
+        self.employees = [
+            Employee.objects.create(
+                name_in_accusative=f'Όνομα{i}', surname_in_accusative=f'Επώνυμο{i}',
+                father_name_in_genitive='Πατρός', gender='Α', department=self.department,
+            )
+            for i in range(3)
+        ]
+
+    def add_leave(self, employee, start_date, end_date, status='APPROVED'):
+        leave_request = LeaveRequest.objects.create(employee=employee, leave_type=self.leave_type, status=status)
+        LeaveInterval.objects.create(leave_request=leave_request, start_date=start_date, end_date=end_date)
+        return leave_request
+
+    def absent(self, day):
+        data = absence_calendar([self.department.id], 2025, 5)
+        return data['days'][day - 1]['absent']
+
+    def test_headcounts_per_day(self):
+        self.add_leave(self.employees[0], date(2025, 4, 28), date(2025, 5, 6))
+        self.add_leave(self.employees[0], date(2025, 5, 5), date(2025, 5, 8))
+        self.add_leave(self.employees[1], date(2025, 5, 6), date(2025, 5, 7), status='PENDING')
+        self.add_leave(self.employees[2], date(2025, 5, 6), date(2025, 5, 7), status='REJECTED')
+        self.assertEqual([self.absent(day) for day in (1, 5, 6, 7, 8, 9)], [1, 1, 2, 2, 1, 0])
+
+    def grid_statuses(self):
+        grid = absence_calendar([self.department.id], 2025, 5)['departments'][0]
+        return [absence['status'] for employee in grid['employees'] for absence in employee['absences']]
+
+    def test_bulk_status_changes_refresh_cached_grid(self):
+        leave_request = self.add_leave(self.employees[0], date(2025, 5, 5), date(2025, 5, 6))
+        self.assertEqual(self.grid_statuses(), ['APPROVED'])
+        # Το enqueue αλλάζει την κατάσταση με update(), χωρίς signals
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_decision_pdf(leave_request)
+        self.assertEqual(self.grid_statuses(), ['GENERATING'])
+
+    def test_invalid_month_is_rejected(self):
+        officer = User.objects.create_user('officer', password='pw')
+        officer.groups.add(Group.objects.create(name='LeaveOfficer'))
+        self.client.login(username='officer', password='pw')
+        url = reverse('department_calendar')
+        for month in ('0-5', '2025-13', '10000-1', 'x'):
+            response = self.client.get(url, {'month': month, 'department': self.department.id})
+            self.assertEqual(response.status_code, 400, month)
+        self.assertEqual(self.client.get(url, {'month': '2025-5', 'department': self.department.id}).status_code, 200)
+
+    def test_cached_until_intervals_change(self):
+        leave_request = self.add_leave(self.employees[0], date(2025, 5, 5), date(2025, 5, 6))
+        self.assertEqual(self.absent(5), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.absent(5), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveInterval.objects.create(leave_request=leave_request, start_date=date(2025, 5, 12), end_date=date(2025, 5, 12))
+            # Η σφραγίδα αλλάζει μόνο μετά το commit, ώστε ένας ταυτόχρονος υπολογισμός να μη
+            # αποθηκεύσει τα δεδομένα πριν το commit με τη νέα σφραγίδα
+            self.assertEqual(self.absent(12), 0)
+        self.assertEqual(self.absent(12), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            leave_request.status = 'REJECTED'
+            leave_request.save()
+        self.assertEqual(self.absent(5), 0)
+
+    def test_sweep_line_merges_overlaps(self):
+        spans = {1: [(date(2025, 5, 1), date(2025, 5, 3)), (date(2025, 5, 2), date(2025, 5, 4))],
+                 2: [(date(2025, 5, 3), date(2025, 5, 3))]}
+        self.assertEqual(daily_headcounts(date(2025, 5, 1), date(2025, 5, 5), spans), [1, 1, 2, 1, 0])
+
+
+class LeaveConflictTests(TestCase):
+    def setUp(self):
+        Group.objects.create(name='DepartmentHeads')
+        holiday_calendar.invalidate()
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        service = Service.objects.create(name='Διεύθυνση')
+        department = Department.objects.create(name='Τμήμα', service=service)
+        self.employees = [
+            Employee.objects.create(
+                name_in_accusative=f'Όνομα{i}', surname_in_accusative=f'Επώνυμο{i}',
+                father_name_in_genitive='Πατρός', gender='Α', department=department,
+            )
+            for i in range(4)
+        ]
+
+    def add_leave(self, employee, start_date, end_date, status='APPROVED'):
+        leave_request = LeaveRequest.objects.create(employee=employee, leave_type=self.leave_type, status=status)
+        LeaveInterval.objects.create(leave_request=leave_request, start_date=start_date, end_date=end_date)
+        return leave_request
+
+    def interval_formset(self, employee, intervals, confirm=False):
+        data = {'intervals-TOTAL_FORMS': len(intervals), 'intervals-INITIAL_FORMS': 0}
+        for i, (start_date, end_date) in enumerate(intervals):
+            data[f'intervals-{i}-start_date'] = start_date.isoformat()
+            data[f'intervals-{i}-end_date'] = end_date.isoformat()
+        return LeaveIntervalFormSet(
+            data, instance=LeaveRequest(employee=employee), employee=employee, confirm_understaffing=confirm,
+        )
+
+    def test_interval_tree_matches_brute_force(self):
+        rng = random.Random(7)
+        base = date(2025, 1, 1)
+        intervals = []
+        for i in range(300):
+            start_date = base + timedelta(days=rng.randint(0, 300))
+            intervals.append((start_date, start_date + timedelta(days=rng.randint(0, 20)), i))
+        tree = IntervalTree(intervals)
+        for _ in range(100):
+            start_date = base + timedelta(days=rng.randint(0, 320))
+            end_date = start_date + timedelta(days=rng.randint(0, 10))
+            expected = {i for s, e, i in intervals if s <= end_date and e >= start_date}
+            self.assertEqual({i for _, _, i in tree.overlapping(start_date, end_date)}, expected)
+
+    def test_own_overlap_is_rejected(self):
+        leave_request = self.add_leave(self.employees[0], date(2025, 5, 5), date(2025, 5, 9), status='PENDING')
+        self.add_leave(self.employees[0], date(2025, 5, 12), date(2025, 5, 12), status='REJECTED')
+        conflicts = find_leave_conflicts(self.employees[0], [(date(2025, 5, 8), date(2025, 5, 12))])
+        self.assertEqual([overlap['leave_request'] for overlap in conflicts.overlaps], [leave_request.id])
+        self.assertFalse(self.interval_formset(self.employees[0], [(date(2025, 5, 8), date(2025, 5, 12))]).is_valid())
+        self.assertTrue(self.interval_formset(self.employees[0], [(date(2025, 5, 10), date(2025, 5, 12))]).is_valid())
+        # Επικάλυψη ανάμεσα σε διαστήματα της ίδιας αίτησης
+        self.assertFalse(self.interval_formset(
+            self.employees[0], [(date(2025, 6, 2), date(2025, 6, 4)), (date(2025, 6, 4), date(2025, 6, 5))]
+        ).is_valid())
+
+    def test_understaffing_needs_confirmation(self):
+        # 4 υπάλληλοι, όριο 50%: ο τρίτος ταυτόχρονα απών ξεπερνά το όριο
+        self.add_leave(self.employees[1], date(2025, 5, 5), date(2025, 5, 9))
+        self.add_leave(self.employees[2], date(2025, 5, 7), date(2025, 5, 8), status='PENDING')
+        conflicts = find_leave_conflicts(self.employees[0], [(date(2025, 5, 1), date(2025, 5, 11))])
+        self.assertEqual(conflicts.understaffed_days, [date(2025, 5, 7), date(2025, 5, 8)])
+        intervals = [(date(2025, 5, 6), date(2025, 5, 7))]
+        self.assertFalse(self.interval_formset(self.employees[0], intervals).is_valid())
+        self.assertTrue(self.interval_formset(self.employees[0], intervals, confirm=True).is_valid())
+        with self.settings(LEAVE_SYSTEM_MAX_ABSENT_RATIO=0.75):
+            self.assertTrue(self.interval_formset(self.employees[0], intervals).is_valid())
+
+    def test_submission_view_blocks_overlaps(self):
+        user = User.objects.create_user('employee', password='pw')
+        self.employees[0].user = user
+        self.employees[0].save()
+        self.client.login(username='employee', password='pw')
+        url = reverse('create_leave_request')
+        data = {
+            'leave_type': self.leave_type.id, 'intervals-TOTAL_FORMS': 3, 'intervals-INITIAL_FORMS': 0,
+            'intervals-0-start_date': '2025-05-05', 'intervals-0-end_date': '2025-05-06',
+            'intervals-1-start_date': '2025-05-12', 'intervals-1-end_date': '2025-05-12',
+        }
+        self.assertRedirects(self.client.post(url, data), reverse('view_leave_requests'))
+        leave_request = LeaveRequest.objects.get(employee=self.employees[0])
+        self.assertEqual(leave_request.intervals.count(), 2)
+        self.assertEqual(LeaveBalance.objects.get(employee=self.employees[0]).pending_days, 3)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(LeaveRequest.objects.filter(employee=self.employees[0]).count(), 1)
+
+
+class LeaveBatchSubmissionTests(TestCase):
+    def setUp(self):
+        Group.objects.create(name='DepartmentHeads')
+        holiday_calendar.invalidate()
+        officers = Group.objects.create(name='LeaveOfficer')
+        user = User.objects.create_user('officer', password='pw')
+        user.groups.add(officers)
+        self.client.login(username='officer', password='pw')
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.employees = Employee.objects.bulk_create([
+            Employee(
+                name_in_accusative=f'Όνομα{i}', surname_in_accusative=f'Επώνυμο{i}', father_name_in_genitive='Πατρός',
+                gender='Α', sch_email=f'user{i}@sch.gr',
+            )
+            for i in range(100)
+        ])
+
+    def post(self, entries):
+        return self.client.post(reverse('submit_leave_batch'), json.dumps({'requests': entries}),
+                                content_type='application/json')
+
+    def test_batch_is_created_in_one_round_trip(self):
+        entries = []
+        for i, employee in enumerate(self.employees * 2):
+            day = date(2025, 3, 3) + timedelta(weeks=i // 100)
+            entries.append({
+                'employee': employee.sch_email if i % 2 else employee.id, 'leave_type': 'ΚΑ',
+                'status': 'APPROVED', 'intervals': [{'start_date': day.isoformat(), 'end_date': day.isoformat()}],
+            })
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(entries)
+        self.assertEqual(response.status_code, 201)
+        self.assertLess(len(queries), 30)
+        self.assertEqual(LeaveRequest.objects.count(), 200)
+        self.assertEqual(LeaveInterval.objects.count(), 200)
+        self.assertEqual(verify_ledger(), [])
+
+    def test_overlap_saved_after_validation_is_caught_in_transaction(self):
+        employee = self.employees[0]
+        day = date(2025, 3, 3)
+        submission = LeaveSubmission(employee=employee, leave_type=self.leave_type, intervals=[(day, day)])
+        self.assertTrue(validate_submissions([submission]))
+        # Άλλη υποβολή αποθηκεύεται ανάμεσα στον αρχικό έλεγχο και την αποθήκευση
+        other = LeaveRequest.objects.create(employee=employee, leave_type=self.leave_type)
+        LeaveInterval.objects.create(leave_request=other, start_date=day, end_date=day)
+        self.assertIsNone(create_submissions([submission]))
+        self.assertIn(f'#{other.pk}', submission.errors[0])
+        self.assertEqual(LeaveRequest.objects.filter(employee=employee).count(), 1)
+
+    def test_invalid_batch_is_rejected_as_a_whole(self):
+        interval = {'start_date': '2025-03-03', 'end_date': '2025-03-04'}
+        response = self.post([
+            {'employee': self.employees[0].id, 'leave_type': 'ΚΑ', 'intervals': [interval]},
+            {'employee': self.employees[1].id, 'leave_type': 'ΚΑ', 'intervals': [interval]},
+            {'employee': self.employees[0].id, 'leave_type': 'ΚΑ', 'intervals': [interval]},
+            {'employee': 'nobody@sch.gr', 'leave_type': 'ΚΑ', 'intervals': [interval]},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.json()['errors']), ['0', '2', '3'])
+        self.assertFalse(LeaveRequest.objects.exists())
+
+    def test_non_scalar_references_are_entry_errors(self):
+        interval = {'start_date': '2025-03-03', 'end_date': '2025-03-04'}
+        employee = self.employees[0]
+        response = self.post([
+            {'employee': [employee.id], 'leave_type': 'ΚΑ', 'intervals': [interval]},
+            {'employee': {'id': employee.id}, 'leave_type': 'ΚΑ', 'intervals': [interval]},
+            {'employee': employee.id, 'leave_type': {'a': 1}, 'intervals': [interval]},
+            {'employee': employee.id, 'leave_type': [self.leave_type.id], 'intervals': [interval]},
+            # True == 1 σε Python· δεν πρέπει να ταιριάξει με id
+            {'employee': True, 'leave_type': True, 'intervals': [interval]},
+        ])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(sorted(errors), ['0', '1', '2', '3', '4'])
+        self.assertIn('Άγνωστος υπάλληλος', errors['0'][0])
+        self.assertIn('Άγνωστος τύπος άδειας', errors['2'][0])
+        self.assertEqual(len(errors['4']), 2)
+        self.assertFalse(LeaveRequest.objects.exists())
+
+
+class ReadApiTests(TestCase):
+    def setUp(self):
+        officers = Group.objects.create(name='LeaveOfficer')
+        user = User.objects.create_user('officer', password='pw')
+        user.groups.add(officers)
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.employee = Employee.objects.create(
+            name_in_accusative='Άννα', surname_in_accusative='Μάρκου', father_name_in_genitive='Λάμπρου', gender='Γ',
+        )
+        self.leave_requests = []
+        for i in range(5):
+            leave_request = LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type)
+            LeaveInterval.objects.create(leave_request=leave_request, start_date=date(2025, 5, 5 + i), end_date=date(2025, 5, 5 + i))
+            self.leave_requests.append(leave_request)
+        self.client.login(username='officer', password='pw')
+
+    def test_cursor_pagination_and_field_selection(self):
+        url = reverse('api_leave_request_list') + '?page_size=2&fields=id,intervals'
+        seen = []
+        while url:
+            data = self.client.get(url).json()
+            self.assertTrue(all(set(row) == {'id', 'intervals'} for row in data['results']))
+            seen.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(sorted(seen), [leave_request.id for leave_request in self.leave_requests])
+        self.assertEqual(self.client.get(reverse('api_leave_request_list') + '?fields=nope').status_code, 400)
+
+    def test_conditional_get(self):
+        url = reverse('api_leave_request_list') + '?fields=id,status,intervals'
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries if 'leave_system_leaveinterval' in q['sql']])
+        LeaveInterval.objects.filter(leave_request=self.leave_requests[0]).update(end_date=date(2025, 5, 9))
+        LeaveInterval.objects.get(leave_request=self.leave_requests[0]).save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        detail = reverse('api_employee_detail', args=[self.employee.id])
+        etag = self.client.get(detail)['ETag']
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.employee.phone = '2100000000'
+        self.employee.save()
+        self.assertEqual(self.client.get(detail, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_requires_leave_officer(self):
+        self.client.logout()
+        url = reverse('api_employee_list')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        credentials = base64.b64encode(b'officer:pw').decode('ascii')
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=f'Basic {credentials}').status_code, 200)
+
+    def test_basic_auth_is_checked_once_until_the_password_changes(self):
+        self.client.logout()
+        url = reverse('api_employee_list')
+        credentials = 'Basic ' + base64.b64encode(b'officer:pw').decode('ascii')
+        with mock.patch('leave_system.api.authenticate', wraps=authenticate) as checked:
+            for _ in range(3):
+                self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=credentials).status_code, 200)
+            self.assertEqual(checked.call_count, 1)
+
+            officer = User.objects.get(username='officer')
+            officer.set_password('new-pw')
+            officer.save()
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=credentials).status_code, 401)
+            self.assertEqual(checked.call_count, 2)
+
+            wrong = 'Basic ' + base64.b64encode(b'officer:pw2').decode('ascii')
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=wrong).status_code, 401)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION=wrong).status_code, 401)
+            self.assertEqual(checked.call_count, 4)
+
+
+class SQLiteConcurrencyTests(SimpleTestCase):
+    alias = 'concurrency'
+    writers = 8
+    transactions_per_writer = 40
+
+    @classmethod
+    def setUpClass(cls):
+        # Βάση σε αρχείο (όχι in-memory) με τις ρυθμίσεις παραγωγής, ως επιπλέον alias
+        cls.directory = tempfile.mkdtemp()
+        config = sqlite_config(os.path.join(cls.directory, 'concurrency.sqlite3'))
+        connections.settings[cls.alias] = connections.configure_settings({'default': config, cls.alias: config})[cls.alias]
+        cls.databases = {cls.alias}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[cls.alias].close()
+        del connections.settings[cls.alias]
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def writer(self, number):
+        try:
+            for i in range(self.transactions_per_writer):
+                # Ανάγνωση και μετά εγγραφή στην ίδια συναλλαγή, όπως το ledger και η ουρά εργασιών
+                with transaction.atomic(using=self.alias):
+                    with connections[self.alias].cursor() as cursor:
+                        cursor.execute('SELECT COALESCE(MAX(seq), 0) FROM counter')
+                        seq = cursor.fetchone()[0] + 1
+                        cursor.execute('INSERT INTO counter (seq, writer) VALUES (%s, %s)', [seq, number])
+        finally:
+            connections[self.alias].close()
+
+    def test_parallel_writers_do_not_hit_locked_errors(self):
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0].lower(), 'wal')
+            cursor.execute('CREATE TABLE counter (seq INTEGER UNIQUE, writer INTEGER)')
+        with ThreadPoolExecutor(max_workers=self.writers) as pool:
+            for future in [pool.submit(self.writer, number) for number in range(self.writers)]:
+                future.result()
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute('SELECT COUNT(*), MAX(seq) FROM counter')
+            total = self.writers * self.transactions_per_writer
+            self.assertEqual(cursor.fetchone(), (total, total))
+
+    def test_environment_selects_backend(self):
+        config = database_config('/tmp', {'LEAVE_SYSTEM_DB_ENGINE': 'postgresql', 'LEAVE_SYSTEM_DB_POOL': '1'})
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertIn('pool', config['OPTIONS'])
+        self.assertNotIn('OPTIONS', database_config('/tmp', {'LEAVE_SYSTEM_SQLITE_TUNING': '0'}))
+
+
+class ReferenceDataTests(TestCase):
+    def setUp(self):
+        reference_data.invalidate()
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.employee = Employee.objects.create(
+            name_in_accusative='Άννα', surname_in_accusative='Μάρκου', father_name_in_genitive='Λάμπρου', gender='Γ',
+        )
+
+    def test_lookups_are_served_from_memory(self):
+        HeaderText.objects.create(text='ΚΕΔΑΣΥ')
+        LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type)
+        hits = reference_data.stats()['header_texts']['hits']
+        with CaptureQueriesContext(connection) as queries:
+            leave_request = LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type)
+        self.assertEqual(leave_request.header_text, 'ΚΕΔΑΣΥ')
+        self.assertFalse([q for q in queries if 'leave_system_headertext' in q['sql']])
+        self.assertEqual(reference_data.stats()['header_texts']['hits'], hits + 1)
+
+        reference_data.all('leave_types')
+        form = LeaveRequestFilterForm({'leave_type': self.leave_type.id})
+        with self.assertNumQueries(0):
+            self.assertTrue(form.is_valid())
+            form['leave_type'].as_widget()
+        self.assertEqual(form.cleaned_data['leave_type'], self.leave_type)
+
+    def test_other_workers_see_changes_through_shared_version(self):
+        worker = ReferenceData(check_interval=0)
+        self.assertEqual([leave_type.name for leave_type in worker.all('leave_types')], ['Κανονική'])
+        misses = worker.stats()['leave_types']['misses']
+        self.leave_type.name = 'Αναρρωτική'
+        self.leave_type.save()
+        self.assertEqual([leave_type.name for leave_type in worker.all('leave_types')], ['Αναρρωτική'])
+        self.assertEqual(worker.stats()['leave_types']['misses'], misses + 1)
+
+    def test_stats_report_cache_backend(self):
+        User.objects.create_user('admin', password='pw').groups.add(Group.objects.create(name='Administrator'))
+        self.client.login(username='admin', password='pw')
+        data = self.client.get(reverse('reference_cache_stats')).json()
+        self.assertEqual(data['cache'], {'backend': 'django.core.cache.backends.locmem.LocMemCache', 'shared': False})
+        self.assertIn('leave_types', data['tables'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(cache_backend(), {'backend': 'django.core.cache.backends.redis.RedisCache', 'shared': True})
+
+
+class DepartmentHierarchyTests(TestCase):
+    def setUp(self):
+        Group.objects.create(name='DepartmentHeads')
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        service = Service.objects.create(name='Διεύθυνση')
+        self.director = Employee.objects.create(
+            name_in_accusative='Πέτρο', surname_in_accusative='Αλεξίου', father_name_in_genitive='Σπύρου', gender='Α',
+        )
+        self.root = Department.objects.create(name='Διεύθυνση', service=service, head=self.director)
+        self.middle = Department.objects.create(name='Τμήμα', service=service, parent=self.root)
+        self.leaf = Department.objects.create(name='Γραφείο', service=service, parent=self.middle)
+        self.other = Department.objects.create(name='Άλλο Τμήμα', service=service)
+        employee = Employee.objects.create(
+            name_in_accusative='Άννα', surname_in_accusative='Μάρκου', father_name_in_genitive='Λάμπρου',
+            gender='Γ', department=self.leaf,
+        )
+        self.leave_request = LeaveRequest.objects.create(employee=employee, leave_type=self.leave_type)
+
+    def links(self):
+        return set(DepartmentClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_head_sees_requests_of_nested_departments(self):
+        self.assertEqual(
+            set(self.director.subordinate_departments()), {self.root, self.middle, self.leaf}
+        )
+        self.assertEqual(list(self.director.subordinate_leave_requests()), [self.leave_request])
+
+    def test_moving_subtree_updates_closure(self):
+        self.middle.parent = self.other
+        self.middle.save()
+        self.assertEqual(list(self.director.subordinate_leave_requests()), [])
+        self.assertIn((self.other.id, self.leaf.id, 2), self.links())
+        before = self.links()
+        rebuild_department_closure()
+        self.assertEqual(self.links(), before)
+
+    def test_cycles_are_rejected(self):
+        self.root.parent = self.leaf
+        with self.assertRaises(ValidationError):
+            self.root.save()
+
+    def test_deleting_department_reattaches_closure(self):
+        self.middle.delete()
+        self.assertNotIn((self.root.id, self.leaf.id, 2), self.links())
+        self.assertIn((self.leaf.id, self.leaf.id, 0), self.links())
+
+
+class LeaveListQueryCountTests(TestCase):
+    def setUp(self):
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        department_heads = Group.objects.create(name='DepartmentHeads')
+        service = Service.objects.create(name='Διεύθυνση')
+        self.head_user = User.objects.create_user('head', password='pw')
+        self.head_user.groups.add(department_heads)
+        head = Employee.objects.create(
+            user=self.head_user, name_in_accusative='Πέτρο', surname_in_accusative='Αλεξίου',
+            father_name_in_genitive='Σπύρου', gender='Α',
+        )
+        self.department = Department.objects.create(name='Τμήμα Α', service=service, head=head)
+        self.user = User.objects.create_user('employee', password='pw')
+        self.employee = Employee.objects.create(
+            user=self.user, name_in_accusative='Άννα', surname_in_accusative='Μάρκου',
+            father_name_in_genitive='Λάμπρου', gender='Γ', department=self.department,
+        )
+
+    def add_requests(self, count):
+        for i in range(count):
+            leave_request = LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type)
+            LeaveInterval.objects.create(leave_request=leave_request, start_date=date(2025, 5, 5), end_date=date(2025, 5, 6))
+            LeaveInterval.objects.create(leave_request=leave_request, start_date=date(2025, 6, 2), end_date=date(2025, 6, 3))
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for username, url in (('employee', reverse('view_leave_requests')), ('head', reverse('view_subordinate_leaves'))):
+            self.client.login(username=username, password='pw')
+            self.add_requests(3)
+            self.count_queries(url)  # η πρώτη σελίδα αποθηκεύει τους ρόλους στο session
+            small = self.count_queries(url)
+            self.add_requests(40)
+            self.assertEqual(self.count_queries(url), small)
+            self.assertEqual(self.count_queries(url + '?status=PENDING&year=2025'), small)
+
+    def test_keyset_pagination_walks_all_rows(self):
+        self.add_requests(7)
+        self.client.login(username='employee', password='pw')
+        seen = []
+        url = reverse('view_leave_requests')
+        with mock.patch('leave_system.views.keyset_page', side_effect=lambda qs, cursor: keyset_page(qs, cursor, 3)):
+            while url:
+                response = self.client.get(url)
+                seen.extend(leave.id for leave in response.context['leave_requests'])
+                next_query = response.context['next_query']
+                url = reverse('view_leave_requests') + '?' + next_query if next_query else None
+        self.assertEqual(seen, list(LeaveRequest.objects.order_by('-created_at', '-id').values_list('id', flat=True)))
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        self.officers = Group.objects.create(name='LeaveOfficer')
+        self.user = User.objects.create_user('officer', password='pw')
+        self.user.groups.add(self.officers)
+        Employee.objects.create(
+            user=self.user, name_in_accusative='Γιώργο', surname_in_accusative='Νικολάου',
+            father_name_in_genitive='Αντωνίου', gender='Α',
+        )
+        self.client.login(username='officer', password='pw')
+
+    def group_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, [q['sql'] for q in queries if 'auth_user_groups' in q['sql']]
+
+    def test_roles_are_served_from_session(self):
+        url = reverse('view_leave_requests')
+        self.group_queries(url)
+        response, queries = self.group_queries(url)
+        self.assertEqual(queries, [])
+        self.assertTrue(response.context['user_roles'].is_leave_officer_or_admin)
+
+    def test_group_change_invalidates_roles(self):
+        url = reverse('view_leave_requests')
+        self.group_queries(url)
+        self.user.groups.remove(self.officers)
+        response, queries = self.group_queries(url)
+        self.assertEqual(len(queries), 1)
+        self.assertFalse(response.context['user_roles'].is_leave_officer_or_admin)
+
+    def test_versions_are_checked_once_per_interval(self):
+        invalidate_roles([self.user.pk])
+        with mock.patch('leave_system.roles.cache', wraps=cache) as role_cache:
+            versions = role_versions(self.user.pk)
+            self.assertEqual(role_versions(self.user.pk), versions)
+            self.assertEqual(role_cache.get_many.call_count, 1)
+            invalidate_roles([self.user.pk])
+            self.assertNotEqual(role_versions(self.user.pk), versions)
+            self.assertEqual(role_cache.get_many.call_count, 2)
+
+    def test_process_local_cache_is_flagged_outside_debug(self):
+        # Οι ακυρώσεις ρόλων πρέπει να φτάνουν σε όλους τους workers
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}}
+        with override_settings(CACHES=redis, DEBUG=False):
+            self.assertEqual(shared_cache_check(None), [])
+        locmem = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=locmem, DEBUG=False):
+            self.assertEqual([warning.id for warning in shared_cache_check(None)], ['leave_system.W001'])
+        with override_settings(CACHES=locmem, DEBUG=True):
+            self.assertEqual(shared_cache_check(None), [])
+
+
+class SyntheticDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.config = SyntheticConfig(
+            services=2, departments_per_service=3, employees=12, requests_per_employee=3,
+            start_year=2024, end_year=2024, seed=7,
+        )
+        self.counts = generate_organization(self.config)
+
+    def test_orthodox_easter(self):
+        self.assertEqual(orthodox_easter(2024), date(2024, 5, 5))
+        self.assertEqual(orthodox_easter(2025), date(2025, 4, 20))
+
+    def test_generated_organization_is_consistent(self):
+        self.assertEqual(self.counts['departments'], 6)
+        self.assertEqual(Employee.objects.count(), 12)
+        self.assertEqual(LeaveRequest.objects.count(), self.counts['leave_requests'])
+        self.assertEqual(verify_ledger(), [])
+        # Κάθε τμήμα έχει προϊστάμενο με τον αντίστοιχο ρόλο
+        heads = Department.objects.exclude(head=None).values_list('head__user_id', flat=True)
+        self.assertEqual(len(heads), 6)
+        self.assertEqual(
+            set(User.objects.filter(groups__name='DepartmentHeads').values_list('id', flat=True)), set(heads)
+        )
+        root = Department.objects.get(parent=None, service__name=f'{self.config.prefix} Διεύθυνση 1')
+        self.assertEqual(root.head.subordinate_departments().count(), 3)
+        for leave_request in LeaveRequest.objects.all():
+            self.assertFalse(find_leave_conflicts(
+                leave_request.employee, [(i.start_date, i.end_date) for i in leave_request.intervals.all()],
+                exclude_request_id=leave_request.id,
+            ).overlaps)
+        with self.assertRaises(ValueError):
+            generate_organization(self.config)
+
+    def test_benchmark_report(self):
+        report = run_benchmarks(BenchmarkContext(repeat=2, sample_size=5), only=['working_days', 'department_save'])
+        self.assertEqual(set(report), {'format', 'environment', 'dataset', 'parameters', 'results'})
+        self.assertEqual(report['dataset']['employees'], 12)
+        timing = report['results']['working_days']['calculate_working_days']
+        self.assertEqual(timing['runs'], 2)
+        self.assertLessEqual(timing['min_ms'], timing['p95_ms'])
+        self.assertIn('role_sync', report['results']['department_save'])
+        # Το benchmark του Department.save δεν αφήνει αλλαγές στη βάση
+        self.assertEqual(
+            set(User.objects.filter(groups__name='DepartmentHeads').values_list('id', flat=True)),
+            set(Department.objects.exclude(head=None).values_list('head__user_id', flat=True)),
+        )
+        rows = compare_results(report, report)
+        self.assertTrue(rows)
+        self.assertTrue(all(ratio == 1 for *_, ratio in rows))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.user = User.objects.create_user('metrics', password='pw')
+        Employee.objects.create(
+            user=self.user, name_in_accusative='Άννα', surname_in_accusative='Δήμου',
+            father_name_in_genitive='Πέτρου', gender='Γ',
+        )
+        self.client.login(username='metrics', password='pw')
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram('test_seconds', 'Test.', (0.1, 1.0), ('view',))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value, 'a')
+        lines = list(histogram.samples())
+        self.assertEqual(lines[:3], [
+            'test_seconds_bucket{view="a",le="0.1"} 2',
+            'test_seconds_bucket{view="a",le="1.0"} 3',
+            'test_seconds_bucket{view="a",le="+Inf"} 4',
+        ])
+        self.assertEqual(lines[-1], 'test_seconds_count{view="a"} 4')
+
+    def test_request_is_recorded_per_view(self):
+        self.client.get(reverse('view_leave_requests'))
+        self.assertEqual(REQUEST_DURATION.snapshot('view_leave_requests', 'GET')['count'], 1)
+        self.assertGreater(SQL_QUERIES.snapshot('view_leave_requests')['sum'], 0)
+        self.assertGreater(TEMPLATE_DURATION.snapshot('view_leave_requests')['sum'], 0)
+
+        with override_settings(LEAVE_SYSTEM_METRICS_TOKEN='scrape-secret'):
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('leave_system_requests_total{view="view_leave_requests",method="GET",status="2xx"} 1', body)
+        self.assertIn('leave_system_request_duration_seconds_bucket{view="view_leave_requests",method="GET",le="+Inf"} 1', body)
+        self.assertIn('# TYPE leave_system_reference_cache_hits_total counter', body)
+
+    @override_settings(LEAVE_SYSTEM_METRICS_TOKEN='scrape-secret')
+    def test_metrics_endpoint_requires_token_or_admin(self):
+        # Πίσω από τον proxy κάθε αίτημα φαίνεται να έρχεται από το loopback
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403,
+        )
+        self.client.login(username='metrics', password='pw')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        User.objects.create_user('root', password='pw').groups.add(Group.objects.create(name='Administrator'))
+        self.client.login(username='root', password='pw')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_pdf_render_is_timed(self):
+        decision_renderer.write_pdf('<p>Απόφαση</p>')
+        self.assertEqual(PDF_DURATION.snapshot('background', 'write_pdf')['count'], 1)
+
+    @override_settings(LEAVE_SYSTEM_SLOW_REQUEST_SECONDS=1e-9, LEAVE_SYSTEM_SLOW_REQUEST_QUERIES=2)
+    def test_slow_request_logs_top_queries(self):
+        with self.assertLogs('leave_system.metrics', 'WARNING') as logs:
+            self.client.get(reverse('view_leave_requests'))
+        message = logs.output[0]
+        self.assertIn('Slow request GET', message)
+        self.assertEqual(message.count(' ms: '), 2)
+
+
+class LeaveExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        PublicHoliday.objects.create(name='Πρωτοχρονιά', day=1, month=1, is_fixed=True)
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        cls.user = User.objects.create_user('payroll', password='pw')
+        cls.user.groups.add(Group.objects.create(name='LeaveOfficer'))
+        cls.employee = Employee.objects.create(
+            user=cls.user, name_in_accusative='Ελένη', surname_in_accusative='Μαρκου',
+            father_name_in_genitive='Νικολάου', gender='Γ', sch_email='eleni@sch.gr',
+        )
+        spans = [
+            [(date(2024, 12, 30), date(2025, 1, 3)), (date(2025, 2, 3), date(2025, 2, 4))],
+            [(date(2025, 3, 3), date(2025, 3, 7))],
+            [(date(2023, 5, 2), date(2023, 5, 2))],
+        ]
+        for request_spans in spans:
+            leave_request = LeaveRequest.objects.create(employee=cls.employee, leave_type=leave_type, status='ISSUED')
+            for start, end in request_spans:
+                LeaveInterval.objects.create(leave_request=leave_request, start_date=start, end_date=end)
+
+    def setUp(self):
+        holiday_calendar.invalidate()
+
+    def test_rows_match_per_interval_working_days(self):
+        rows = list(iter_export_rows(export_queryset(), chunk_size=1))
+        self.assertEqual(len(rows), 4)
+        intervals = {
+            (interval.start_date, interval.end_date): interval
+            for interval in LeaveInterval.objects.filter(leave_request__in=[row[0] for row in rows])
+        }
+        for row in rows:
+            interval = intervals[(row[-4], row[-3])]
+            self.assertEqual(row[-2], interval.calculate_working_days())
+            self.assertEqual(row[-1], interval.leave_request.calculate_total_working_days())
+
+    def test_year_export_clips_intervals_to_the_year(self):
+        rows = list(iter_export_rows(export_queryset(2025), chunk_size=1, year=2025))
+        # 30-31/12/2024 ανήκουν στο 2024· η Πρωτοχρονιά είναι αργία
+        self.assertEqual([(row[-4], row[-3], row[-2], row[-1]) for row in rows], [
+            (date(2025, 1, 1), date(2025, 1, 3), 2, 4),
+            (date(2025, 2, 3), date(2025, 2, 4), 2, 4),
+            (date(2025, 3, 3), date(2025, 3, 7), 5, 5),
+        ])
+        rows = list(iter_export_rows(export_queryset(2024), year=2024))
+        self.assertEqual([(row[-4], row[-3], row[-2], row[-1]) for row in rows], [
+            (date(2024, 12, 30), date(2024, 12, 31), 2, 2),
+        ])
+
+    def test_queries_per_chunk(self):
+        list(iter_export_rows(export_queryset()))
+        # Ένα query για τις αιτήσεις (με iterator) και ένα ανά κομμάτι για τα διαστήματα
+        with self.assertNumQueries(3):
+            list(iter_export_rows(export_queryset(), chunk_size=2))
+
+    def test_csv_view_streams(self):
+        self.client.login(username='payroll', password='pw')
+        response = self.client.get(reverse('export_leave_data'), {'year': 2025})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(lines[0].split(','), EXPORT_COLUMNS)
+        self.assertEqual(len(lines), 4)
+
+    def test_xlsx_export(self):
+        self.client.login(username='payroll', password='pw')
+        response = self.client.get(reverse('export_leave_data'), {'format': 'xlsx'})
+        workbook = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)), read_only=True)
+        rows = list(workbook.active.iter_rows(values_only=True))
+        self.assertEqual(list(rows[0]), EXPORT_COLUMNS)
+        self.assertEqual(len(rows), 5)
+
+    def test_invalid_year_and_large_xlsx_are_rejected(self):
+        self.client.login(username='payroll', password='pw')
+        for year in ('0', '10000', 'x'):
+            self.assertEqual(self.client.get(reverse('export_leave_data'), {'year': year}).status_code, 400, year)
+            self.assertEqual(self.client.get(reverse('leave_statistics'), {'year': year}).status_code, 400, year)
+        with override_settings(LEAVE_SYSTEM_EXPORT_XLSX_MAX_REQUESTS=2):
+            response = self.client.get(reverse('export_leave_data'), {'format': 'xlsx'})
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('export_leave_data', response.json()['error'])
+            self.assertEqual(self.client.get(reverse('export_leave_data'), {'format': 'xlsx', 'year': 2025}).status_code, 200)
+
+    def test_export_requires_leave_officer(self):
+        User.objects.create_user('plain', password='pw')
+        self.client.login(username='plain', password='pw')
+        self.assertEqual(self.client.get(reverse('export_leave_data')).status_code, 302)
+
+
+class LeaveStatisticsTests(TestCase):
+    def setUp(self):
+        holiday_calendar.invalidate()
+        reference_data.invalidate()
+        Group.objects.create(name='DepartmentHeads')
+        self.service = Service.objects.create(name='Διεύθυνση Α')
+        self.department = Department.objects.create(name='Τμήμα 1', service=self.service)
+        self.other_department = Department.objects.create(name='Τμήμα 2', service=self.service)
+        self.leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.user = User.objects.create_user('officer', password='pw')
+        self.user.groups.add(Group.objects.create(name='LeaveOfficer'))
+        self.employee = Employee.objects.create(
+            user=self.user, name_in_accusative='Νίκος', surname_in_accusative='Σταύρου',
+            father_name_in_genitive='Ιωάννου', gender='Α', current_service=self.service, department=self.department,
+        )
+        self.leave_request = LeaveRequest.objects.create(employee=self.employee, leave_type=self.leave_type)
+        # 29/12/2025 - 2/1/2026: 3 εργάσιμες τον Δεκέμβριο και 2 τον Ιανουάριο
+        self.interval = LeaveInterval.objects.create(
+            leave_request=self.leave_request, start_date=date(2025, 12, 29), end_date=date(2026, 1, 2),
+        )
+
+    def cell(self, year, month, status, department=None):
+        department = department or self.department
+        return LeaveStatistic.objects.filter(
+            year=year, month=month, status=status, department_id=department.id,
+        ).values_list('days', 'requests').first()
+
+    def test_incremental_updates_match_rebuild(self):
+        self.assertEqual(self.cell(2025, 12, 'PENDING'), (3, 1))
+        self.assertEqual(self.cell(2026, 1, 'PENDING'), (2, 0))
+
+        self.leave_request.status = 'APPROVED'
+        self.leave_request.save()
+        self.assertEqual(self.cell(2025, 12, 'PENDING'), (0, 0))
+        self.assertEqual(self.cell(2025, 12, 'APPROVED'), (3, 1))
+
+        self.interval.end_date = date(2025, 12, 30)
+        self.interval.save()
+        self.assertEqual(self.cell(2026, 1, 'APPROVED'), (0, 0))
+
+        self.employee.department = self.other_department
+        self.employee.save()
+        self.assertEqual(self.cell(2025, 12, 'APPROVED', self.other_department), (2, 1))
+        self.assertEqual(self.cell(2025, 12, 'APPROVED'), (0, 0))
+        self.assertEqual(verify_statistics(), [])
+
+        self.leave_request.delete()
+        self.assertFalse(LeaveStatistic.objects.exclude(days=0, requests=0).exists())
+        self.assertEqual(verify_statistics(), [])
+
+    def test_rebuild_repairs_drift(self):
+        LeaveStatistic.objects.update(days=99)
+        self.assertNotEqual(verify_statistics(), [])
+        rebuild_statistics()
+        self.assertEqual(verify_statistics(), [])
+        self.assertEqual(self.cell(2025, 12, 'PENDING'), (3, 1))
+
+        # Οι αυξητικές ενημερώσεις μετά το rebuild ξεκινούν από τα νέα snapshots
+        self.leave_request.status = 'REJECTED'
+        self.leave_request.save()
+        self.assertEqual(verify_statistics(), [])
+
+    def test_status_change_through_job_queue(self):
+        LeaveRequest.objects.filter(pk=self.leave_request.pk).update(status='APPROVED')
+        rebuild_statistics()
+        enqueue_decision_pdf(self.leave_request)
+        self.assertEqual(self.cell(2025, 12, 'GENERATING'), (3, 1))
+        self.assertEqual(verify_statistics(), [])
+
+    def test_dashboard_reads_only_statistics(self):
+        data = dashboard_data(2025)
+        self.assertEqual(data['by_status'], [{'status': 'PENDING', 'label': 'Υπό Επεξεργασία', 'days': 3, 'requests': 1}])
+        self.assertEqual(data['by_department'], [])
+
+        self.leave_request.status = 'ISSUED'
+        self.leave_request.save()
+        dashboard_data(2025)
+        # Ονόματα υπηρεσιών και τύπων από την cache· μόνο τα τμήματα φορτώνονται
+        with self.assertNumQueries(4):
+            data = dashboard_data(2025)
+        self.assertEqual(data['monthly'][-1]['months'][11], 3)
+        self.assertEqual(data['by_department'], [{'id': self.department.id, 'name': 'Τμήμα 1', 'days': 3}])
+        self.assertEqual(data['by_service'][0]['name'], 'Διεύθυνση Α')
+
+    def test_statistics_view(self):
+        self.client.login(username='officer', password='pw')
+        response = self.client.get(reverse('leave_statistics'), {'year': 2026, 'format': 'json'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['year'], 2026)
+        self.assertEqual(self.client.get(reverse('leave_statistics')).status_code, 200)
+
+
+class LeaveRolloverTests(TestCase):
+    def setUp(self):
+        self.regular = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.sick = LeaveType.objects.create(name='Αναρρωτική', short_name='ΑΝ', subject_text='-', decision_text='-')
+        self.employees = {}
+        for name, regular, carryover in (('light', 20, 5), ('heavy', 20, 5), ('idle', 25, 10), ('gone', 20, 3)):
+            self.employees[name] = Employee.objects.create(
+                name_in_accusative=name, surname_in_accusative=name, father_name_in_genitive='-', gender='Α',
+                regular_leave_days=regular, carryover_leave_days=carryover, is_active=name != 'gone',
+            )
+        # Το ledger συμπληρώνεται απευθείας: 8 και 30 ημέρες κανονικής, οι αναρρωτικές δεν μετράνε
+        LeaveBalance.objects.create(employee=self.employees['light'], leave_type=self.regular, year=2024, used_days=8)
+        LeaveBalance.objects.create(employee=self.employees['light'], leave_type=self.sick, year=2024, used_days=4)
+        LeaveBalance.objects.create(employee=self.employees['heavy'], leave_type=self.regular, year=2024, used_days=30)
+        LeaveBalance.objects.create(employee=self.employees['idle'], leave_type=self.regular, year=2023, used_days=9)
+
+    def balances(self):
+        return {
+            name: tuple(Employee.objects.filter(pk=employee.pk).values_list('regular_leave_days', 'carryover_leave_days')[0])
+            for name, employee in self.employees.items()
+        }
+
+    def test_carryover_rules_and_single_update(self):
+        # Σύνοψη και εφαρμογή με λίγα queries, ανεξάρτητα από το πλήθος των υπαλλήλων
+        with self.assertNumQueries(10):
+            run = apply_rollover(2024, leave_types=['ΚΑ'], max_carryover_days=20, annual_leave_days=24)
+        self.assertEqual(self.balances(), {
+            'light': (24, 17), 'heavy': (24, 0), 'idle': (24, 20), 'gone': (20, 3),
+        })
+        self.assertEqual(run.summary['updated'], 3)
+        self.assertEqual(run.summary['capped_days'], 5)
+        self.assertEqual(run.summary['expired_days'], 10)
+
+    def test_rollover_applies_once(self):
+        apply_rollover(2024, max_carryover_days=None)
+        after = self.balances()
+        with self.assertRaisesMessage(ValueError, 'already been rolled over'):
+            apply_rollover(2024)
+        with self.assertRaisesMessage(ValueError, 'already been rolled over'):
+            apply_rollover(2023)
+        self.assertEqual(self.balances(), after)
+        self.assertEqual(LeaveRollover.objects.get().summary['carryover_after'], 17 + 0 + 25)
+
+    def test_current_year_is_refused(self):
+        with self.assertRaisesMessage(ValueError, 'has not ended'):
+            apply_rollover(date.today().year)
+
+    def test_dry_run_writes_nothing(self):
+        before = self.balances()
+        _, summary = plan_rollover(2024, max_carryover_days=10)
+        self.assertEqual((summary['employees'], summary['carryover_after']), (3, 20))
+        out = io.StringIO()
+        call_command('rollover_leave_balances', year=2024, dry_run=True, stdout=out)
+        self.assertIn('carryover 5 -> 17', out.getvalue())
+        self.assertEqual(self.balances(), before)
+        self.assertFalse(LeaveRollover.objects.exists())
+
+
+class DecisionNotificationTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.leave_requests = []
+        for number in range(3):
+            employee = Employee.objects.create(
+                name_in_accusative=f'Όνομα{number}', surname_in_accusative='Αλεξίου', father_name_in_genitive='-',
+                gender='Α', sch_email=f'employee{number}@sch.gr',
+                notification_recipients='1. Ενδιαφερόμενο\n2. Διεύθυνση (dide@sch.gr)\n3. Φάκελο',
+            )
+            leave_request = LeaveRequest.objects.create(employee=employee, leave_type=leave_type, status='APPROVED')
+            self.leave_requests.append(leave_request)
+        os.makedirs(os.path.join(self.media_root, 'decisions'))
+        for leave_request in self.leave_requests:
+            name = f'decisions/decision_{leave_request.pk}.pdf'
+            with open(os.path.join(self.media_root, name), 'wb') as pdf:
+                pdf.write(b'%PDF-1.4')
+            LeaveRequest.objects.filter(pk=leave_request.pk).update(
+                status='ISSUED', decision_pdf=name, decision_fingerprint=f'{leave_request.pk:064d}',
+            )
+
+    def queue(self):
+        return queue_decision_notifications([leave_request.pk for leave_request in self.leave_requests])
+
+    def test_queue_is_idempotent(self):
+        self.assertEqual(self.queue(), 3)
+        self.queue()
+        self.assertEqual(DecisionNotification.objects.count(), 3)
+        self.assertEqual(
+            sorted(NotificationDelivery.objects.filter(notification__leave_request=self.leave_requests[0])
+                   .values_list('recipient', flat=True)),
+            ['dide@sch.gr', 'employee0@sch.gr'],
+        )
+
+    def test_batches_are_sent_with_attachment(self):
+        self.queue()
+        totals = deliver_pending_notifications(batch_size=4)
+        self.assertEqual(totals, {'sent': 6, 'failed': 0})
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertEqual(mail.outbox[0].attachments[0][2], 'application/pdf')
+        self.assertFalse(NotificationDelivery.objects.exclude(status='SENT').exists())
+        self.assertEqual(deliver_pending_notifications(), {'sent': 0, 'failed': 0})
+
+    @override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend')
+    def test_one_smtp_connection_with_retries(self):
+        self.queue()
+        refused = NotificationDelivery.objects.get(recipient='employee1@sch.gr')
+
+        def sendmail(from_email, recipients, message):
+            if recipients == ['employee1@sch.gr']:
+                raise smtplib.SMTPRecipientsRefused({'employee1@sch.gr': (550, b'No such user')})
+            if recipients == ['employee2@sch.gr']:
+                raise smtplib.SMTPResponseException(451, b'Try again later')
+            return {}
+
+        with mock.patch('django.core.mail.backends.smtp.smtplib.SMTP') as smtp:
+            smtp.return_value.sendmail.side_effect = sendmail
+            totals = deliver_pending_notifications(batch_size=2)
+        self.assertEqual(smtp.call_count, 1)
+        self.assertEqual(smtp.return_value.sendmail.call_count, 6)
+        self.assertEqual(totals, {'sent': 4, 'failed': 2})
+
+        refused.refresh_from_db()
+        self.assertEqual((refused.status, refused.attempts), ('FAILED', 1))
+        retried = NotificationDelivery.objects.get(recipient='employee2@sch.gr')
+        self.assertEqual((retried.status, retried.attempts), ('QUEUED', 1))
+        self.assertGreater(retried.available_at, retried.updated_at)
+
+    def test_connection_loss_returns_rest_of_batch(self):
+        self.queue()
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=[1, smtplib.SMTPServerDisconnected('gone')]), \
+                self.assertLogs('leave_system.notifications', 'ERROR'):
+            totals = deliver_pending_notifications(batch_size=6, limit=6)
+        self.assertEqual(totals, {'sent': 1, 'failed': 1})
+        statuses = list(NotificationDelivery.objects.order_by('id').values_list('status', 'attempts'))
+        self.assertEqual(statuses[:2], [('SENT', 1), ('QUEUED', 1)])
+        self.assertEqual(statuses[2:], [('QUEUED', 0)] * 4)
+
+    def test_job_queues_notification(self):
+        leave_request = self.leave_requests[0]
+        LeaveRequest.objects.filter(pk=leave_request.pk).update(status='APPROVED')
+        enqueue_decision_pdf(leave_request)
+        with mock.patch.object(LeaveRequest, 'generate_decision_pdf', autospec=True) as generate:
+            generate.side_effect = lambda lr: LeaveRequest.objects.filter(pk=lr.pk).update(status='ISSUED')
+            run_pending_jobs()
+        self.assertEqual(NotificationDelivery.objects.filter(notification__leave_request=leave_request).count(), 2)
+
+
+class DecisionDownloadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        override = override_settings(MEDIA_ROOT=self.media_root, LEAVE_SYSTEM_DECISION_SENDFILE=None)
+        override.enable()
+        self.addCleanup(override.disable)
+        Group.objects.create(name='DepartmentHeads')
+        service = Service.objects.create(name='Διεύθυνση')
+        self.head_user = User.objects.create_user('head', password='pw')
+        head = Employee.objects.create(
+            user=self.head_user, name_in_accusative='Πέτρο', surname_in_accusative='Αλεξίου',
+            father_name_in_genitive='Σπύρου', gender='Α',
+        )
+        department = Department.objects.create(name='Τμήμα Α', service=service, head=head)
+        self.user = User.objects.create_user('employee', password='pw')
+        employee = Employee.objects.create(
+            user=self.user, name_in_accusative='Άννα', surname_in_accusative='Μάρκου',
+            father_name_in_genitive='Λάμπρου', gender='Γ', department=department, sch_email='anna@sch.gr',
+        )
+        User.objects.create_user('other', password='pw')
+        leave_type = LeaveType.objects.create(name='Κανονική', short_name='ΚΑ', subject_text='-', decision_text='-')
+        self.leave_request = LeaveRequest.objects.create(employee=employee, leave_type=leave_type, status='APPROVED')
+        LeaveInterval.objects.create(leave_request=self.leave_request, start_date=date(2025, 3, 3), end_date=date(2025, 3, 4))
+        with mock.patch.object(decision_renderer, 'write_pdf', side_effect=self._write_pdf):
+            self.leave_request.generate_decision_pdf()
+        self.url = reverse('download_decision_pdf', args=[self.leave_request.pk])
+
+    def _write_pdf(self, html_content, target=None):
+        with open(target, 'wb') as pdf:
+            pdf.write(b'%PDF-1.4 ' + bytes(range(256)))
+
+    def test_render_writes_sharded_path_atomically(self):
+        name = self.leave_request.decision_pdf.name
+        self.assertTrue(is_sharded(name))
+        self.assertTrue(name.startswith(f'decisions/{timezone.localtime(self.leave_request.created_at):%Y/%m}/'))
+        # Δεν μένουν προσωρινά αρχεία στον κατάλογο
+        self.assertEqual(os.listdir(os.path.dirname(self.leave_request.decision_pdf.path)), [os.path.basename(name)])
+
+    def test_permissions(self):
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        for username, status in (('other', 403), ('employee', 200), ('head', 200)):
+            self.client.login(username=username, password='pw')
+            response = self.client.get(self.url)
+            self.assertEqual(response.status_code, status, username)
+        self.assertEqual(b''.join(response.streaming_content)[:8], b'%PDF-1.4')
+        self.assertEqual(set(response['Cache-Control'].split(', ')), {'private', 'no-cache'})
+
+    def test_media_url_does_not_bypass_permissions(self):
+        # Το urlconf χτίζεται ξανά με DEBUG=True, όπως στην προεπιλεγμένη ρύθμιση
+        self.addCleanup(clear_url_caches)
+        self.addCleanup(importlib.reload, project_urls)
+        with override_settings(DEBUG=True):
+            importlib.reload(project_urls)
+            clear_url_caches()
+            self.client.login(username='other', password='pw')
+            response = self.client.get(settings.MEDIA_URL + self.leave_request.decision_pdf.name)
+        self.assertEqual(response.status_code, 404)
+
+    def test_conditional_and_range_requests(self):
+        self.client.login(username='employee', password='pw')
+        response = self.client.get(self.url)
+        etag, size = response['ETag'], int(response['Content-Length'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 0-3/{size}')
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF')
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-2')
+        self.assertEqual(b''.join(response.streaming_content), bytes([254, 255]))
+
+        response = self.client.get(self.url, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+        # Αν το If-Range δεν ταιριάζει, στέλνεται ολόκληρο το αρχείο
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(parse_range('bytes=0-1,4-5', size), None)
+
+    @override_settings(LEAVE_SYSTEM_DECISION_SENDFILE='x-accel-redirect', LEAVE_SYSTEM_DECISION_ACCEL_PREFIX='/protected-media/')
+    def test_proxy_handoff(self):
+        self.client.login(username='employee', password='pw')
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        # Το όνομα στέλνεται URL-encoded· το nginx το αποκωδικοποιεί πριν βρει το αρχείο
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/' + self.leave_request.decision_pdf.name.replace('@', '%40'),
+        )
+        self.assertEqual(response.content, b'')
+
+    def test_migration_command_moves_flat_files(self):
+        os.makedirs(os.path.join(self.media_root, 'decisions'), exist_ok=True)
+        flat = 'decisions/decision_anna@sch.gr_old.pdf'
+        with open(os.path.join(self.media_root, flat), 'wb') as pdf:
+            pdf.write(b'%PDF-1.4')
+        LeaveRequest.objects.filter(pk=self.leave_request.pk).update(decision_pdf=flat)
+        notification = DecisionNotification.objects.create(
+            leave_request=self.leave_request, decision_fingerprint='0' * 64, decision_pdf=flat,
+        )
+
+        call_command('migrate_decision_storage', '--dry-run', stdout=io.StringIO())
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, flat)))
+        call_command('migrate_decision_storage', stdout=io.StringIO())
+
+        self.leave_request.refresh_from_db()
+        notification.refresh_from_db()
+        name = self.leave_request.decision_pdf.name
+        self.assertTrue(is_sharded(name))
+        self.assertEqual(notification.decision_pdf, name)
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, flat)))
+        self.assertTrue(os.path.exists(os.path.join(self.media_root, name)))
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 urlpatterns = [
     path('register/', views.register, name='register'),
@@ -9,4 +9,16 @@ urlpatterns = [
     path('manage-department-heads/', views.manage_department_heads, name='manage_department_heads'),
     path('view-subordinate-leaves/', views.view_subordinate_leaves, name='view_subordinate_leaves'),
     path('preview-decision/<int:leave_request_id>/', views.preview_decision_pdf, name='preview_decision_pdf'),
+    path('decisions/<int:leave_request_id>/pdf/', views.download_decision_pdf, name='download_decision_pdf'),
+    path('decision-status/<int:leave_request_id>/', views.decision_status, name='decision_status'),
+    path('batch/', views.submit_leave_batch, name='submit_leave_batch'),
+    path('absence-calendar/', views.department_calendar, name='department_calendar'),
+    path('reference-cache/', views.reference_cache_stats, name='reference_cache_stats'),
+    path('export/', views.export_leave_data, name='export_leave_data'),
+    path('statistics/', views.leave_statistics, name='leave_statistics'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('api/v1/employees/', api.employee_list, name='api_employee_list'),
+    path('api/v1/employees/<int:employee_id>/', api.employee_detail, name='api_employee_detail'),
+    path('api/v1/leave-requests/', api.leave_request_list, name='api_leave_request_list'),
+    path('api/v1/leave-requests/<int:leave_request_id>/', api.leave_request_detail, name='api_leave_request_detail'),
 ]
@@ -1,13 +1,31 @@
 #from django.shortcuts import render
 
 # Create your views here.
+import hmac
+import json
+from datetime import MAXYEAR, MINYEAR
 from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth import login
 from django.contrib.auth.models import User, Group, Permission
 from django.contrib.contenttypes.models import ContentType
-from .forms import RegisterForm, LeaveRequestForm, LeaveIntervalForm
+from .forms import RegisterForm, LeaveRequestForm, LeaveIntervalFormSet, LeaveRequestFilterForm
 from .models import Employee, LeaveRequest, Department
+from .absences import absence_calendar, month_bounds
+from .submission import create_submissions, parse_batch, validate_submissions
+from .decision_files import decision_response
+from .exports import EXPORT_FORMATS, export_filename, export_queryset, iter_csv, iter_export_rows, write_xlsx
+from .jobs import enqueue_decision_pdf
+from .leave_statistics import dashboard_data
+from .metrics import registry
+from .pagination import keyset_page
+from .reference import cache_backend, reference_data
+from .roles import get_roles
 
 def setup_groups():
     employee_group, _ = Group.objects.get_or_create(name='Employee')
@@ -53,33 +71,50 @@ def create_leave_request(request):
     employee = Employee.objects.get(user=request.user)
     if request.method == 'POST':
         leave_form = LeaveRequestForm(request.POST)
-        interval_form = LeaveIntervalForm(request.POST)
-        if leave_form.is_valid() and interval_form.is_valid():
-            leave_request = leave_form.save(commit=False)
-            leave_request.employee = employee
-            leave_request.save()
-            interval = interval_form.save(commit=False)
-            interval.leave_request = leave_request
-            interval.save()
-            return redirect('view_leave_requests')
+        confirm = leave_form.is_valid() and leave_form.cleaned_data['confirm_understaffing']
+        interval_formset = LeaveIntervalFormSet(
+            request.POST, instance=LeaveRequest(employee=employee), employee=employee, confirm_understaffing=confirm,
+        )
+        if leave_form.is_valid() and interval_formset.is_valid():
+            submission = interval_formset.submission
+            submission.leave_type = leave_form.cleaned_data['leave_type']
+            if create_submissions([submission]) is not None:
+                return redirect('view_leave_requests')
+            # Άλλη αίτηση αποθηκεύτηκε στο μεταξύ και επικαλύπτεται
+            interval_formset.non_form_errors().extend(submission.errors)
     else:
         leave_form = LeaveRequestForm()
-        interval_form = LeaveIntervalForm()
+        interval_formset = LeaveIntervalFormSet(instance=LeaveRequest(employee=employee), employee=employee)
+    year = timezone.localdate().year
     return render(request, 'leave_system/create_leave_request.html', {
         'leave_form': leave_form,
-        'interval_form': interval_form,
+        'interval_formset': interval_formset,
+        'year': year,
+        'employee': employee,
+        'balances': employee.leave_balances.filter(year=year).select_related('leave_type'),
     })
 
-
+def paginate_leave_requests(request, leave_requests):
+    filter_form = LeaveRequestFilterForm(request.GET or None)
+    leave_requests = filter_form.filter(leave_requests).select_related(
+        'employee', 'leave_type'
+    ).prefetch_related('intervals')
+    page = keyset_page(leave_requests, request.GET.get('cursor'))
+    next_query = None
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_query = query.urlencode()
+    return {'leave_requests': page, 'filter_form': filter_form, 'next_query': next_query}
 
 @login_required
 def view_leave_requests(request):
     employee = Employee.objects.get(user=request.user)
-    leave_requests = LeaveRequest.objects.filter(employee=employee)
-    return render(request, 'leave_system/view_leave_requests.html', {'leave_requests': leave_requests})
+    context = paginate_leave_requests(request, LeaveRequest.objects.filter(employee=employee))
+    return render(request, 'leave_system/view_leave_requests.html', context)
 
 def is_admin(user):
-    return user.groups.filter(name='Administrator').exists()
+    return get_roles(user).is_admin
 
 @user_passes_test(is_admin)
 def manage_users(request):
@@ -92,12 +127,12 @@ def manage_users(request):
         user.groups.add(group)
         return redirect('manage_users')
 
-    users = User.objects.all()
+    users = User.objects.prefetch_related('groups')
     groups = Group.objects.all()
     return render(request, 'leave_system/manage_users.html', {'users': users, 'groups': groups})
 
 def is_leave_officer_or_admin(user):
-    return user.groups.filter(name__in=['LeaveOfficer', 'Administrator']).exists()
+    return get_roles(user).is_leave_officer_or_admin
 
 @user_passes_test(is_leave_officer_or_admin)
 def manage_department_heads(request):
@@ -118,19 +153,15 @@ def manage_department_heads(request):
     })
 
 def is_department_head(user):
-    return user.groups.filter(name='DepartmentHeads').exists()
+    return get_roles(user).is_department_head
 
 @user_passes_test(is_department_head)
 def view_subordinate_leaves(request):
     employee = Employee.objects.get(user=request.user)
-    departments = Department.objects.filter(head=employee)
-    subordinates = Employee.objects.filter(department__in=departments)
-    leave_requests = LeaveRequest.objects.filter(employee__in=subordinates)
-
-    return render(request, 'leave_system/view_subordinate_leaves.html', {
-        'leave_requests': leave_requests,
-        'departments': departments,
-    })
+    departments = list(employee.subordinate_departments().select_related('service', 'parent'))
+    context = paginate_leave_requests(request, employee.subordinate_leave_requests())
+    context['departments'] = departments
+    return render(request, 'leave_system/view_subordinate_leaves.html', context)
 
 @user_passes_test(is_leave_officer_or_admin)
 def preview_decision_pdf(request, leave_request_id):
@@ -143,6 +174,169 @@ def preview_decision_pdf(request, leave_request_id):
         leave_request.final_signatory = request.POST.get('final_signatory')
         leave_request.custom_decision_text = request.POST.get('custom_decision_text')
         leave_request.save()
-        leave_request.generate_decision_pdf()
-        return redirect('view_leave_requests')
-    return render(request, 'leave_system/preview_decision_pdf.html', {'leave_request': leave_request})
\ No newline at end of file
+        enqueue_decision_pdf(leave_request)
+        return redirect('preview_decision_pdf', leave_request_id=leave_request.id)
+    return render(request, 'leave_system/preview_decision_pdf.html', {'leave_request': leave_request})
+
+@user_passes_test(is_leave_officer_or_admin)
+def decision_status(request, leave_request_id):
+    leave_request = get_object_or_404(
+        LeaveRequest.objects.only('id', 'status', 'decision_pdf'), id=leave_request_id
+    )
+    job = leave_request.decision_jobs.order_by('-id').values('status', 'attempts', 'max_attempts').first()
+    return JsonResponse({
+        'status': leave_request.status,
+        'job': job,
+        'decision_pdf_url': reverse('download_decision_pdf', args=[leave_request.id]) if leave_request.decision_pdf else None,
+    })
+
+def can_download_decision(user, leave_request):
+    # Ο υπάλληλος, οι υπεύθυνοι αδειών και οι προϊστάμενοι του τμήματός του σε οποιοδήποτε επίπεδο
+    if leave_request.employee.user_id == user.id or get_roles(user).is_leave_officer_or_admin:
+        return True
+    employee = Employee.objects.filter(user=user).first()
+    return bool(
+        employee and leave_request.employee.department_id
+        and employee.subordinate_departments().filter(pk=leave_request.employee.department_id).exists()
+    )
+
+@login_required
+def download_decision_pdf(request, leave_request_id):
+    leave_request = get_object_or_404(
+        LeaveRequest.objects.select_related('employee').only(
+            'id', 'decision_pdf', 'employee__user_id', 'employee__department_id',
+        ), id=leave_request_id,
+    )
+    if not can_download_decision(request.user, leave_request):
+        return HttpResponseForbidden()
+    if not leave_request.decision_pdf:
+        raise Http404("No decision has been issued.")
+    return decision_response(request, leave_request.decision_pdf.name)
+
+def can_view_absences(user):
+    roles = get_roles(user)
+    return roles.is_department_head or roles.is_leave_officer_or_admin
+
+@user_passes_test(can_view_absences)
+def department_calendar(request):
+    # ?department=<id> ή ?service=<id>, &month=YYYY-MM (προεπιλογή ο τρέχων μήνας)
+    today = timezone.localdate()
+    try:
+        year, month = map(int, request.GET.get('month', f'{today.year}-{today.month}').split('-'))
+        # Τα όρια του μήνα ελέγχουν μαζί μήνα και έτος (το date δέχεται 1-9999)
+        month_bounds(year, month)
+        if 'department' in request.GET:
+            departments = Department.objects.filter(id=int(request.GET['department']))
+        elif 'service' in request.GET:
+            departments = Department.objects.filter(service_id=int(request.GET['service']))
+        else:
+            return JsonResponse({'error': 'Απαιτείται department ή service.'}, status=400)
+    except ValueError:
+        return JsonResponse({'error': 'Μη έγκυρες παράμετροι.'}, status=400)
+
+    if not get_roles(request.user).is_leave_officer_or_admin:
+        # Ο προϊστάμενος βλέπει μόνο τα τμήματα της ιεραρχίας του
+        employee = get_object_or_404(Employee, user=request.user)
+        departments = departments.filter(id__in=employee.subordinate_departments().values('id'))
+    names = dict(departments.values_list('id', 'name'))
+    if not names:
+        return JsonResponse({'error': 'Δεν βρέθηκαν τμήματα.'}, status=404)
+
+    data = absence_calendar(names, year, month)
+    for grid in data['departments']:
+        grid['name'] = names[grid['department']]
+    return JsonResponse(data)
+
+@user_passes_test(is_leave_officer_or_admin)
+@require_POST
+def submit_leave_batch(request):
+    # Μαζική καταχώριση αιτήσεων (π.χ. από έντυπα): όλες ή καμία
+    try:
+        entries = json.loads(request.body)
+        submissions = parse_batch(entries.get('requests') if isinstance(entries, dict) else entries)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if any(submission.errors for submission in submissions):
+        # Η παρτίδα απορρίπτεται ήδη· ο έλεγχος επικαλύψεων μόνο για πλήρη αναφορά σφαλμάτων
+        validate_submissions(submissions)
+        leave_requests = None
+    else:
+        # Ο έλεγχος επικαλύψεων γίνεται μέσα στη συναλλαγή της αποθήκευσης
+        leave_requests = create_submissions(submissions)
+    if leave_requests is None:
+        return JsonResponse({'errors': {
+            index: submission.errors for index, submission in enumerate(submissions) if submission.errors
+        }}, status=400)
+    return JsonResponse({'created': [leave_request.id for leave_request in leave_requests]}, status=201)
+
+@user_passes_test(is_admin)
+def reference_cache_stats(request):
+    # Μετρητές hits/misses της cache πινάκων αναφοράς για τη διεργασία που εξυπηρετεί το αίτημα
+    return JsonResponse({'cache': cache_backend(), 'tables': reference_data.stats()})
+
+def year_parameter(request):
+    # ?year=YYYY στα όρια του date (1-9999)· ValueError για μη έγκυρη τιμή
+    if not request.GET.get('year'):
+        return None
+    year = int(request.GET['year'])
+    if not MINYEAR <= year <= MAXYEAR:
+        raise ValueError(year)
+    return year
+
+@user_passes_test(is_leave_officer_or_admin)
+def export_leave_data(request):
+    # ?year=YYYY&format=csv|xlsx&status=ISSUED&status=...
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'error': 'Μη υποστηριζόμενη μορφή.'}, status=400)
+    try:
+        year = year_parameter(request)
+    except ValueError:
+        return JsonResponse({'error': 'Μη έγκυρο έτος.'}, status=400)
+    leave_requests = export_queryset(year, request.GET.getlist('status'))
+    rows = iter_export_rows(leave_requests, year=year)
+    filename = export_filename(year, export_format)
+    if export_format == 'xlsx':
+        # Το XLSX είναι zip και γράφεται ολόκληρο πριν σταλεί το πρώτο byte, οπότε δεν γίνεται streaming·
+        # οι μεγάλες εξαγωγές γίνονται σε CSV ή με την εντολή export_leave_data
+        max_requests = getattr(settings, 'LEAVE_SYSTEM_EXPORT_XLSX_MAX_REQUESTS', 10000)
+        if max_requests is not None and leave_requests.count() > max_requests:
+            return JsonResponse({'error': (
+                f'Η εξαγωγή XLSX περιορίζεται σε {max_requests} αιτήσεις. '
+                'Χρησιμοποιήστε format=csv ή την εντολή export_leave_data.'
+            )}, status=400)
+        return FileResponse(
+            write_xlsx(rows), as_attachment=True, filename=filename,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@user_passes_test(is_leave_officer_or_admin)
+def leave_statistics(request):
+    # Διαβάζει μόνο τον συγκεντρωτικό πίνακα LeaveStatistic· ?format=json για τα ίδια δεδομένα
+    try:
+        year = year_parameter(request)
+    except ValueError:
+        return JsonResponse({'error': 'Μη έγκυρο έτος.'}, status=400)
+    data = dashboard_data(year)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(data)
+    context = dict(data)
+    context['max_month'] = max((max(row['months']) for row in data['monthly']), default=0) or 1
+    for key in ('by_service', 'by_department', 'by_leave_type'):
+        context[f'{key}_max'] = max((row['days'] for row in data[key]), default=0) or 1
+    return render(request, 'leave_system/leave_statistics.html', context)
+
+def metrics(request):
+    # Scrape από Prometheus με bearer token· αλλιώς μόνο για διαχειριστές. Η διεύθυνση του
+    # αιτήματος δεν αρκεί: πίσω από τον proxy όλα τα αιτήματα έρχονται από το 127.0.0.1
+    token = getattr(settings, 'LEAVE_SYSTEM_METRICS_TOKEN', None)
+    scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    authorized = bool(
+        token and scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip().encode(), token.encode())
+    )
+    if not authorized and not is_admin(request.user):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,76 @@
+import os
+
+# Pragmas που εφαρμόζονται σε κάθε νέα σύνδεση SQLite. Με WAL οι αναγνώστες δεν
+# μπλοκάρουν τον writer, και το busy_timeout αφήνει τους writers να περιμένουν
+# αντί να αποτυγχάνουν αμέσως με "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'cache_size': -20000,  # σε KiB (αρνητική τιμή), περίπου 20 MB
+    'mmap_size': 134217728,
+    'temp_store': 'MEMORY',
+}
+
+
+def _flag(environ, name, default):
+    return environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def sqlite_config(name, tuned=True, pragmas=None):
+    config = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': name,
+    }
+    if tuned:
+        pragmas = {**SQLITE_PRAGMAS, **(pragmas or {})}
+        config['OPTIONS'] = {
+            'init_command': ';'.join(f'PRAGMA {pragma}={value}' for pragma, value in pragmas.items()),
+            'timeout': pragmas['busy_timeout'] / 1000,
+            # BEGIN IMMEDIATE: ο writer κλειδώνει από την αρχή της συναλλαγής, οπότε δεν
+            # υπάρχει αναβάθμιση read -> write lock που αποτυγχάνει χωρίς αναμονή
+            'transaction_mode': 'IMMEDIATE',
+        }
+    return config
+
+
+def postgresql_config(environ):
+    config = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': environ.get('LEAVE_SYSTEM_DB_NAME', 'leave_system'),
+        'USER': environ.get('LEAVE_SYSTEM_DB_USER', ''),
+        'PASSWORD': environ.get('LEAVE_SYSTEM_DB_PASSWORD', ''),
+        'HOST': environ.get('LEAVE_SYSTEM_DB_HOST', ''),
+        'PORT': environ.get('LEAVE_SYSTEM_DB_PORT', ''),
+        'OPTIONS': {},
+    }
+    if _flag(environ, 'LEAVE_SYSTEM_DB_POOL', '0'):
+        # Pool του psycopg 3 (psycopg[pool])· δεν συνδυάζεται με CONN_MAX_AGE
+        config['CONN_MAX_AGE'] = 0
+        config['OPTIONS']['pool'] = {
+            'min_size': int(environ.get('LEAVE_SYSTEM_DB_POOL_MIN', '2')),
+            'max_size': int(environ.get('LEAVE_SYSTEM_DB_POOL_MAX', '10')),
+            'timeout': float(environ.get('LEAVE_SYSTEM_DB_POOL_TIMEOUT', '10')),
+        }
+    else:
+        # Μόνιμες συνδέσεις ανά worker, με έλεγχο πριν την επαναχρησιμοποίηση
+        config['CONN_MAX_AGE'] = int(environ.get('LEAVE_SYSTEM_DB_CONN_MAX_AGE', '60'))
+        config['CONN_HEALTH_CHECKS'] = True
+    return config
+
+
+def database_config(base_dir, environ=os.environ):
+    """Ρύθμιση της βάσης από μεταβλητές περιβάλλοντος.
+
+    LEAVE_SYSTEM_DB_ENGINE=sqlite (προεπιλογή) ή postgresql. Για SQLite, το
+    LEAVE_SYSTEM_SQLITE_TUNING=0 επαναφέρει τις προεπιλογές του Django.
+    """
+    engine = environ.get('LEAVE_SYSTEM_DB_ENGINE', 'sqlite').lower()
+    if engine in ('postgres', 'postgresql'):
+        return postgresql_config(environ)
+    if engine != 'sqlite':
+        raise ValueError(f"Unsupported LEAVE_SYSTEM_DB_ENGINE: {engine}")
+    return sqlite_config(
+        environ.get('LEAVE_SYSTEM_DB_NAME', os.path.join(base_dir, 'db.sqlite3')),
+        tuned=_flag(environ, 'LEAVE_SYSTEM_SQLITE_TUNING', '1'),
+    )
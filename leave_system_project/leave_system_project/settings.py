@@ -1,4 +1,6 @@
 import os
+
+from .database import database_config
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'leave_system_project.settings')
 
 
@@ -22,11 +24,13 @@ INSTALLED_APPS = [
    ]
 
 MIDDLEWARE = [
+       'leave_system.metrics.MetricsMiddleware',
        'django.middleware.security.SecurityMiddleware',
        'django.contrib.sessions.middleware.SessionMiddleware',
        'django.middleware.common.CommonMiddleware',
        'django.middleware.csrf.CsrfViewMiddleware',
        'django.contrib.auth.middleware.AuthenticationMiddleware',
+       'leave_system.roles.RoleMiddleware',
        'django.contrib.messages.middleware.MessageMiddleware',
        'django.middleware.clickjacking.XFrameOptionsMiddleware',
    ]
@@ -35,7 +39,7 @@ ROOT_URLCONF = 'leave_system_project.urls'
 
 TEMPLATES = [
        {
-           'BACKEND': 'django.template.backends.django.DjangoTemplates',
+           'BACKEND': 'leave_system.metrics.InstrumentedDjangoTemplates',
            'DIRS': [os.path.join(BASE_DIR, 'templates')],
            'APP_DIRS': True,
            'OPTIONS': {
@@ -44,6 +48,7 @@ TEMPLATES = [
                    'django.template.context_processors.request',
                    'django.contrib.auth.context_processors.auth',
                    'django.contrib.messages.context_processors.messages',
+                   'leave_system.roles.user_roles',
                ],
            },
        },
@@ -51,13 +56,61 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'leave_system_project.wsgi.application'
 
+# SQLite με WAL/pragmas ή PostgreSQL με μόνιμες συνδέσεις ή pool, από μεταβλητές περιβάλλοντος
 DATABASES = {
+       'default': database_config(BASE_DIR),
+   }
+
+# Με πολλούς workers χρειάζεται κοινόχρηστο backend (Redis ή Memcached), ώστε οι ακυρώσεις ρόλων και
+# cache να φτάνουν σε όλες τις διεργασίες· η LocMemCache είναι μόνο για ανάπτυξη (έλεγχος leave_system.W001).
+# Η DatabaseCache δεν συνιστάται: προσθέτει queries σε κάθε σελίδα για τις σφραγίδες έκδοσης.
+CACHES = {
        'default': {
-           'ENGINE': 'django.db.backends.sqlite3',
-           'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+           'BACKEND': os.environ.get('LEAVE_SYSTEM_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+           'LOCATION': os.environ.get('LEAVE_SYSTEM_CACHE_LOCATION', 'leave-system'),
        }
    }
 
+# Μέγιστο ποσοστό ταυτόχρονα απόντων ενός τμήματος πριν ζητηθεί επιβεβαίωση στην υποβολή
+LEAVE_SYSTEM_MAX_ABSENT_RATIO = float(os.environ.get('LEAVE_SYSTEM_MAX_ABSENT_RATIO', '0.5'))
+
+# Μεταφορά υπολοίπων στην αλλαγή έτους (rollover_leave_balances): short_name των τύπων κανονικής άδειας,
+# ανώτατο όριο μεταφερόμενων ημερών και νέο ετήσιο δικαίωμα (κενό = χωρίς όριο / χωρίς αλλαγή)
+LEAVE_SYSTEM_REGULAR_LEAVE_TYPES = [
+       short_name.strip() for short_name in os.environ.get('LEAVE_SYSTEM_REGULAR_LEAVE_TYPES', 'ΚΑ').split(',')
+       if short_name.strip()
+   ]
+LEAVE_SYSTEM_MAX_CARRYOVER_DAYS = int(os.environ['LEAVE_SYSTEM_MAX_CARRYOVER_DAYS']) if os.environ.get('LEAVE_SYSTEM_MAX_CARRYOVER_DAYS') else None
+LEAVE_SYSTEM_ANNUAL_LEAVE_DAYS = int(os.environ['LEAVE_SYSTEM_ANNUAL_LEAVE_DAYS']) if os.environ.get('LEAVE_SYSTEM_ANNUAL_LEAVE_DAYS') else None
+
+# Το XLSX από το /leave/export/ φτιάχνεται ολόκληρο μέσα στο αίτημα· πάνω από αυτό το πλήθος αιτήσεων
+# ζητείται CSV (streaming) ή η εντολή export_leave_data
+LEAVE_SYSTEM_EXPORT_XLSX_MAX_REQUESTS = int(os.environ.get('LEAVE_SYSTEM_EXPORT_XLSX_MAX_REQUESTS', '10000'))
+
+# Μετρήσεις ανά view στο /leave/metrics/ (μορφή Prometheus), για διαχειριστές ή με Authorization: Bearer <token>.
+# Αιτήματα πιο αργά από LEAVE_SYSTEM_SLOW_REQUEST_SECONDS καταγράφονται με τα πιο αργά queries τους (0 = ανενεργό).
+LEAVE_SYSTEM_METRICS_ENABLED = os.environ.get('LEAVE_SYSTEM_METRICS_ENABLED', '1').lower() in ('1', 'true', 'yes', 'on')
+LEAVE_SYSTEM_METRICS_TOKEN = os.environ.get('LEAVE_SYSTEM_METRICS_TOKEN') or None
+LEAVE_SYSTEM_SLOW_REQUEST_SECONDS = float(os.environ.get('LEAVE_SYSTEM_SLOW_REQUEST_SECONDS', '1.0'))
+LEAVE_SYSTEM_SLOW_REQUEST_QUERIES = int(os.environ.get('LEAVE_SYSTEM_SLOW_REQUEST_QUERIES', '5'))
+
+# Οι αποφάσεις σερβίρονται μόνο από το /leave/decisions/<id>/pdf/ μετά τον έλεγχο δικαιωμάτων. Με
+# LEAVE_SYSTEM_DECISION_SENDFILE=x-accel-redirect (nginx, internal location στο PREFIX με alias το MEDIA_ROOT)
+# ή x-sendfile (Apache) το αρχείο το στέλνει ο proxy, μαζί με τα Range, χωρίς να δεσμεύεται worker.
+LEAVE_SYSTEM_DECISION_SENDFILE = os.environ.get('LEAVE_SYSTEM_DECISION_SENDFILE') or None
+LEAVE_SYSTEM_DECISION_ACCEL_PREFIX = os.environ.get('LEAVE_SYSTEM_DECISION_ACCEL_PREFIX', '/protected-media/')
+
+# Αποστολή των αποφάσεων στους αποδέκτες της κοινοποίησης από τον run_notification_worker
+EMAIL_BACKEND = os.environ.get('LEAVE_SYSTEM_EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.environ.get('LEAVE_SYSTEM_EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('LEAVE_SYSTEM_EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.environ.get('LEAVE_SYSTEM_EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('LEAVE_SYSTEM_EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('LEAVE_SYSTEM_EMAIL_USE_TLS', '0').lower() in ('1', 'true', 'yes', 'on')
+EMAIL_TIMEOUT = 30
+DEFAULT_FROM_EMAIL = os.environ.get('LEAVE_SYSTEM_DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+LEAVE_SYSTEM_NOTIFY_EMPLOYEE = os.environ.get('LEAVE_SYSTEM_NOTIFY_EMPLOYEE', '1').lower() in ('1', 'true', 'yes', 'on')
+
 AUTH_PASSWORD_VALIDATORS = [
        {
            'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -16,10 +16,10 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from django.conf import settings
-from django.conf.urls.static import static
 
+# Το MEDIA_ROOT δεν σερβίρεται απευθείας, ούτε με DEBUG: οι αποφάσεις κατεβαίνουν μόνο από το
+# download_decision_pdf, μετά τον έλεγχο δικαιωμάτων
 urlpatterns = [
        path('admin/', admin.site.urls),
        path('leave/', include('leave_system.urls')),
-   ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+   ]